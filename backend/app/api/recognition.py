@@ -0,0 +1,97 @@
+"""
+多类别识别接口
+一次提交最多四组截图 (季度/科目/数据)，按类别并发调度到共享的 OCR 服务上，
+识别结果可通过 FinanceRepository.save_pivot_batch 在同一事务中入库
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from backend.config.config import CATEGORY_ORDER
+
+# 一次请求最多的类别数（四张报表各一组）
+MAX_CATEGORIES = len(CATEGORY_ORDER)
+
+
+def build_pivot(parsed_data: List[Dict], metric_config: List[Dict]) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    将 parse_multi_image 的结果转换为预览用透视表
+
+    Returns:
+        (pivot_df, period_dates)，pivot_df 首行为"截止日期"，
+        index 为指标 label，columns 为季度
+    """
+    if not parsed_data:
+        return pd.DataFrame(), {}
+
+    df = pd.DataFrame(parsed_data)
+    df = df.drop_duplicates(subset=['metric_id', 'period'], keep='first')
+
+    # 创建主数据透视表
+    pivot_df = df.pivot(index='metric_id', columns='period', values='value')
+    labels_map = {m['id']: m['label'] for m in metric_config}
+    pivot_df.index = pivot_df.index.map(lambda x: labels_map.get(x, x))
+
+    # 提取每季度的截止日期
+    period_dates = {}
+    if 'report_date' in df.columns:
+        date_df = df.drop_duplicates(subset=['period'])[['period', 'report_date']]
+        period_dates = dict(zip(date_df['period'], date_df['report_date']))
+
+        # 创建日期行并添加到透视表
+        date_row = pd.DataFrame([period_dates], index=['截止日期'])
+        date_row = date_row.reindex(columns=pivot_df.columns)
+        pivot_df = pd.concat([date_row, pivot_df])
+
+    return pivot_df, period_dates
+
+
+def recognize_categories(ocr_service, image_sets: Dict[str, Tuple[str, str, str]],
+                         metric_config: List[Dict], max_workers: int = None) -> Dict[str, Dict]:
+    """
+    并发识别多个类别的截图
+
+    Args:
+        ocr_service: 共享的 OCRService 实例（所有类别共用同一个 reader）
+        image_sets: {类别: (periods_path, metrics_path, values_path)}，最多四个类别
+        metric_config: 全部指标配置，按类别自动过滤
+        max_workers: 并发线程数，默认等于类别数
+
+    Returns:
+        {类别: {"parsed_data", "disclosure_date", "pivot_df", "period_dates", "error"}}，
+        按 CATEGORY_ORDER 排序；单个类别失败不影响其他类别
+    """
+    if len(image_sets) > MAX_CATEGORIES:
+        raise ValueError(f"一次最多识别 {MAX_CATEGORIES} 个类别，收到 {len(image_sets)} 个")
+    unknown = [c for c in image_sets if c not in CATEGORY_ORDER]
+    if unknown:
+        raise ValueError(f"未知类别: {', '.join(unknown)}")
+    if not image_sets:
+        return {}
+
+    def run(category):
+        paths = image_sets[category]
+        metrics = [m for m in metric_config if m.get('category') == category]
+        result = {"parsed_data": [], "disclosure_date": "", "pivot_df": pd.DataFrame(),
+                  "period_dates": {}, "error": None}
+        try:
+            parsed_data, disclosure_date = ocr_service.parse_multi_image(
+                paths[0], paths[1], paths[2], metrics
+            )
+        except Exception as e:
+            result["error"] = str(e)
+            return result
+
+        for item in parsed_data:
+            item['category'] = category
+        pivot_df, period_dates = build_pivot(parsed_data, metric_config)
+        result.update(parsed_data=parsed_data, disclosure_date=disclosure_date,
+                      pivot_df=pivot_df, period_dates=period_dates)
+        return result
+
+    categories = [c for c in CATEGORY_ORDER if c in image_sets]
+    workers = max_workers or len(categories)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-category") as pool:
+        results = list(pool.map(run, categories))
+    return dict(zip(categories, results))
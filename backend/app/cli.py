@@ -0,0 +1,280 @@
+"""
+SketchFinance 命令行工具 (无 UI)
+    python -m backend.app.cli query  --category 利润表 [--ticker NVDA]
+    python -m backend.app.cli export --out data.csv [--category 利润表] [--ticker NVDA]
+    python -m backend.app.cli export --format parquet --out snapshot/   (或 --format arrow --out snapshot.arrow)
+    python -m backend.app.cli import data.csv | snapshot/ | snapshot.arrow
+    python -m backend.app.cli queue enqueue 利润表 p.png m.png v.png
+    python -m backend.app.cli queue status
+    python -m backend.app.cli migrate [--chunk-size 500] [--pause 0.05]
+    python -m backend.app.cli pack [--category 利润表]
+    python -m backend.app.cli changes --since 0 > changes.jsonl
+    python -m backend.app.cli import-legacy samples/financial_data.db [--chunk-size 1000]
+
+本模块顶层只导入标准库；SQLAlchemy / pandas 在具体命令执行时才导入，
+保证 `--help` 和脚本调用的启动时间在几百毫秒以内（见 backend/tests/test_import_time.py）
+"""
+import argparse
+import os
+import sys
+from contextlib import contextmanager
+
+# Add project root to path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(PROJECT_ROOT)
+
+# 导出/导入使用的长格式列
+EXPORT_COLUMNS = ["category", "ticker", "metric_id", "metric_label", "period", "value", "report_date"]
+
+
+@contextmanager
+def _session(db_path=None):
+    """一个命令一个工作单元会话；db_path 为空时使用默认 finance.db"""
+    from backend.app.models.finance_model import SessionLocal, init_db
+    from backend.app.core.database import create_sqlite_engine, session_scope
+    if not db_path:
+        init_db()
+        with session_scope(SessionLocal) as db:
+            yield db
+        return
+
+    from sqlalchemy.orm import sessionmaker
+    engine = create_sqlite_engine(db_path)
+    try:
+        init_db(engine)
+        with session_scope(sessionmaker(autocommit=False, autoflush=False, bind=engine)) as db:
+            yield db
+    finally:
+        engine.dispose()
+
+
+def _categories(category=None):
+    from backend.app.models.finance_model import CATEGORY_MODEL_MAP
+    if category:
+        if category not in CATEGORY_MODEL_MAP:
+            raise SystemExit(f"未知类别: {category}")
+        return [category]
+    return list(CATEGORY_MODEL_MAP.keys())
+
+
+def cmd_query(args):
+    from backend.app.repositories.finance_repo import FinanceRepository
+    with _session(args.db) as db:
+        df = FinanceRepository(db).get_pivot_data(args.category, ticker=args.ticker)
+    if df.empty:
+        print(f"暂无 {args.category} 数据录入记录。", file=sys.stderr)
+        return 1
+    if args.format == "csv":
+        df.to_csv(sys.stdout)
+    else:
+        print(df.to_string())
+    return 0
+
+
+def cmd_export(args):
+    if args.format != "csv":
+        return _export_snapshot(args)
+    import json
+    import pandas as pd
+    from backend.app.repositories.finance_repo import FinanceRepository
+    rows = []
+    with _session(args.db) as db:
+        repo = FinanceRepository(db)
+        for category in _categories(args.category):
+            for r in repo.get_all_data_by_category(category):
+                if args.ticker and r.ticker != args.ticker:
+                    continue
+                dates = json.loads(r.period_dates or "{}")
+                for period, value in json.loads(r.period_data or "{}").items():
+                    rows.append([category, r.ticker, r.metric_id, r.metric_label, period, value, dates.get(period, "")])
+
+    df = pd.DataFrame(rows, columns=EXPORT_COLUMNS)
+    df.to_csv(args.out if args.out != "-" else sys.stdout, index=False)
+    if args.out != "-":
+        print(f"已导出 {len(df)} 条记录到 {args.out}", file=sys.stderr)
+    return 0
+
+
+def _export_snapshot(args):
+    from backend.app.repositories.snapshot_io import export_arrow, export_parquet
+    if args.out == "-":
+        raise SystemExit(f"{args.format} 格式需要 --out 路径")
+    tickers = [args.ticker] if args.ticker else None
+    with _session(args.db) as db:
+        if args.format == "parquet":
+            stats = export_parquet(db, args.out, _categories(args.category), tickers)
+            print(f"已导出 {stats['rows']} 条记录到 {args.out} ({stats['files']} 个分区文件)", file=sys.stderr)
+        else:
+            rows = export_arrow(db, args.out, _categories(args.category), tickers)
+            print(f"已导出 {rows} 条记录到 {args.out}", file=sys.stderr)
+    return 0
+
+
+def _is_snapshot(path):
+    return os.path.isdir(path) or path.endswith((".parquet", ".arrow", ".feather", ".ipc"))
+
+
+def cmd_import(args):
+    if _is_snapshot(args.path):
+        from backend.app.repositories.snapshot_io import import_snapshot
+        with _session(args.db) as db:
+            try:
+                stats = import_snapshot(db, args.path)
+            except ValueError as e:
+                raise SystemExit(str(e))
+        print(f"已导入 {stats['rows']} 条记录 ({stats['groups']} 组类别/公司)", file=sys.stderr)
+        return 0
+
+    import pandas as pd
+    from backend.app.repositories.finance_repo import FinanceRepository
+    df = pd.read_csv(args.path, dtype=str, keep_default_na=False)
+    missing = [c for c in ["category", "ticker", "metric_label", "period", "value"] if c not in df.columns]
+    if missing:
+        raise SystemExit(f"缺少列: {', '.join(missing)}")
+
+    with _session(args.db) as db:
+        repo = FinanceRepository(db)
+        items = []
+        if "metric_id" not in df.columns:
+            df["metric_id"] = df["metric_label"]
+        for (category, ticker), group in df.groupby(["category", "ticker"], sort=False):
+            _categories(category)
+            items.append({"category": category, "ticker": ticker, "records": group.to_dict("records")})
+        repo.save_pivot_batch(items)
+    print(f"已导入 {len(df)} 条记录 ({len(items)} 组类别/公司)", file=sys.stderr)
+    return 0
+
+
+def cmd_queue(args):
+    from backend.app.services.job_queue import OCRJobQueue
+    queue = OCRJobQueue(args.queue_db)
+    try:
+        if args.action == "enqueue":
+            _categories(args.category)
+            job_id = queue.enqueue(args.category, args.periods, args.metrics, args.values)
+            print(f"已提交任务 {job_id}")
+            return 0
+
+        depth = queue.depth()
+        print("队列深度: " + ", ".join(f"{k}={v}" for k, v in depth.items()))
+        for worker_id, stats in queue.worker_throughput(args.window).items():
+            print(f"  {worker_id}: {stats['jobs']} 个任务, {stats['jobs_per_min']:.2f} 个/分钟, "
+                  f"平均 {stats['avg_elapsed'] or 0:.2f}s")
+        return 0
+    finally:
+        queue.dispose()
+
+
+def cmd_migrate(args):
+    from backend.app.repositories.observation_migration import migrate_observations, migration_status
+    with _session(args.db) as db:
+        bind = db.get_bind()
+        if not args.status:
+            migrate_observations(bind, chunk_size=args.chunk_size, pause=args.pause,
+                                 categories=_categories(args.category))
+        for category, state in migration_status(bind).items():
+            print(f"{category}: {'已完成' if state['done'] else '未完成'}, last_id={state['last_id']}, "
+                  f"剩余 {state['remaining']} 行")
+    return 0
+
+
+def cmd_pack(args):
+    from backend.app.repositories.packed_migration import pack_categories
+    with _session(args.db) as db:
+        pack_categories(db.get_bind(), _categories(args.category))
+    return 0
+
+
+def cmd_changes(args):
+    import json
+    from backend.app.repositories.finance_repo import FinanceRepository
+    if args.category:
+        _categories(args.category)
+    count, last_seq = 0, args.since
+    with _session(args.db) as db:
+        for change in FinanceRepository(db).iter_changes(args.since, category=args.category):
+            sys.stdout.write(json.dumps(change, ensure_ascii=False) + "\n")
+            count, last_seq = count + 1, change["seq"]
+    print(f"输出 {count} 条变更，最后 seq={last_seq}", file=sys.stderr)
+    return 0
+
+
+def cmd_import_legacy(args):
+    from backend.app.repositories.legacy_import import import_legacy_db
+    log = lambda msg: print(msg, file=sys.stderr)
+    with _session(args.db) as db:
+        try:
+            stats = import_legacy_db(db, args.path, chunk_size=args.chunk_size, log=log)
+        except ValueError as e:
+            raise SystemExit(str(e))
+    print(f"已导入 {stats['rows']} 行 ({stats['cells']} 个单元格, {stats['chunks']} 个事务), "
+          f"{stats['seconds']:.2f}s, {stats['rows_per_sec']:.0f} rows/sec", file=sys.stderr)
+    if stats["skipped_columns"]:
+        print(f"跳过未映射的旧列: {', '.join(stats['skipped_columns'])}", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="sketchfinance", description="SketchFinance 数据库命令行工具")
+    parser.add_argument("--db", help="SQLite 数据库路径 (默认: 项目根目录 finance.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_query = sub.add_parser("query", help="按类别查看 Pivot 数据")
+    p_query.add_argument("--category", required=True, help="利润表/资产负债表/现金流量表/关键指标")
+    p_query.add_argument("--ticker", help="只显示某个公司")
+    p_query.add_argument("--format", choices=["table", "csv"], default="table")
+    p_query.set_defaults(func=cmd_query)
+
+    p_export = sub.add_parser("export", help="导出为长格式 CSV / Parquet 数据集 / Arrow IPC 文件")
+    p_export.add_argument("--out", default="-", help="输出文件 (parquet 为目录)，'-' 表示标准输出")
+    p_export.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv")
+    p_export.add_argument("--category", help="只导出某个类别")
+    p_export.add_argument("--ticker", help="只导出某个公司")
+    p_export.set_defaults(func=cmd_export)
+
+    p_import = sub.add_parser("import", help="从长格式 CSV 或 Parquet/Arrow 快照导入")
+    p_import.add_argument("path", help="export 生成的 CSV 文件、Parquet 目录/文件或 .arrow 文件")
+    p_import.set_defaults(func=cmd_import)
+
+    p_queue = sub.add_parser("queue", help="OCR 任务队列")
+    p_queue.add_argument("--queue-db", help="队列数据库路径 (默认: finance.db 旁的 ocr_jobs.db)")
+    queue_sub = p_queue.add_subparsers(dest="action", required=True)
+    q_enqueue = queue_sub.add_parser("enqueue", help="提交一组截图")
+    q_enqueue.add_argument("category")
+    q_enqueue.add_argument("periods")
+    q_enqueue.add_argument("metrics")
+    q_enqueue.add_argument("values")
+    q_status = queue_sub.add_parser("status", help="队列深度与各 worker 吞吐量")
+    q_status.add_argument("--window", type=float, default=300.0, help="吞吐量统计窗口 (秒)")
+    p_queue.set_defaults(func=cmd_queue)
+
+    p_migrate = sub.add_parser("migrate", help="在线迁移分类表 JSON 数据到 observations 长格式表")
+    p_migrate.add_argument("--category", help="只迁移某个类别")
+    p_migrate.add_argument("--chunk-size", type=int, default=500, help="每个事务迁移的行数")
+    p_migrate.add_argument("--pause", type=float, default=0.0, help="块之间的停顿 (秒)，给前台写入让出写锁")
+    p_migrate.add_argument("--status", action="store_true", help="只查看迁移进度")
+    p_migrate.set_defaults(func=cmd_migrate)
+
+    p_pack = sub.add_parser("pack", help="为旧数据回填紧凑格式 (季度轴 + float64 字节串)")
+    p_pack.add_argument("--category", help="只回填某个类别")
+    p_pack.set_defaults(func=cmd_pack)
+
+    p_changes = sub.add_parser("changes", help="以 JSON Lines 输出某个序号之后的变更日志，用于增量同步")
+    p_changes.add_argument("--since", type=int, default=0, help="上次同步的最后 seq")
+    p_changes.add_argument("--category", help="只输出某个类别")
+    p_changes.set_defaults(func=cmd_changes)
+
+    p_legacy = sub.add_parser("import-legacy", help="导入旧版 financial_data.db (financial_records 宽表)")
+    p_legacy.add_argument("path", help="旧版数据库路径 (只读打开)")
+    p_legacy.add_argument("--chunk-size", type=int, default=1000, help="每个事务处理的旧表行数")
+    p_legacy.set_defaults(func=cmd_import_legacy)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
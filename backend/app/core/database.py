@@ -0,0 +1,93 @@
+"""
+SQLite 引擎工厂与会话作用域
+- create_sqlite_engine: WAL、busy_timeout、synchronous=NORMAL、mmap_size、cache_size 等 PRAGMA
+  在每个新连接上设置；连接池复用连接，多线程（Streamlit 会话）共享
+- session_scope: 每个工作单元一个会话，结束时提交/回滚并归还连接
+
+WAL 模式下读不阻塞写、写不阻塞读；多个写者由 busy_timeout 排队等待，而不是立刻报
+"database is locked"。WAL 依赖共享内存，数据库放在网络文件系统上时应设 wal=False
+"""
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+# 默认 PRAGMA，可通过环境变量覆盖
+DEFAULT_BUSY_TIMEOUT = float(os.environ.get("SKETCHFINANCE_DB_BUSY_TIMEOUT", 30.0))   # 秒
+DEFAULT_MMAP_SIZE = int(os.environ.get("SKETCHFINANCE_DB_MMAP_SIZE", 256 * 1024 * 1024))  # 字节
+DEFAULT_CACHE_SIZE_KB = int(os.environ.get("SKETCHFINANCE_DB_CACHE_KB", 64 * 1024))     # KiB
+DEFAULT_POOL_SIZE = int(os.environ.get("SKETCHFINANCE_DB_POOL_SIZE", 5))
+
+
+def sqlite_url(path_or_url: str) -> str:
+    """文件路径转 sqlite:/// URL；已是 URL 时原样返回"""
+    if "://" in path_or_url:
+        return path_or_url
+    return f"sqlite:///{os.path.abspath(path_or_url)}"
+
+
+def create_sqlite_engine(path_or_url: str, wal: bool = True, busy_timeout: float = None,
+                         synchronous: str = "NORMAL", mmap_size: int = None, cache_size_kb: int = None,
+                         foreign_keys: bool = True, pool_size: int = None, max_overflow: int = 10, **kwargs):
+    """
+    创建已配置 PRAGMA 的 SQLite 引擎
+
+    Args:
+        path_or_url: 数据库文件路径或 sqlite:/// URL
+        wal: journal_mode=WAL；False 时使用 DELETE（网络文件系统）
+        busy_timeout: 等待写锁的秒数
+        synchronous: WAL 下 NORMAL 在断电时最多丢失最后几个事务，但不会损坏数据库
+        mmap_size: 内存映射读取的字节数，0 关闭
+        cache_size_kb: 每个连接的页缓存 (KiB)
+        pool_size / max_overflow: 连接池大小
+    """
+    busy_timeout = DEFAULT_BUSY_TIMEOUT if busy_timeout is None else busy_timeout
+    mmap_size = DEFAULT_MMAP_SIZE if mmap_size is None else mmap_size
+    cache_size_kb = DEFAULT_CACHE_SIZE_KB if cache_size_kb is None else cache_size_kb
+    url = sqlite_url(path_or_url)
+
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # 内存库每个连接各自独立，不使用连接池参数
+        engine = create_engine(url, **kwargs)
+    else:
+        engine = create_engine(
+            url,
+            connect_args={"timeout": busy_timeout, "check_same_thread": False},
+            pool_size=pool_size or DEFAULT_POOL_SIZE,
+            max_overflow=max_overflow,
+            pool_pre_ping=False,
+            **kwargs,
+        )
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        cursor.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={-int(cache_size_kb)}")  # 负数表示 KiB
+        cursor.execute(f"PRAGMA foreign_keys={'ON' if foreign_keys else 'OFF'}")
+        cursor.close()
+
+    return engine
+
+
+@contextmanager
+def session_scope(session_factory) -> Iterator[Session]:
+    """
+    一个工作单元的会话：正常结束时提交，异常时回滚，最后关闭并把连接还给连接池
+        with session_scope(SessionLocal) as db:
+            FinanceRepository(db).save_pivot_data(...)
+    """
+    session = session_factory()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,64 @@
+"""
+指标 / 公司搜索索引
+metric_search 是 SQLite FTS5 虚拟表，每个 (类别, 公司, 指标) 一行，索引 ticker、metric_id、metric_label
+以及该指标的别名（OCR 别名 METRIC_ALIASES 中映射到该标签的写法、config.py 中的英文 id），
+保存时在同一事务中写入，删除类别时同步删除。
+
+分词器为 trigram：任意子串匹配（中文无需分词，"股收益" 能命中 "每股收益 (EPS)"），大小写不敏感。
+trigram 只能索引不少于 3 个字符的词，更短的词改用 LIKE 在同一张表上过滤。
+SQLite 未编译 FTS5 或不支持 trigram（3.34 之前）时不建表，搜索退回到分类表上的 LIKE 查询
+"""
+from typing import Dict, List, Tuple
+
+METRIC_SEARCH_TABLE = "metric_search"
+METRIC_SEARCH_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {METRIC_SEARCH_TABLE} USING fts5("
+    "ticker, category UNINDEXED, metric_id, metric_label, aliases, tokenize = 'trigram')"
+)
+# trigram 分词器能用索引匹配的最短词长
+MIN_MATCH_LENGTH = 3
+
+_alias_index: Dict[str, str] = None
+
+
+def _build_alias_index() -> Dict[str, str]:
+    """指标标签 -> 空格分隔的别名"""
+    # 放在函数内导入：ocr_service 只在首次用到别名时加载
+    from backend.app.services.ocr_service import METRIC_ALIASES
+    from backend.config.config import FINANCIAL_METRICS
+
+    aliases: Dict[str, List[str]] = {}
+    for alias, label in METRIC_ALIASES.items():
+        aliases.setdefault(label, []).append(alias)
+    for metric in FINANCIAL_METRICS:
+        aliases.setdefault(metric["label"], []).append(metric["id"])
+    return {label: " ".join(names) for label, names in aliases.items()}
+
+
+def metric_aliases(label: str) -> str:
+    """该指标标签的别名文本，没有别名时为空串"""
+    global _alias_index
+    if _alias_index is None:
+        _alias_index = _build_alias_index()
+    return _alias_index.get(label or "", "")
+
+
+def search_terms(query: str) -> Tuple[List[str], List[str]]:
+    """
+    按空白拆分查询，返回 (FTS MATCH 词, LIKE 词)；所有词之间为 AND 关系
+    """
+    match_terms, like_terms = [], []
+    for term in (query or "").split():
+        (match_terms if len(term) >= MIN_MATCH_LENGTH else like_terms).append(term)
+    return match_terms, like_terms
+
+
+def fts_match_expression(terms: List[str]) -> str:
+    """每个词作为短语（双引号转义），避免用户输入被解析为 FTS5 运算符"""
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def like_pattern(term: str) -> str:
+    """子串匹配的 LIKE 模式（转义字符为反斜杠）"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
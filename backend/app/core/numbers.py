@@ -0,0 +1,55 @@
+"""
+财务数值文本解析
+OCR 识别出的单元格是 "1,234.5"、"12.3亿"、"-5.6%"、"(1.2)"、"--" 这类文本，
+写入 observations.value (REAL) 前统一转成 float
+"""
+import re
+from typing import Optional
+
+# 中文数量单位
+UNIT_MULTIPLIERS = {
+    "万亿": 1e12,
+    "亿": 1e8,
+    "万": 1e4,
+}
+
+# 表示空值的占位符
+EMPTY_MARKERS = {"", "-", "--", "—", "——", "N/A", "NA", "n/a", "None", "nan"}
+
+_NUMBER_RE = re.compile(r"^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$")
+
+
+def parse_numeric(text) -> Optional[float]:
+    """
+    单元格文本转 float，无法解析时返回 None
+    - 去掉千分位逗号和空格；"%" 只去掉符号（指标标签本身已注明单位为 %）
+    - 亿 / 万 / 万亿 换算为绝对值
+    - 会计格式的括号负数 "(1.2)" 视为 -1.2
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return None if text != text else float(text)  # NaN
+
+    s = str(text).strip()
+    if s in EMPTY_MARKERS:
+        return None
+    s = s.replace(",", "").replace("，", "").replace(" ", "").replace("−", "-")
+
+    negative = False
+    if s.startswith("(") and s.endswith(")") or s.startswith("（") and s.endswith("）"):
+        negative = True
+        s = s[1:-1]
+    s = s.rstrip("%％")
+
+    multiplier = 1.0
+    for unit, factor in UNIT_MULTIPLIERS.items():
+        if s.endswith(unit):
+            multiplier = factor
+            s = s[:-len(unit)]
+            break
+
+    if not _NUMBER_RE.match(s):
+        return None
+    value = float(s) * multiplier
+    return -value if negative else value
@@ -0,0 +1,34 @@
+"""
+季度数值的紧凑二进制存储
+分类表每行的 period_data 是 {"2024/Q1": "0.6", ...} 文本，季度键在每行重复、数值存为字符串。
+紧凑格式为每个 (类别, 公司) 保存一条共享的季度轴 (period_axes.periods)，
+每个指标行保存按轴排列的 float64 小端字节串 (period_values)，缺失或无法解析为 NaN，
+读取时 np.frombuffer 直接引用字节串，无需 JSON 解析
+"""
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from backend.app.core.numbers import parse_numeric
+from backend.app.core.periods import period_sort_key
+
+PACKED_DTYPE = np.dtype("<f8")
+
+
+def build_axis(period_sets: Iterable[Iterable[str]]) -> List[str]:
+    """多个指标行的季度并集，按时间顺序排列"""
+    periods = set()
+    for s in period_sets:
+        periods.update(s)
+    return sorted(periods, key=period_sort_key)
+
+
+def pack_values(period_data: Dict[str, str], axis: List[str]) -> bytes:
+    """按轴顺序把单元格文本解析为 float64 并打包"""
+    values = [parse_numeric(period_data.get(p)) for p in axis]
+    return np.array([np.nan if v is None else v for v in values], dtype=PACKED_DTYPE).tobytes()
+
+
+def unpack_values(blob: bytes) -> np.ndarray:
+    """零拷贝读取（只读视图）"""
+    return np.frombuffer(blob or b"", dtype=PACKED_DTYPE)
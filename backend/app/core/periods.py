@@ -0,0 +1,98 @@
+"""
+季度标记解析与排序
+OCR 解析 (_do_parse_multi_image) 输出的季度表头规范化为 "2024/Q1"、"2024/H1"、"2024/FY"，
+以及按用户要求保留的月份标记 "2024/09"。字符串排序会得到 FY < H1 < Q1 的错误顺序，
+这里按期末月份转换为可排序、可建索引的整数序号：
+
+    ordinal = 年 * 10000 + 期末月份 * 100 + 类型
+
+同一期末月份内按 月份 < 季度 < 半年 < 全年 排列，例如
+    2023/Q1 < 2023/Q2 < 2023/H1 < 2023/09 < 2023/Q3 < 2023/Q4 < 2023/H2 < 2023/FY
+"""
+import re
+from datetime import date
+from typing import NamedTuple, Optional, Tuple
+
+# 类型（同一期末月份内的次序）
+KIND_MONTH = 1
+KIND_QUARTER = 2
+KIND_HALF = 3
+KIND_FISCAL_YEAR = 4
+
+# 无法识别的标记：有年份时排在该年末尾，没有年份时排在最后
+UNKNOWN_IN_YEAR = 9999
+UNKNOWN_ORDINAL = 99999999
+
+_PERIOD_RE = re.compile(r"^(\d{4})[/-]?(Q[1-4]|H[12]|FY|\d{2})$")
+_YEAR_RE = re.compile(r"^(\d{4})")
+# OCR 识别的截止日期写法："2024/04/27"、"2024-4-27"、"2024.04.27"、"2024年4月27日"
+_DATE_RE = re.compile(r"^(\d{4})\s*[年/.-]\s*(\d{1,2})\s*[月/.-]\s*(\d{1,2})\s*日?$")
+
+
+class Period(NamedTuple):
+    year: int
+    kind: int
+    index: int   # 季度 1-4 / 半年 1-2 / 月份 1-12 / 全年 1
+
+    @property
+    def end_month(self) -> int:
+        if self.kind == KIND_QUARTER:
+            return self.index * 3
+        if self.kind == KIND_HALF:
+            return self.index * 6
+        if self.kind == KIND_FISCAL_YEAR:
+            return 12
+        return self.index
+
+    @property
+    def ordinal(self) -> int:
+        return self.year * 10000 + self.end_month * 100 + self.kind
+
+
+def parse_period(token: str) -> Optional[Period]:
+    """解析季度标记，无法识别时返回 None"""
+    if not token:
+        return None
+    match = _PERIOD_RE.match(str(token).strip().upper())
+    if not match:
+        return None
+    year, suffix = int(match.group(1)), match.group(2)
+    if suffix == "FY":
+        return Period(year, KIND_FISCAL_YEAR, 1)
+    if suffix[0] == "Q":
+        return Period(year, KIND_QUARTER, int(suffix[1]))
+    if suffix[0] == "H":
+        return Period(year, KIND_HALF, int(suffix[1]))
+    month = int(suffix)
+    if not 1 <= month <= 12:
+        return None
+    return Period(year, KIND_MONTH, month)
+
+
+def period_ordinal(token: str) -> int:
+    """季度标记转排序序号；无法识别的标记按年份排在该年末尾，没有年份时排在最后"""
+    period = parse_period(token)
+    if period:
+        return period.ordinal
+    year = _YEAR_RE.match(str(token or "").strip())
+    return int(year.group(1)) * 10000 + UNKNOWN_IN_YEAR if year else UNKNOWN_ORDINAL
+
+
+def period_sort_key(token: str) -> Tuple[int, str]:
+    """sorted() 的 key：按时间顺序，序号相同时按原文本"""
+    return period_ordinal(token), str(token)
+
+
+def sort_periods(tokens) -> list:
+    return sorted(tokens, key=period_sort_key)
+
+
+def normalize_date(text: str) -> Optional[str]:
+    """日期文本规范化为 ISO 格式 "2024-04-27"（可按字符串比较、建索引），无法识别时返回 None"""
+    match = _DATE_RE.match(str(text or "").strip())
+    if not match:
+        return None
+    try:
+        return date(*(int(g) for g in match.groups())).isoformat()
+    except ValueError:
+        return None
@@ -2,7 +2,8 @@
 财务数据模型 - Pivot Format
 按类别分表存储，格式与预览表一致
 """
-from sqlalchemy import create_engine, Column, Integer, String, Float, Text
+from sqlalchemy import Column, Integer, String, Float, Text, Index, LargeBinary, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -12,9 +13,14 @@ import json
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
 
-# 数据库路径
+from backend.app.core.database import create_sqlite_engine, session_scope as _session_scope
+from backend.app.core.periods import normalize_date, period_ordinal
+from backend.app.core.metric_search import METRIC_SEARCH_DDL, METRIC_SEARCH_TABLE, metric_aliases
+
+# 数据库路径（可用环境变量 SKETCHFINANCE_DB 指定其他文件）
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-DATABASE_URL = f"sqlite:///{os.path.join(PROJECT_ROOT, 'finance.db')}"
+DATABASE_PATH = os.environ.get("SKETCHFINANCE_DB", os.path.join(PROJECT_ROOT, 'finance.db'))
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
 Base = declarative_base()
 
@@ -26,6 +32,9 @@ Base = declarative_base()
 class IncomeStatementModel(Base):
     """利润表"""
     __tablename__ = "income_statement"
+    __table_args__ = (
+        Index("uq_income_statement_ticker_metric", "ticker", "metric_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     ticker = Column(String, index=True, default="Unknown")
@@ -35,11 +44,16 @@ class IncomeStatementModel(Base):
     period_data = Column(Text, default="{}")
     # 每季度截止日期也存储为 JSON: {"2024/Q1": "2024/04/27", ...}
     period_dates = Column(Text, default="{}")
+    # 紧凑格式：按 period_axes 季度轴排列的 float64 字节串（见 backend.app.core.packed）
+    period_values = Column(LargeBinary)
 
 
 class BalanceSheetModel(Base):
     """资产负债表"""
     __tablename__ = "balance_sheet"
+    __table_args__ = (
+        Index("uq_balance_sheet_ticker_metric", "ticker", "metric_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     ticker = Column(String, index=True, default="Unknown")
@@ -47,11 +61,15 @@ class BalanceSheetModel(Base):
     metric_label = Column(String)
     period_data = Column(Text, default="{}")
     period_dates = Column(Text, default="{}")
+    period_values = Column(LargeBinary)
 
 
 class CashFlowModel(Base):
     """现金流量表"""
     __tablename__ = "cash_flow"
+    __table_args__ = (
+        Index("uq_cash_flow_ticker_metric", "ticker", "metric_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     ticker = Column(String, index=True, default="Unknown")
@@ -59,11 +77,15 @@ class CashFlowModel(Base):
     metric_label = Column(String)
     period_data = Column(Text, default="{}")
     period_dates = Column(Text, default="{}")
+    period_values = Column(LargeBinary)
 
 
 class KeyRatiosModel(Base):
     """关键指标"""
     __tablename__ = "key_ratios"
+    __table_args__ = (
+        Index("uq_key_ratios_ticker_metric", "ticker", "metric_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     ticker = Column(String, index=True, default="Unknown")
@@ -71,6 +93,115 @@ class KeyRatiosModel(Base):
     metric_label = Column(String)
     period_data = Column(Text, default="{}")
     period_dates = Column(Text, default="{}")
+    period_values = Column(LargeBinary)
+
+
+# =============================================================================
+# 长格式观测表
+# 每行一个 (公司, 类别, 指标, 季度) 单元格；按季度或跨公司查询时无需解析 JSON
+# =============================================================================
+
+class ObservationModel(Base):
+    """财务数据观测值"""
+    __tablename__ = "observations"
+
+    id = Column(Integer, primary_key=True)
+    ticker = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    metric_id = Column(String, nullable=False)
+    metric_label = Column(String)
+    period = Column(String, nullable=False)          # e.g., "2024/Q1"
+    period_ordinal = Column(Integer)                 # 按时间排序的序号，见 backend.app.core.periods
+    value = Column(Float)                            # 解析后的数值，无法解析时为 NULL
+    raw_text = Column(Text)                          # 原始单元格文本，Pivot 视图原样返回
+    report_date = Column(String)                     # 截止日期 e.g., "2024/04/27"
+
+    __table_args__ = (
+        # 列顺序与 Pivot 读取的 WHERE category GROUP BY ticker, metric_id 一致，分组按索引顺序进行，无需排序
+        Index("uq_observations_cell", "category", "ticker", "metric_id", "period", unique=True),
+        Index("ix_observations_category_period", "category", "period", "ticker"),
+        Index("ix_observations_metric_period", "metric_id", "period"),
+        # 按时间排序分页、季度区间 BETWEEN 扫描
+        Index("ix_observations_cell_ordinal", "category", "ticker", "metric_id", "period_ordinal"),
+        Index("ix_observations_metric_ordinal", "category", "metric_id", "period_ordinal"),
+    )
+
+
+class MigrationStateModel(Base):
+    """在线迁移进度：每个分类表一行，记录已迁移到的 id"""
+    __tablename__ = "migration_state"
+
+    name = Column(String, primary_key=True)          # e.g., "observations:利润表"
+    last_id = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Float)
+
+
+class DataVersionModel(Base):
+    """
+    每个类别的数据版本：保存 / 删除 / 迁移在写入事务内更新，进程内的 Pivot 读缓存
+    读取前比较版本，其他进程的写入同样使缓存失效。没有行时读缓存不生效
+    """
+    __tablename__ = "data_versions"
+
+    category = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+
+class PeriodAxisModel(Base):
+    """紧凑格式的季度轴：每个 (类别, 公司) 一行，该公司所有指标行的 period_values 按此顺序排列"""
+    __tablename__ = "period_axes"
+    __table_args__ = (
+        Index("uq_period_axes_category_ticker", "category", "ticker", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    category = Column(String, nullable=False)
+    ticker = Column(String, nullable=False)
+    periods = Column(Text, nullable=False, default="[]")   # JSON 列表，按时间顺序
+
+
+class ChangeLogModel(Base):
+    """
+    变更日志（只追加）：保存/删除在同一事务中写入，下游按 seq 增量同步
+    seq 为 AUTOINCREMENT 主键，写入经写锁串行化，因此按 seq 顺序即提交顺序，且删除旧日志后不会复用
+    """
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_category_seq", "category", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True)
+    ticker = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    metric_id = Column(String, nullable=False)
+    period = Column(String, nullable=False)
+    old_value = Column(Text)                         # 原始文本，新增时为 NULL
+    new_value = Column(Text)                         # 原始文本，删除时为 NULL
+    changed_at = Column(Float, nullable=False)       # epoch 秒
+
+
+class PeriodCalendarModel(Base):
+    """
+    季度日历：每个 (类别, 公司, 季度) 一行保存截止日期与披露日期（ISO 格式），
+    取代逐指标行重复的 period_dates 用于按日期范围查询；两个日期列各有索引，区间查询走索引扫描
+    """
+    __tablename__ = "period_calendar"
+    __table_args__ = (
+        # 唯一键以 ticker 开头：只按类别过滤的区间查询不会误用唯一键代替日期索引
+        Index("uq_period_calendar_key", "ticker", "category", "period", unique=True),
+        Index("ix_period_calendar_end", "period_end", "category", "ticker"),
+        Index("ix_period_calendar_disclosure", "disclosure_date", "category", "ticker"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    ticker = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    period = Column(String, nullable=False)          # e.g., "2024/Q1"
+    period_ordinal = Column(Integer)                 # 见 backend.app.core.periods
+    period_end = Column(String)                      # 截止日期 e.g., "2024-04-27"
+    disclosure_date = Column(String)                 # 首次披露日期（多次保存时保留最早的）
 
 
 # 类别到模型的映射
@@ -81,14 +212,239 @@ CATEGORY_MODEL_MAP = {
     "关键指标": KeyRatiosModel,
 }
 
-engine = create_engine(DATABASE_URL)
+engine = create_sqlite_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def init_db():
-    """初始化数据库（创建所有表）"""
-    Base.metadata.create_all(bind=engine)
+
+def session_scope(session_factory=None):
+    """默认数据库上的一个工作单元会话，见 backend.app.core.database.session_scope"""
+    return _session_scope(session_factory or SessionLocal)
+
+
+def init_db(bind=None):
+    """初始化数据库（创建所有表，并为旧库补建 (ticker, metric_id) 唯一索引）"""
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    ensure_unique_metric_index(bind)
+    ensure_period_ordinal(bind)
+    ensure_observation_state(bind)
+    ensure_packed_values(bind)
+    ensure_metric_search(bind)
+    ensure_period_calendar(bind)
+
+
+def observation_state_name(category: str) -> str:
+    return f"observations:{category}"
+
+
+def packed_state_name(category: str) -> str:
+    return f"packed:{category}"
+
+
+def bump_data_version(conn, category: str):
+    """
+    在当前写入事务内更新类别的数据版本
+    取随机值而非递增：数据库被重建（reset_db / 替换文件）后版本从头开始时，旧进程中的缓存项也不会误命中
+    """
+    conn.execute(text(
+        "INSERT INTO data_versions (category, version) VALUES (:category, random()) "
+        "ON CONFLICT (category) DO UPDATE SET version = random()"
+    ), {"category": category})
+
+
+# 未迁移提示每个进程只打印一次（Streamlit 每次交互都会重新执行脚本并调用 init_db）
+_migration_hint_shown = False
+
+
+def ensure_observation_state(bind):
+    """
+    新库（分类表为空）直接标记 observations 迁移完成；
+    已有数据的旧库保持未完成，由 `cli migrate` 在线迁移，迁移完成前 Pivot 读取仍走旧表
+    """
+    global _migration_hint_shown
+    pending = []
+    with bind.begin() as conn:
+        states = {row[0] for row in conn.execute(text("SELECT name FROM migration_state"))}
+        for category, Model in CATEGORY_MODEL_MAP.items():
+            name = observation_state_name(category)
+            if name in states:
+                continue
+            if conn.execute(text(f"SELECT 1 FROM {Model.__tablename__} LIMIT 1")).first() is None:
+                conn.execute(text(
+                    "INSERT INTO migration_state (name, last_id, done) VALUES (:name, 0, 1)"
+                ), {"name": name})
+            else:
+                pending.append(category)
+    if pending and not _migration_hint_shown:
+        _migration_hint_shown = True
+        print(f"{'、'.join(pending)} 尚未迁移到 observations 表，请运行: python -m backend.app.cli migrate")
+
+
+def ensure_packed_values(bind):
+    """
+    旧库的分类表补 period_values 列；新库（分类表为空）直接标记紧凑格式可用，
+    已有数据的旧库由 `cli pack` 回填后才用于 numeric 读取
+    """
+    with bind.begin() as conn:
+        states = {row[0] for row in conn.execute(text("SELECT name FROM migration_state"))}
+        for category, Model in CATEGORY_MODEL_MAP.items():
+            table = Model.__tablename__
+            columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+            if "period_values" not in columns:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN period_values BLOB"))
+            name = packed_state_name(category)
+            if name in states:
+                continue
+            if conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() is None:
+                conn.execute(text(
+                    "INSERT INTO migration_state (name, last_id, done) VALUES (:name, 0, 1)"
+                ), {"name": name})
+
+
+def ensure_unique_metric_index(bind) -> int:
+    """
+    旧数据库的分类表没有 (ticker, metric_id) 唯一约束，可能存在重复行。
+    建索引前先按 id 顺序合并重复行的 period_data / period_dates（后写入的覆盖先写入的），
+    保留 id 最小的一行。返回删除的重复行数
+    """
+    removed = 0
+    with bind.begin() as conn:
+        for Model in CATEGORY_MODEL_MAP.values():
+            table = Model.__tablename__
+            index = next(i for i in Model.__table__.indexes if i.unique)
+            existing = {row[1] for row in conn.execute(text(f"PRAGMA index_list({table})"))}
+            if index.name in existing:
+                continue
+
+            dupes = conn.execute(text(
+                f"SELECT ticker, metric_id FROM {table} GROUP BY ticker, metric_id HAVING COUNT(*) > 1"
+            )).all()
+            for ticker, metric_id in dupes:
+                rows = conn.execute(text(
+                    f"SELECT id, period_data, period_dates FROM {table} "
+                    f"WHERE ticker IS :ticker AND metric_id IS :metric_id ORDER BY id"
+                ), {"ticker": ticker, "metric_id": metric_id}).all()
+                period_data, period_dates = {}, {}
+                for _, data, dates in rows:
+                    period_data.update(json.loads(data or "{}"))
+                    period_dates.update(json.loads(dates or "{}"))
+                conn.execute(text(f"UPDATE {table} SET period_data = :data, period_dates = :dates WHERE id = :id"), {
+                    "id": rows[0][0],
+                    "data": json.dumps(period_data, ensure_ascii=False),
+                    "dates": json.dumps(period_dates, ensure_ascii=False),
+                })
+                conn.execute(text(f"DELETE FROM {table} WHERE id IN ({','.join(str(r[0]) for r in rows[1:])})"))
+                removed += len(rows) - 1
+            index.create(bind=conn)
+    if removed:
+        print(f"合并了 {removed} 条重复指标行")
+    return removed
+
+
+PERIOD_ORDINAL_STATE = "period_ordinal"
+
+
+def ensure_period_ordinal(bind) -> int:
+    """
+    旧库的 observations 没有 period_ordinal 列：补列、一条 UPDATE 回填（序号由注册到连接上的
+    Python 函数计算）、补建索引，完成后记入 migration_state。之后的写入都带序号，
+    已完成时只读一次 migration_state，不再取写锁。返回回填的行数
+    """
+    with bind.connect() as conn:
+        if conn.execute(text("SELECT 1 FROM migration_state WHERE name = :name"),
+                        {"name": PERIOD_ORDINAL_STATE}).first() is not None:
+            return 0
+    with bind.begin() as conn:
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(observations)"))}
+        if "period_ordinal" not in columns:
+            conn.execute(text("ALTER TABLE observations ADD COLUMN period_ordinal INTEGER"))
+        conn.connection.driver_connection.create_function("sf_period_ordinal", 1, period_ordinal, deterministic=True)
+        filled = conn.execute(text(
+            "UPDATE observations SET period_ordinal = sf_period_ordinal(period) WHERE period_ordinal IS NULL"
+        )).rowcount
+        for index in ObservationModel.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+        conn.execute(text(
+            "INSERT OR IGNORE INTO migration_state (name, last_id, done) VALUES (:name, 0, 1)"
+        ), {"name": PERIOD_ORDINAL_STATE})
+    return filled
+
+
+PERIOD_CALENDAR_STATE = "period_calendar"
+
+
+def ensure_period_calendar(bind) -> int:
+    """
+    季度日历回填：旧库的截止日期只存在于分类表各指标行的 period_dates 中，
+    按 id 顺序展开写入（同一季度后写入的覆盖先写入的，与保存时的合并规则一致），完成后记入 migration_state。
+    无法识别的日期文本不写入。返回回填的日期条数
+    """
+    filled = 0
+    with bind.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM migration_state WHERE name = :name"),
+                        {"name": PERIOD_CALENDAR_STATE}).first() is not None:
+            return 0
+        driver = conn.connection.driver_connection
+        driver.create_function("sf_period_ordinal", 1, period_ordinal, deterministic=True)
+        driver.create_function("sf_normalize_date", 1, normalize_date, deterministic=True)
+        for category, Model in CATEGORY_MODEL_MAP.items():
+            filled += conn.execute(text(
+                f"INSERT INTO period_calendar (ticker, category, period, period_ordinal, period_end) "
+                f"SELECT t.ticker, :category, j.key, sf_period_ordinal(j.key), sf_normalize_date(j.value) "
+                f"FROM {Model.__tablename__} t, json_each(COALESCE(NULLIF(t.period_dates, ''), '{{}}')) j "
+                f"WHERE sf_normalize_date(j.value) IS NOT NULL ORDER BY t.id "
+                f"ON CONFLICT (ticker, category, period) DO UPDATE "
+                f"SET period_end = excluded.period_end"
+            ), {"category": category}).rowcount
+        conn.execute(text(
+            "INSERT INTO migration_state (name, last_id, done) VALUES (:name, 0, 1)"
+        ), {"name": PERIOD_CALENDAR_STATE})
+    return filled
+
+
+def metric_search_available(conn) -> bool:
+    """搜索索引表是否存在（SQLite 不支持 FTS5 trigram 时不建表）"""
+    return conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+    ), {"name": METRIC_SEARCH_TABLE}).first() is not None
+
+
+# SQLite 库不支持 FTS5 trigram 时记下，之后的 init_db 不再重试建表、不再重复提示（进程内的 SQLite 库不会变化）
+_metric_search_unsupported = False
+
+
+def ensure_metric_search(bind) -> int:
+    """
+    建立 metric_search 全文索引（FTS5 trigram）；新建时从分类表回填已有指标行
+    （别名由注册到连接上的 Python 函数计算）。返回回填的行数，SQLite 不支持时只提示一次并返回 0
+    """
+    global _metric_search_unsupported
+    if _metric_search_unsupported:
+        return 0
+    with bind.begin() as conn:
+        if metric_search_available(conn):
+            return 0
+        try:
+            conn.execute(text(METRIC_SEARCH_DDL))
+        except OperationalError as e:
+            _metric_search_unsupported = True
+            print(f"SQLite 不支持 FTS5 trigram ({e})，指标搜索将使用 LIKE 查询")
+            return 0
+        conn.connection.driver_connection.create_function("sf_metric_aliases", 1, metric_aliases, deterministic=True)
+        filled = 0
+        for category, Model in CATEGORY_MODEL_MAP.items():
+            filled += conn.execute(text(
+                f"INSERT INTO {METRIC_SEARCH_TABLE} (ticker, category, metric_id, metric_label, aliases) "
+                f"SELECT ticker, :category, COALESCE(metric_id, metric_label), metric_label, sf_metric_aliases(metric_label) "
+                f"FROM {Model.__tablename__} ORDER BY id"
+            ), {"category": category}).rowcount
+    return filled
+
 
 def reset_db():
     """重置数据库（删除并重新创建所有表）"""
     Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {METRIC_SEARCH_TABLE}"))
     Base.metadata.create_all(bind=engine)
+    ensure_metric_search(engine)
@@ -0,0 +1,65 @@
+"""
+OCR 任务队列数据模型
+独立的 SQLite 文件 (ocr_jobs.db，位于 finance.db 旁)，不依赖外部消息中间件，
+多个 worker 进程（或共享文件系统的多台机器）通过租约 (lease) 领取任务
+"""
+from sqlalchemy import Column, Integer, String, Float, Text, Index
+from sqlalchemy.ext.declarative import declarative_base
+import os
+
+# 队列数据库路径
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+JOB_DATABASE_PATH = os.path.join(PROJECT_ROOT, "ocr_jobs.db")
+
+JobBase = declarative_base()
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class OCRJobModel(JobBase):
+    """OCR 任务：一组 (季度, 科目, 数据) 截图"""
+    __tablename__ = "ocr_jobs"
+
+    id = Column(Integer, primary_key=True)
+    category = Column(String, nullable=False)
+    periods_path = Column(Text, nullable=False)
+    metrics_path = Column(Text, nullable=False)
+    values_path = Column(Text, nullable=False)
+    # 该类别的指标配置 JSON，任务自包含，worker 无需读取 config.py
+    metric_config = Column(Text, default="[]")
+    status = Column(String, nullable=False, default=JOB_QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # 租约：持有者和过期时间 (epoch 秒)，worker 崩溃后租约过期即可被重新领取
+    lease_owner = Column(String)
+    lease_expires = Column(Float)
+    enqueued_at = Column(Float, nullable=False)
+    started_at = Column(Float)
+    finished_at = Column(Float)
+    last_error = Column(Text)
+
+    __table_args__ = (
+        Index("ix_ocr_jobs_status_lease", "status", "lease_expires"),
+    )
+
+
+class OCRJobResultModel(JobBase):
+    """OCR 任务结果"""
+    __tablename__ = "ocr_job_results"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, nullable=False, unique=True)
+    worker_id = Column(String, nullable=False)
+    # parse_multi_image 返回的 parsed_data JSON
+    parsed_data = Column(Text, default="[]")
+    disclosure_date = Column(String, default="")
+    elapsed = Column(Float)
+    finished_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_ocr_job_results_worker", "worker_id", "finished_at"),
+    )
@@ -2,27 +2,91 @@
 财务数据仓库 - Pivot Format
 支持按类别分表存储和读取
 """
+from sqlalchemy import func, insert, select, text, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from backend.app.models.finance_model import (
     CATEGORY_MODEL_MAP, 
     IncomeStatementModel, 
     BalanceSheetModel, 
     CashFlowModel, 
-    KeyRatiosModel
+    KeyRatiosModel,
+    ObservationModel,
+    MigrationStateModel,
+    ChangeLogModel,
+    DataVersionModel,
+    PeriodAxisModel,
+    PeriodCalendarModel,
+    packed_state_name,
+    observation_state_name,
+    bump_data_version,
+    metric_search_available,
 )
+from backend.app.core.metric_search import (
+    METRIC_SEARCH_TABLE, fts_match_expression, like_pattern, metric_aliases, search_terms,
+)
+from backend.app.core.numbers import parse_numeric
+from backend.app.core.packed import build_axis, pack_values, unpack_values
+from backend.app.core.periods import normalize_date, parse_period, period_ordinal, period_sort_key
+from backend.app.repositories.read_cache import PIVOT_CACHE
+import base64
 import json
+import time
+import numpy as np
 import pandas as pd
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional
+
+def build_observation_rows(category: str, ticker: str, metric_id: str, metric_label: str,
+                           period_data: Dict[str, str], period_dates: Dict[str, str]) -> List[Dict]:
+    """一条分类表记录（JSON 格式）展开为 observations 行"""
+    return [
+        {
+            "ticker": ticker,
+            "category": category,
+            "metric_id": metric_id,
+            "metric_label": metric_label,
+            "period": period,
+            "period_ordinal": period_ordinal(period),
+            "value": parse_numeric(raw_text),
+            "raw_text": raw_text,
+            "report_date": period_dates.get(period),
+        }
+        for period, raw_text in period_data.items()
+    ]
+
+
+def upsert_observations(db, rows: List[Dict]):
+    """按 (ticker, category, metric_id, period) 批量写入 observations；db 为 Session 或 Connection"""
+    if not rows:
+        return
+    stmt = sqlite_insert(ObservationModel)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[ObservationModel.ticker, ObservationModel.category,
+                        ObservationModel.metric_id, ObservationModel.period],
+        set_={
+            "metric_label": stmt.excluded.metric_label,
+            "value": stmt.excluded.value,
+            "raw_text": stmt.excluded.raw_text,
+            "report_date": stmt.excluded.report_date,
+        },
+    ), rows)
+
 
 class FinanceRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, use_cache: bool = True):
         self.db = db
+        # get_pivot_data 使用进程级版本缓存
+        self.use_cache = use_cache
+        # 本实例已写入但尚未提交的类别：提交后递增缓存版本；提交前的读取不经缓存（会读到未提交数据）
+        self._dirty_categories = set()
+        self._search_index = None   # metric_search 表是否存在，首次用到时查询
 
     def _get_model_for_category(self, category: str):
         """获取类别对应的模型类"""
         return CATEGORY_MODEL_MAP.get(category)
 
-    def save_pivot_data(self, category: str, ticker: str, pivot_df: pd.DataFrame, period_dates: Dict[str, str] = None):
+    def save_pivot_data(self, category: str, ticker: str, pivot_df: pd.DataFrame, period_dates: Dict[str, str] = None,
+                        disclosure_date: str = None) -> int:
         """
         保存 Pivot 格式数据到数据库
         
@@ -31,101 +95,775 @@ class FinanceRepository:
             ticker: 股票代码
             pivot_df: 透视表 DataFrame (index=metric_label, columns=periods)
             period_dates: 每季度截止日期字典 {"2024/Q1": "2024/04/27", ...}
+            disclosure_date: 可选，本次保存的报表披露日期，记入所含各季度的季度日历
+
+        Returns:
+            实际写入（新增或有变化）的指标行数
+        """
+        changed = self._stage_pivot_data(category, ticker, pivot_df, period_dates, disclosure_date)
+        self._commit()
+        return changed
+
+    def save_records(self, category: str, ticker: str, records: List[Dict], period_dates: Dict[str, str] = None,
+                     disclosure_date: str = None) -> int:
+        """
+        保存长格式记录（OCR parsed_data / CSV 导入），无需先转成透视表
+
+        Args:
+            records: [{"metric_id": ..., "period": "2024/Q1", "value": "0.6",
+                       "metric_label": 可选, "report_date": 可选}, ...]
+            period_dates: 额外的季度截止日期，与记录中的 report_date 合并
+            disclosure_date: 可选，报表披露日期
+
+        Returns:
+            实际写入的指标行数
+        """
+        changed = self._stage_records(category, ticker, records, period_dates, disclosure_date)
+        self._commit()
+        return changed
+
+    def save_pivot_batch(self, items: List[Dict]) -> int:
+        """
+        在同一个事务中保存多个类别的 Pivot 数据（批量识别后一次性入库）
+
+        Args:
+            items: [{"category": ..., "ticker": ..., "pivot_df": ..., "period_dates": {...}}, ...]
+                   也可用 "records" (长格式记录) 代替 "pivot_df"；可选 "disclosure_date"
+
+        Returns:
+            保存的类别数；任一类别失败时整体回滚
+        """
+        try:
+            for item in items:
+                if "records" in item:
+                    self._stage_records(item["category"], item["ticker"], item["records"], item.get("period_dates"),
+                                        item.get("disclosure_date"))
+                else:
+                    self._stage_pivot_data(
+                        item["category"],
+                        item["ticker"],
+                        item["pivot_df"],
+                        item.get("period_dates"),
+                        item.get("disclosure_date"),
+                    )
+            self._commit()
+        except Exception:
+            self.db.rollback()
+            self._dirty_categories.clear()
+            raise
+        return len(items)
+
+    @staticmethod
+    def pivot_to_records(pivot_df: pd.DataFrame) -> List[Dict]:
+        """透视表转长格式记录，跳过"截止日期"行和空单元格"""
+        body = pivot_df.drop(index="截止日期", errors="ignore")
+        if body.empty:
+            return []
+        cells = body.stack()
+        cells = cells[cells.notna()].astype(str)
+        cells = cells[cells.str.strip() != ""]
+        return [
+            {"metric_id": metric_label, "metric_label": metric_label, "period": period, "value": value}
+            for (metric_label, period), value in cells.items()
+        ]
+
+    def _stage_pivot_data(self, category: str, ticker: str, pivot_df: pd.DataFrame, period_dates: Dict[str, str] = None,
+                          disclosure_date: str = None) -> int:
+        """将 Pivot 数据写入当前会话（不提交），供单类别和批量保存共用"""
+        if not self._get_model_for_category(category):
+            raise ValueError(f"未知类别: {category}")
+        # 透视表的行名即指标名，metric_id 与 metric_label 相同
+        return self._stage_records(category, ticker, self.pivot_to_records(pivot_df), period_dates, disclosure_date)
+
+    def _stage_records(self, category: str, ticker: str, records: List[Dict], period_dates: Dict[str, str] = None,
+                       disclosure_date: str = None) -> int:
+        """
+        批量 upsert（不提交）：一次查询取出该公司的已有行，逐行比较合并后的 JSON，
+        只对有变化的行执行 INSERT ... ON CONFLICT (ticker, metric_id) DO UPDATE
+        （executemany：语句只编译一次并走编译缓存，比多行 VALUES 快得多）
         """
         Model = self._get_model_for_category(category)
         if not Model:
             raise ValueError(f"未知类别: {category}")
-        
-        period_dates = period_dates or {}
-        
-        # 遍历每个指标行
-        for metric_label in pivot_df.index:
-            # 跳过"截止日期"行
-            if metric_label == "截止日期":
+        disclosure = normalize_date(disclosure_date) if disclosure_date else None
+        if disclosure_date and not disclosure:
+            raise ValueError(f"无法识别的披露日期: {disclosure_date}")
+        self._begin_write()
+
+        period_dates = dict(period_dates or {})
+        new_data: Dict[str, Dict[str, str]] = {}
+        labels: Dict[str, str] = {}
+        for r in records:
+            if r.get("report_date"):
+                period_dates.setdefault(r["period"], r["report_date"])
+            value = r.get("value")
+            if value is None or not str(value).strip():
                 continue
-            
-            # 构建季度数据字典
-            period_data = {}
-            for period in pivot_df.columns:
-                val = pivot_df.loc[metric_label, period]
-                if pd.notna(val) and str(val).strip():
-                    period_data[period] = str(val)
-            
-            if not period_data:
-                continue  # 跳过空行
-            
-            # 查找现有记录
-            existing = self.db.query(Model).filter(
-                Model.ticker == ticker,
-                Model.metric_label == metric_label
-            ).first()
-            
-            if existing:
-                # 合并现有数据和新数据
-                old_data = json.loads(existing.period_data or "{}")
-                old_dates = json.loads(existing.period_dates or "{}")
-                old_data.update(period_data)
-                old_dates.update(period_dates)
-                existing.period_data = json.dumps(old_data, ensure_ascii=False)
-                existing.period_dates = json.dumps(old_dates, ensure_ascii=False)
-            else:
-                # 创建新记录
-                # 尝试从 label 推断 metric_id
-                metric_id = metric_label  # 默认使用 label 作为 id
-                new_record = Model(
-                    ticker=ticker,
-                    metric_id=metric_id,
-                    metric_label=metric_label,
-                    period_data=json.dumps(period_data, ensure_ascii=False),
-                    period_dates=json.dumps(period_dates, ensure_ascii=False)
-                )
-                self.db.add(new_record)
-        
+            metric_id = r["metric_id"]
+            new_data.setdefault(metric_id, {})[r["period"]] = str(value)
+            labels[metric_id] = r.get("metric_label") or labels.get(metric_id) or metric_id
+        if not new_data:
+            return 0
+
+        existing = {
+            metric_id: (label, json.loads(data or "{}"), json.loads(dates or "{}"))
+            for metric_id, label, data, dates in self.db.execute(
+                select(Model.metric_id, Model.metric_label, Model.period_data, Model.period_dates)
+                .where(Model.ticker == ticker)
+            )
+        }
+
+        rows = []
+        merged: Dict[str, Dict[str, str]] = {}
+        observations = []
+        changes = []
+        now = time.time()
+        for metric_id, period_data in new_data.items():
+            old_label, old_data, old_dates = existing.get(metric_id, (None, {}, {}))
+            merged_data = {**old_data, **period_data}
+            merged_dates = {**old_dates, **period_dates}
+            if metric_id in existing and merged_data == old_data and merged_dates == old_dates:
+                continue  # 无变化，不写
+            label = old_label or labels[metric_id]
+            merged[metric_id] = merged_data
+            rows.append({
+                "ticker": ticker,
+                "metric_id": metric_id,
+                "metric_label": label,
+                "period_data": json.dumps(merged_data, ensure_ascii=False),
+                "period_dates": json.dumps(merged_dates, ensure_ascii=False),
+            })
+            # 双写：observations 与分类表在同一事务中更新
+            observations.extend(build_observation_rows(category, ticker, metric_id, label, merged_data, merged_dates))
+            changes.extend(
+                {"ticker": ticker, "category": category, "metric_id": metric_id, "period": period,
+                 "old_value": old_data.get(period), "new_value": value, "changed_at": now}
+                for period, value in period_data.items() if old_data.get(period) != value
+            )
+
+        if rows:
+            # 只有实际写入时才更新数据版本；未提交期间本实例的 Pivot 读取不经缓存
+            self._dirty_categories.add(category)
+            self._stage_packed(category, Model, ticker, existing, rows, merged)
+            stmt = sqlite_insert(Model)
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[Model.ticker, Model.metric_id],
+                set_={"period_data": stmt.excluded.period_data, "period_dates": stmt.excluded.period_dates,
+                      "period_values": stmt.excluded.period_values},
+            ), rows)
+        upsert_observations(self.db, observations)
+        if changes:
+            self.db.execute(insert(ChangeLogModel), changes)
+        # 新指标行写入搜索索引（已有行的标签不会变化，无需更新）
+        self._stage_search(category, ticker, [row for row in rows if row["metric_id"] not in existing])
+        # 截止日期没有变化时（所有行都未改动）日历也不变，无需写入
+        if rows or disclosure:
+            periods = {p for data in new_data.values() for p in data} if disclosure else set()
+            self._stage_calendar(category, ticker, period_dates, periods, disclosure)
+        return len(rows)
+
+    def _stage_calendar(self, category: str, ticker: str, period_dates: Dict[str, str], periods: set,
+                        disclosure: Optional[str]):
+        """
+        季度日历 upsert：截止日期后写入的覆盖先写入的（与 period_dates 合并规则一致），
+        披露日期保留最早的；无法识别的截止日期文本不写入
+        """
+        rows = []
+        for period in sorted(set(period_dates) | periods, key=period_sort_key):
+            period_end = normalize_date(period_dates.get(period))
+            period_disclosure = disclosure if period in periods else None
+            if period_end or period_disclosure:
+                rows.append({"ticker": ticker, "category": category, "period": period,
+                             "period_ordinal": period_ordinal(period), "period_end": period_end,
+                             "disclosure_date": period_disclosure})
+        if not rows:
+            return
+        P = PeriodCalendarModel
+        stmt = sqlite_insert(P)
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[P.ticker, P.category, P.period],
+            set_={
+                "period_end": func.coalesce(stmt.excluded.period_end, P.period_end),
+                # SQLite 多参数 min() 遇 NULL 返回 NULL，两边先 COALESCE
+                "disclosure_date": func.min(
+                    func.coalesce(stmt.excluded.disclosure_date, P.disclosure_date),
+                    func.coalesce(P.disclosure_date, stmt.excluded.disclosure_date),
+                ),
+            },
+        ), rows)
+
+    def _has_search_index(self) -> bool:
+        if self._search_index is None:
+            self._search_index = metric_search_available(self.db)
+        return self._search_index
+
+    def _stage_search(self, category: str, ticker: str, rows: List[Dict]):
+        if not rows or not self._has_search_index():
+            return
+        self.db.execute(text(
+            f"INSERT INTO {METRIC_SEARCH_TABLE} (ticker, category, metric_id, metric_label, aliases) "
+            f"VALUES (:ticker, :category, :metric_id, :metric_label, :aliases)"
+        ), [
+            {"ticker": ticker, "category": category, "metric_id": row["metric_id"],
+             "metric_label": row["metric_label"], "aliases": metric_aliases(row["metric_label"])}
+            for row in rows
+        ])
+
+    def _stage_packed(self, category: str, Model, ticker: str, existing: Dict, rows: List[Dict],
+                      merged: Dict[str, Dict[str, str]]):
+        """
+        紧凑格式与 JSON 同事务更新（填充 rows 的 period_values）：
+        季度轴不变时只打包有变化的行；出现新季度时更新轴并重写该公司其余行
+        """
+        data = {metric_id: old_data for metric_id, (_, old_data, _) in existing.items()}
+        data.update(merged)
+        axis = build_axis(data.values())
+        A = PeriodAxisModel
+        old_axis = self.db.execute(
+            select(A.periods).where(A.category == category, A.ticker == ticker)
+        ).scalar()
+        for row in rows:
+            row["period_values"] = pack_values(merged[row["metric_id"]], axis)
+        if old_axis is not None and json.loads(old_axis) == axis:
+            return
+
+        stmt = sqlite_insert(A).values(category=category, ticker=ticker, periods=json.dumps(axis, ensure_ascii=False))
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[A.category, A.ticker], set_={"periods": stmt.excluded.periods},
+        ))
+        unchanged = [
+            {"t": ticker, "m": metric_id, "v": pack_values(old_data, axis)}
+            for metric_id, old_data in data.items() if metric_id not in merged
+        ]
+        if unchanged:
+            self.db.execute(text(
+                f"UPDATE {Model.__tablename__} SET period_values = :v WHERE ticker = :t AND metric_id = :m"
+            ), unchanged)
+
+    def _db_key(self) -> str:
+        return str(self.db.get_bind().url)
+
+    def _commit(self):
+        """在同一事务中更新本次写入涉及的类别的数据版本并提交（使各进程的读缓存失效）"""
+        for category in self._dirty_categories:
+            bump_data_version(self.db, category)
         self.db.commit()
+        self._dirty_categories.clear()
+
+    def _begin_write(self):
+        """
+        读取-比较-写入之前先取得写锁 (BEGIN IMMEDIATE)，并发写者在 busy_timeout 内排队，
+        不会基于过期的快照覆盖彼此的修改；已在事务中（同一批次的后续类别）时不重复开启
+        """
+        dbapi_conn = self.db.connection().connection.dbapi_connection
+        if not dbapi_conn.in_transaction:
+            dbapi_conn.execute("BEGIN IMMEDIATE")
+
+    def observations_ready(self, category: str) -> bool:
+        """该类别是否已完成向 observations 的迁移（完成后 Pivot 读取走 observations）"""
+        state = self.db.get(MigrationStateModel, observation_state_name(category))
+        return bool(state and state.done)
 
-    def get_pivot_data(self, category: str, ticker: str = None) -> pd.DataFrame:
+    def packed_ready(self, category: str) -> bool:
+        """该类别的 period_values 紧凑格式是否完整（新库或已运行 `cli pack` 回填）"""
+        state = self.db.get(MigrationStateModel, packed_state_name(category))
+        return bool(state and state.done)
+
+    def get_pivot_data(self, category: str, ticker: str = None, numeric: bool = False) -> pd.DataFrame:
         """
         获取指定类别的 Pivot 格式数据
-        
+        同一进程内相同 (category, ticker, numeric) 的读取在该类别数据版本未变时直接返回缓存副本；
+        版本存于 data_versions，由保存/删除/迁移在写入事务内更新，每次读取先查一次版本
+        （其他进程的写入同样生效，绕过本类直接写 SQL 的除外）。
+        本实例在当前事务中写入过的类别直接读库、不写入缓存，事务回滚时其他会话不会读到未提交的数据
+
         Args:
             category: 类别名称
             ticker: 可选，过滤特定股票
-            
+            numeric: True 时季度列为 float64，否则为原始文本
+
         Returns:
             DataFrame with index=metric_label, columns=periods
         """
+        if not self.use_cache or not self._get_model_for_category(category) or category in self._dirty_categories:
+            return self._read_pivot_data(category, ticker, numeric)
+        # 先读版本再读数据：期间有写入提交时缓存的数据比版本新，下次读取即失效
+        version = self.db.execute(select(DataVersionModel.version).where(DataVersionModel.category == category)).scalar()
+        if version is None:
+            return self._read_pivot_data(category, ticker, numeric)
+        return PIVOT_CACHE.get_or_load(
+            self._db_key(), category, version, (ticker, numeric),
+            lambda: self._read_pivot_data(category, ticker, numeric),
+        )
+
+    def _read_pivot_data(self, category: str, ticker: str = None, numeric: bool = False) -> pd.DataFrame:
+        """
+        从数据库读取 Pivot（不经缓存）
+        只执行一条 SQL，经 DB-API 游标逐列填充，不实例化 ORM 对象：
+        - 文本：读取分类表（与 observations 双写）每行一个 JSON，整类读取时比逐单元格读取快
+        - numeric=True 且紧凑格式可用：读取 period_values 字节串，np.frombuffer 按季度轴写入结果矩阵
+        - numeric=True 且已迁移：SQLite 用 json_group_object 把 observations.value 按指标聚合成一行，
+          数值在写入时已解析；都不可用时对文本调用 parse_numeric
+        """
         Model = self._get_model_for_category(category)
         if not Model:
             return pd.DataFrame()
-        
-        query = self.db.query(Model)
+
+        if numeric and self.packed_ready(category):
+            return self._read_packed_pivot(category, Model, ticker)
+        if numeric and self.observations_ready(category):
+            sql = (
+                "SELECT ticker, COALESCE(MIN(metric_label), metric_id), json_group_object(period, value) "
+                "FROM observations WHERE category = ?"
+            )
+            params = [category]
+            if ticker:
+                sql += " AND ticker = ?"
+                params.append(ticker)
+            sql += " GROUP BY ticker, metric_id ORDER BY MIN(id)"
+            parse = False
+        else:
+            sql = f"SELECT ticker, metric_label, period_data FROM {Model.__tablename__}"
+            params = []
+            if ticker:
+                sql += " WHERE ticker = ?"
+                params.append(ticker)
+            sql += " ORDER BY id"
+            parse = numeric
+
+        return self._rows_to_pivot(self._fetch_raw(sql, params), numeric, parse)
+
+    def _fetch_raw(self, sql: str, params: list) -> list:
+        """在当前会话的连接（及事务）上用 DB-API 游标执行只读 SQL"""
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _read_packed_pivot(self, category: str, Model, ticker: str = None) -> pd.DataFrame:
+        """紧凑格式读取：每个公司的指标行字节串拼接后一次 frombuffer，按季度轴位置整体写入"""
+        axis_sql = "SELECT ticker, periods FROM period_axes WHERE category = ?"
+        row_sql = f"SELECT ticker, metric_label, period_values FROM {Model.__tablename__}"
+        axis_params, row_params = [category], []
         if ticker:
-            query = query.filter(Model.ticker == ticker)
-        
-        records = query.all()
-        if not records:
+            axis_sql += " AND ticker = ?"
+            row_sql += " WHERE ticker = ?"
+            axis_params.append(ticker)
+            row_params.append(ticker)
+        rows = self._fetch_raw(row_sql + " ORDER BY id", row_params)
+        if not rows:
             return pd.DataFrame()
-        
-        # 收集所有季度
-        all_periods = set()
-        data_rows = []
-        
-        for r in records:
-            period_data = json.loads(r.period_data or "{}")
-            all_periods.update(period_data.keys())
-            row = {"metric_label": r.metric_label, "ticker": r.ticker}
-            row.update(period_data)
-            data_rows.append(row)
-        
-        df = pd.DataFrame(data_rows)
+        axes = {t: json.loads(periods) for t, periods in self._fetch_raw(axis_sql, axis_params)}
+
+        tickers, labels, blobs = zip(*rows)
+        columns = build_axis(axes.values())
+        position = {p: i for i, p in enumerate(columns)}
+        matrix = np.full((len(rows), len(columns)), np.nan)
+        by_ticker: Dict[str, List[int]] = {}
+        for i, t in enumerate(tickers):
+            by_ticker.setdefault(t, []).append(i)
+        for t, indices in by_ticker.items():
+            axis = axes.get(t, [])
+            width = len(axis)
+            indices = [i for i in indices if blobs[i] is not None and len(blobs[i]) == width * 8]
+            if not width or not indices:
+                continue
+            block = unpack_values(b"".join(blobs[i] for i in indices)).reshape(len(indices), width)
+            matrix[np.ix_(indices, [position[p] for p in axis])] = block
+
+        data = {"ticker": list(tickers)}
+        data.update({p: matrix[:, j] for j, p in enumerate(columns)})
+        return pd.DataFrame(data, index=pd.Index(labels, name="metric_label"))
+
+    @staticmethod
+    def _rows_to_pivot(rows: list, numeric: bool = False, parse: bool = False) -> pd.DataFrame:
+        """(ticker, metric_label, {period: value} JSON) 元组按列组装成 Pivot"""
+        if not rows:
+            return pd.DataFrame()
+        tickers, labels, blobs = zip(*rows)
+        cells = [json.loads(b) if b else {} for b in blobs]
+
+        data = {"ticker": list(tickers)}
+        # 按时间顺序排序列（2023/Q4 < 2024/Q1 < 2024/H1 < 2024/FY）
+        for period in sorted({p for row in cells for p in row}, key=period_sort_key):
+            column = [row.get(period) for row in cells]
+            if numeric:
+                data[period] = np.array([parse_numeric(v) for v in column] if parse else column, dtype=float)
+            else:
+                data[period] = column
+        return pd.DataFrame(data, index=pd.Index(labels, name="metric_label"))
+
+    def query_observations(self, category: str = None, tickers: List[str] = None, metric_ids: List[str] = None,
+                           period_from: str = None, period_to: str = None, page_size: int = 500,
+                           cursor: str = None) -> Dict:
+        """
+        按条件分页查询单元格，过滤条件全部下推到 SQL，只读取命中的单元格
+
+        Args:
+            category: 类别，为空时查询所有类别（尚未迁移到 observations 的类别展开分类表 JSON 查询，结果相同但需扫描该表）
+            tickers / metric_ids: 只返回这些公司 / 指标
+            period_from / period_to: 季度范围（含两端，按时间顺序，如 "2023/Q1" ~ "2024/FY"），
+                在 period_ordinal 索引上做 BETWEEN 扫描
+            page_size: 每页行数
+            cursor: 上一页返回的 next_cursor
+
+        Returns:
+            {"rows": [{"ticker", "category", "metric_id", "metric_label", "period", "period_ordinal",
+                       "value", "raw_text", "report_date"}, ...],
+             "next_cursor": 下一页游标，没有更多数据时为 None}
+        """
+        if page_size <= 0:
+            raise ValueError("page_size 必须为正数")
+        categories = [category] if category else list(CATEGORY_MODEL_MAP.keys())
+        for c in categories:
+            if not self._get_model_for_category(c):
+                raise ValueError(f"未知类别: {c}")
+        low, high = self._period_bound(period_from), self._period_bound(period_to)
+        start = self._decode_cursor(cursor) if cursor else None
+
+        # 排序键 (category, ticker, metric_id, period_ordinal, period)：按类别依次查询，
+        # 每个类别内按 (ticker, metric_id, period_ordinal, period) 排序，凑满一页即停。
+        # 已迁移的类别读 observations，排序与索引 (category, ticker, metric_id, period_ordinal) 一致；
+        # 未迁移的类别用 json_each 展开分类表（与 get_panel 相同），结果行格式一致
+        rows = []
+        for c in sorted(categories):
+            if start and c < start[0]:
+                continue
+            after = start[1:] if start and c == start[0] else None
+            fetch = self._query_observation_cells if self.observations_ready(c) else self._query_legacy_cells
+            rows.extend(fetch(c, tickers, metric_ids, low, high, after, page_size + 1 - len(rows)))
+            if len(rows) > page_size:
+                break
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = self._encode_cursor([last["category"], last["ticker"], last["metric_id"],
+                                               last["period_ordinal"], last["period"]])
+        return {"rows": rows, "next_cursor": next_cursor}
+
+    def _query_observation_cells(self, category: str, tickers: Optional[List[str]], metric_ids: Optional[List[str]],
+                                 low: Optional[int], high: Optional[int], after: Optional[list], limit: int) -> List[Dict]:
+        """query_observations 的一个已迁移类别：observations 上的索引范围扫描"""
+        O = ObservationModel
+        # 序号相同（无法识别的标记）时按 period 文本区分
+        order = (O.ticker, O.metric_id, O.period_ordinal, O.period)
+        query = select(O.ticker, O.category, O.metric_id, O.metric_label, O.period, O.period_ordinal,
+                       O.value, O.raw_text, O.report_date).where(O.category == category)
+        if tickers:
+            query = query.where(O.ticker.in_(tickers))
+        if metric_ids:
+            query = query.where(O.metric_id.in_(metric_ids))
+        if low is not None and high is not None:
+            query = query.where(O.period_ordinal.between(low, high))
+        elif low is not None:
+            query = query.where(O.period_ordinal >= low)
+        elif high is not None:
+            query = query.where(O.period_ordinal <= high)
+        if after:
+            query = query.where(tuple_(*order) > tuple_(*after))
+        return [dict(r._mapping) for r in self.db.execute(query.order_by(*order).limit(limit))]
+
+    def _query_legacy_cells(self, category: str, tickers: Optional[List[str]], metric_ids: Optional[List[str]],
+                            low: Optional[int], high: Optional[int], after: Optional[list], limit: int) -> List[Dict]:
+        """
+        query_observations 的一个未迁移类别：json_each 展开分类表的 period_data / period_dates，
+        序号与数值由注册到连接上的 Python 函数计算（与迁移写入 observations 的结果相同），需要扫描该类别全表
+        """
+        driver = self.db.connection().connection.driver_connection
+        driver.create_function("sf_period_ordinal", 1, period_ordinal, deterministic=True)
+        driver.create_function("sf_parse_numeric", 1, parse_numeric, deterministic=True)
+        table = self._get_model_for_category(category).__tablename__
+        cells = (
+            f"SELECT t.ticker AS ticker, COALESCE(t.metric_id, t.metric_label) AS metric_id, "
+            f"t.metric_label AS metric_label, j.key AS period, sf_period_ordinal(j.key) AS period_ordinal, "
+            f"sf_parse_numeric(j.value) AS value, j.value AS raw_text, d.value AS report_date "
+            f"FROM {table} t, json_each(COALESCE(NULLIF(t.period_data, ''), '{{}}')) j "
+            f"LEFT JOIN json_each(COALESCE(NULLIF(t.period_dates, ''), '{{}}')) d ON d.key = j.key"
+        )
+        where, params = [], []
+        if tickers:
+            where.append(f"ticker IN ({', '.join('?' * len(tickers))})")
+            params.extend(tickers)
+        if metric_ids:
+            where.append(f"metric_id IN ({', '.join('?' * len(metric_ids))})")
+            params.extend(metric_ids)
+        if low is not None:
+            where.append("period_ordinal >= ?")
+            params.append(low)
+        if high is not None:
+            where.append("period_ordinal <= ?")
+            params.append(high)
+        if after:
+            where.append("(ticker, metric_id, period_ordinal, period) > (?, ?, ?, ?)")
+            params.extend(after)
+        sql = f"SELECT ticker, metric_id, metric_label, period, period_ordinal, value, raw_text, report_date FROM ({cells})"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ticker, metric_id, period_ordinal, period LIMIT ?"
+        columns = ("ticker", "metric_id", "metric_label", "period", "period_ordinal", "value", "raw_text", "report_date")
+        return [
+            {"ticker": r[0], "category": category, **dict(zip(columns[1:], r[1:]))}
+            for r in self._fetch_raw(sql, params + [limit])
+        ]
+
+    @staticmethod
+    def _period_bound(token: str) -> Optional[int]:
+        if not token:
+            return None
+        period = parse_period(token)
+        if period is None:
+            raise ValueError(f"无法识别的季度: {token}")
+        return period.ordinal
+
+    @staticmethod
+    def _encode_cursor(key: List[str]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(key, ensure_ascii=False).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> List[str]:
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        except (ValueError, UnicodeError):
+            raise ValueError(f"无效的分页游标: {cursor}")
+        if not isinstance(key, list) or len(key) != 5:
+            raise ValueError(f"无效的分页游标: {cursor}")
+        return key
+
+    def get_panel(self, tickers: List[str] = None, categories: List[str] = None) -> pd.DataFrame:
+        """
+        一条 SQL 读取多个公司、多个类别的数值面板
+
+        Args:
+            tickers: 公司列表，为空时读取全部公司
+            categories: 类别列表，默认全部四个类别
+
+        Returns:
+            DataFrame，index 为 MultiIndex (ticker, category, metric)，columns 为季度（排序），值为 float64；
+            行按 ticker、类别顺序、指标录入顺序排列
+        """
+        categories = categories or list(CATEGORY_MODEL_MAP.keys())
+        for c in categories:
+            if not self._get_model_for_category(c):
+                raise ValueError(f"未知类别: {c}")
+
+        # 已迁移的类别读 observations 的已解析数值；未迁移的用 json_each 展开分类表文本，读取后再解析
+        parts, params = [], []
+        ticker_filter = f" AND ticker IN ({', '.join('?' * len(tickers))})" if tickers else ""
+        for rank, category in enumerate(categories):
+            if self.observations_ready(category):
+                parts.append(
+                    "SELECT ticker, ? AS category, COALESCE(metric_label, metric_id) AS metric, period, "
+                    "value, NULL AS raw_text, ? AS rank, id AS seq FROM observations WHERE category = ?" + ticker_filter
+                )
+                params += [category, rank, category]
+            else:
+                table = self._get_model_for_category(category).__tablename__
+                parts.append(
+                    f"SELECT t.ticker, ? AS category, t.metric_label AS metric, j.key AS period, "
+                    f"NULL AS value, j.value AS raw_text, ? AS rank, t.id AS seq FROM {table} t, json_each(COALESCE(NULLIF(t.period_data, ''), '{{}}')) j "
+                    f"WHERE 1 = 1" + ticker_filter
+                )
+                params += [category, rank]
+            params += list(tickers or [])
+        sql = " UNION ALL ".join(parts) + " ORDER BY ticker, rank, seq"
+
+        columns = ["ticker", "category", "metric", "period", "value", "raw_text", "rank", "seq"]
+        df = pd.DataFrame.from_records(self._fetch_raw(sql, params), columns=columns)
         if df.empty:
-            return df
-        
-        df = df.set_index("metric_label")
-        
-        # 按季度排序列
-        period_cols = sorted([c for c in df.columns if c not in ['ticker']])
-        return df[['ticker'] + period_cols] if 'ticker' in df.columns else df[period_cols]
+            return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], [], []], names=["ticker", "category", "metric"]),
+                                dtype=float)
+
+        value = df["value"].astype(float)
+        unparsed = df["raw_text"].notna()
+        if unparsed.any():
+            value[unparsed] = df.loc[unparsed, "raw_text"].map(parse_numeric).astype(float)
+        df["value"] = value
+
+        keys = ["ticker", "category", "metric"]
+        cells = df.drop_duplicates(keys + ["period"]).set_index(keys + ["period"])["value"]
+        order = pd.MultiIndex.from_frame(df[keys].drop_duplicates())
+        panel = cells.unstack("period").reindex(index=order)
+        panel = panel.reindex(columns=sorted(panel.columns, key=period_sort_key)).astype(float)
+        panel.columns.name = "period"
+        return panel
+
+    def iter_changes(self, since_seq: int = 0, category: str = None, batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        按 seq 顺序流式读取 since_seq 之后的变更，每批一次主键范围查询，开销与增量成正比
+
+        Yields:
+            {"seq", "ticker", "category", "metric_id", "period", "old_value", "new_value", "changed_at"}
+            下游保存最后一条的 seq，下次从该值继续
+        """
+        C = ChangeLogModel
+        columns = (C.seq, C.ticker, C.category, C.metric_id, C.period, C.old_value, C.new_value, C.changed_at)
+        while True:
+            query = select(*columns).where(C.seq > since_seq)
+            if category:
+                query = query.where(C.category == category)
+            batch = self.db.execute(query.order_by(C.seq).limit(batch_size)).all()
+            for row in batch:
+                yield dict(row._mapping)
+            if len(batch) < batch_size:
+                return
+            since_seq = batch[-1].seq
+
+    def latest_change_seq(self) -> int:
+        """当前最大的变更序号，没有变更时为 0"""
+        return self.db.execute(select(func.max(ChangeLogModel.seq))).scalar() or 0
+
+    def search_metrics(self, query: str, limit: int = 20, categories: List[str] = None) -> List[Dict]:
+        """
+        按公司代码、指标 id / 名称及别名搜索，空白分隔的多个词须同时命中（子串匹配，大小写不敏感）
+
+        不少于 3 个字符的词走 FTS5 trigram 索引并按相关度排序；全部为短词时按 (公司, 类别, 指标) 排序。
+        SQLite 不支持 FTS5 时在分类表上用 LIKE 查询，结果相同但需扫描全表
+
+        Returns:
+            [{"ticker", "category", "metric_id", "metric_label"}, ...]
+        """
+        if limit <= 0:
+            raise ValueError("limit 必须为正数")
+        unknown = [c for c in categories or [] if not self._get_model_for_category(c)]
+        if unknown:
+            raise ValueError(f"未知类别: {', '.join(unknown)}")
+        match_terms, like_terms = search_terms(query)
+        if not match_terms and not like_terms:
+            return []
+        if self._has_search_index():
+            sql, params = self._search_index_sql(match_terms, like_terms, categories)
+        else:
+            sql, params = self._search_tables_sql(match_terms + like_terms, categories)
+        columns = ("ticker", "category", "metric_id", "metric_label")
+        return [dict(zip(columns, row)) for row in self._fetch_raw(sql + " LIMIT ?", params + [limit])]
+
+    def get_metric_rows(self, keys: List[Dict]) -> pd.DataFrame:
+        """
+        读取若干指标行的原始文本（如 search_metrics 的结果），只查询命中的单元格，不经 Pivot 缓存
+
+        Args:
+            keys: [{"ticker", "category", "metric_id", "metric_label": 可选}, ...]
+
+        Returns:
+            DataFrame，每个键一行（按 keys 顺序），列为 ticker、category、metric_label 及按时间排序的季度
+        """
+        wanted = {(k["ticker"], k["category"], k["metric_id"]): k.get("metric_label") or k["metric_id"] for k in keys}
+        categories = {c for _, c, _ in wanted}
+        cells: Dict[tuple, Dict[str, str]] = {}
+        cursor = None
+        while wanted:
+            # 公司 × 指标的组合在 SQL 中过滤，不在 keys 中的组合在这里丢弃
+            page = self.query_observations(
+                category=next(iter(categories)) if len(categories) == 1 else None,
+                tickers=sorted({t for t, _, _ in wanted}), metric_ids=sorted({m for _, _, m in wanted}),
+                page_size=1000, cursor=cursor,
+            )
+            for r in page["rows"]:
+                key = (r["ticker"], r["category"], r["metric_id"])
+                if key in wanted:
+                    cells.setdefault(key, {})[r["period"]] = r["raw_text"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        periods = sorted({p for row in cells.values() for p in row}, key=period_sort_key)
+        return pd.DataFrame([
+            {"ticker": key[0], "category": key[1], "metric_label": label, **{p: cells.get(key, {}).get(p) for p in periods}}
+            for key, label in wanted.items()
+        ], columns=["ticker", "category", "metric_label"] + periods)
+
+    @staticmethod
+    def _search_index_sql(match_terms: List[str], like_terms: List[str], categories: List[str] = None):
+        where, params = [], []
+        if match_terms:
+            where.append(f"{METRIC_SEARCH_TABLE} MATCH ?")
+            params.append(fts_match_expression(match_terms))
+        for term in like_terms:
+            where.append("(" + " OR ".join(
+                f"{c} LIKE ? ESCAPE '\\'" for c in ("ticker", "metric_id", "metric_label", "aliases")
+            ) + ")")
+            params.extend([like_pattern(term)] * 4)
+        if categories:
+            where.append(f"category IN ({', '.join('?' * len(categories))})")
+            params.extend(categories)
+        order = "rank" if match_terms else "ticker, category, metric_id"
+        return (f"SELECT ticker, category, metric_id, metric_label FROM {METRIC_SEARCH_TABLE} "
+                f"WHERE {' AND '.join(where)} ORDER BY {order}"), params
+
+    def _search_tables_sql(self, terms: List[str], categories: List[str] = None):
+        """没有 FTS5 时的退路：分类表 UNION ALL，别名由注册到连接上的 Python 函数匹配"""
+        self.db.connection().connection.driver_connection.create_function(
+            "sf_alias_match", 2, lambda label, term: term in metric_aliases(label).lower(), deterministic=True)
+        condition = " AND ".join(
+            "(ticker LIKE ? ESCAPE '\\' OR metric_id LIKE ? ESCAPE '\\' "
+            "OR metric_label LIKE ? ESCAPE '\\' OR sf_alias_match(metric_label, ?))"
+            for _ in terms
+        )
+        term_params = []
+        for term in terms:
+            term_params.extend([like_pattern(term)] * 3 + [term.lower()])
+        parts, params = [], []
+        for category in categories or CATEGORY_MODEL_MAP.keys():
+            parts.append(
+                f"SELECT ticker, ? AS category, COALESCE(metric_id, metric_label) AS metric_id, metric_label "
+                f"FROM {CATEGORY_MODEL_MAP[category].__tablename__} WHERE {condition}"
+            )
+            params.extend([category] + term_params)
+        return " UNION ALL ".join(parts) + " ORDER BY ticker, category, metric_id", params
+
+    def tickers_reported_between(self, start: str, end: str, category: str = None,
+                                 date_field: str = "period_end") -> List[str]:
+        """
+        截止日期（或披露日期）在 [start, end] 内的公司代码，按代码排序
+        在 (日期, 类别, 公司) 索引上做区间扫描，只读索引不回表
+        """
+        column = self._calendar_date_column(date_field)
+        P = PeriodCalendarModel
+        query = select(P.ticker).distinct().where(
+            column.between(self._calendar_bound(start), self._calendar_bound(end))
+        )
+        if category:
+            query = query.where(P.category == category)
+        return list(self.db.execute(query.order_by(P.ticker)).scalars())
+
+    def query_calendar(self, start: str = None, end: str = None, category: str = None, tickers: List[str] = None,
+                       date_field: str = "period_end") -> List[Dict]:
+        """
+        按日期范围读取季度日历，按日期排序
+
+        Returns:
+            [{"ticker", "category", "period", "period_end", "disclosure_date"}, ...]
+        """
+        column = self._calendar_date_column(date_field)
+        P = PeriodCalendarModel
+        query = select(P.ticker, P.category, P.period, P.period_end, P.disclosure_date).where(column.is_not(None))
+        if start:
+            query = query.where(column >= self._calendar_bound(start))
+        if end:
+            query = query.where(column <= self._calendar_bound(end))
+        if category:
+            query = query.where(P.category == category)
+        if tickers:
+            query = query.where(P.ticker.in_(tickers))
+        query = query.order_by(column, P.category, P.ticker, P.period_ordinal)
+        return [dict(row._mapping) for row in self.db.execute(query)]
+
+    @staticmethod
+    def _calendar_date_column(date_field: str):
+        if date_field not in ("period_end", "disclosure_date"):
+            raise ValueError(f"date_field 只能是 period_end 或 disclosure_date: {date_field}")
+        return getattr(PeriodCalendarModel, date_field)
+
+    @staticmethod
+    def _calendar_bound(value: str) -> str:
+        bound = normalize_date(value)
+        if not bound:
+            raise ValueError(f"无法识别的日期: {value}")
+        return bound
 
     def get_all_data_by_category(self, category: str):
         """获取某类别的所有原始记录"""
@@ -139,8 +877,22 @@ class FinanceRepository:
         Model = self._get_model_for_category(category)
         if not Model:
             return 0
+        self._begin_write()
+        # 删除前把每个单元格记入变更日志（new_value 为 NULL）
+        self.db.execute(text(
+            f"INSERT INTO change_log (ticker, category, metric_id, period, old_value, new_value, changed_at) "
+            f"SELECT t.ticker, :category, COALESCE(t.metric_id, t.metric_label), j.key, j.value, NULL, :now "
+            f"FROM {Model.__tablename__} t, json_each(COALESCE(NULLIF(t.period_data, ''), '{{}}')) j ORDER BY t.id"
+        ), {"category": category, "now": time.time()})
         deleted = self.db.query(Model).delete(synchronize_session=False)
-        self.db.commit()
+        self.db.query(ObservationModel).filter(ObservationModel.category == category).delete(synchronize_session=False)
+        self.db.query(PeriodAxisModel).filter(PeriodAxisModel.category == category).delete(synchronize_session=False)
+        self.db.query(PeriodCalendarModel).filter(PeriodCalendarModel.category == category).delete(synchronize_session=False)
+        if self._has_search_index():
+            self.db.execute(text(f"DELETE FROM {METRIC_SEARCH_TABLE} WHERE category = :category"),
+                            {"category": category})
+        self._dirty_categories.add(category)
+        self._commit()
         return deleted
 
     def delete_all(self) -> int:
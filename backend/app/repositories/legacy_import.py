@@ -0,0 +1,114 @@
+"""
+旧版 financial_data.db (financial_records 宽表) 导入当前分类表
+    python -m backend.app.cli import-legacy samples/financial_data.db [--chunk-size 1000]
+
+旧表每行一个 (ticker, year, period)，每个指标一列 (REAL)；列名与 config.py 的指标 id 一致的列
+按指标所属类别写入对应分类表（metric_id / metric_label 使用配置中的中文标签，与界面保存的数据合并），
+其余旧列（Revenue、Profit、Book_Value 等）不在当前指标体系中，跳过并在结果中列出。
+
+- 源库只读打开，按主键顺序用游标 fetchmany 分块读取，每块一个事务（save_pivot_batch：
+  变更检测 + executemany upsert + observations 双写 + 变更日志），内存占用只与块大小有关
+- 每块输出进度和 rows/sec
+"""
+import sqlite3
+import time
+from typing import Callable, Dict, List
+
+from backend.config.config import FINANCIAL_METRICS
+from backend.app.repositories.finance_repo import FinanceRepository
+
+LEGACY_TABLE = "financial_records"
+# 旧表的键列，不是指标
+LEGACY_KEY_COLUMNS = ("ticker", "year", "period", "report_date")
+
+
+def legacy_column_map(columns: List[str]) -> Dict[str, Dict]:
+    """旧表列名 -> 指标配置 {"id", "label", "category", ...}"""
+    metrics = {m["id"]: m for m in FINANCIAL_METRICS}
+    return {c: metrics[c] for c in columns if c in metrics}
+
+
+def format_legacy_value(value) -> str:
+    """REAL 转为单元格文本，保留有效数字且不带多余的 .0"""
+    return format(value, ".15g")
+
+
+def _chunk_items(rows: List[tuple], columns: List[str], mapping: Dict[str, Dict]) -> List[Dict]:
+    """一块旧表行转为 save_pivot_batch 的 items，按 (类别, 公司) 分组"""
+    groups: Dict[tuple, List[Dict]] = {}
+    ticker_i, year_i, period_i = columns.index("ticker"), columns.index("year"), columns.index("period")
+    date_i = columns.index("report_date") if "report_date" in columns else None
+    metric_columns = [(i, mapping[c]) for i, c in enumerate(columns) if c in mapping]
+    for row in rows:
+        period = f"{row[year_i]}/{row[period_i]}"
+        report_date = row[date_i] if date_i is not None else ""
+        for i, metric in metric_columns:
+            if row[i] is None:
+                continue
+            groups.setdefault((metric["category"], row[ticker_i]), []).append({
+                "metric_id": metric["label"],
+                "metric_label": metric["label"],
+                "period": period,
+                "value": format_legacy_value(row[i]),
+                "report_date": report_date or "",
+            })
+    return [{"category": c, "ticker": t, "records": records} for (c, t), records in groups.items()]
+
+
+def import_legacy_db(db, source_path: str, chunk_size: int = 1000,
+                     log: Callable[[str], None] = print) -> Dict:
+    """
+    流式导入旧库
+
+    Args:
+        db: 目标库会话
+        source_path: 旧版 financial_data.db 路径（只读打开）
+        chunk_size: 每个事务处理的旧表行数
+
+    Returns:
+        {"rows": 旧表行数, "cells": 写入的单元格数, "chunks": 事务数, "seconds", "rows_per_sec",
+         "skipped_columns": 未映射的旧列}
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size 必须为正数")
+    try:
+        source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    except sqlite3.OperationalError as e:
+        raise ValueError(f"无法打开旧库 {source_path}: {e}")
+
+    try:
+        columns = [row[1] for row in source.execute(f"PRAGMA table_info({LEGACY_TABLE})")]
+        if not columns:
+            raise ValueError(f"{source_path} 中没有 {LEGACY_TABLE} 表")
+        missing = [c for c in ("ticker", "year", "period") if c not in columns]
+        if missing:
+            raise ValueError(f"{LEGACY_TABLE} 缺少列: {', '.join(missing)}")
+        mapping = legacy_column_map(columns)
+        skipped = [c for c in columns if c not in mapping and c not in LEGACY_KEY_COLUMNS]
+
+        repo = FinanceRepository(db)
+        stats = {"rows": 0, "cells": 0, "chunks": 0}
+        start = time.perf_counter()
+        select_list = ", ".join(f'"{c}"' for c in columns)
+        # 主键顺序读取，走 (ticker, year, period) 主键索引，无需排序
+        cursor = source.execute(f"SELECT {select_list} FROM {LEGACY_TABLE} ORDER BY ticker, year, period")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            items = _chunk_items(rows, columns, mapping)
+            if items:
+                repo.save_pivot_batch(items)
+            stats["rows"] += len(rows)
+            stats["cells"] += sum(len(item["records"]) for item in items)
+            stats["chunks"] += 1
+            elapsed = time.perf_counter() - start
+            log(f"[legacy] {stats['rows']} 行, {stats['cells']} 个单元格, "
+                f"{stats['rows'] / elapsed if elapsed else 0:.0f} rows/sec")
+    finally:
+        source.close()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["skipped_columns"] = skipped
+    return stats
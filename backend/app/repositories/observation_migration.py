@@ -0,0 +1,93 @@
+"""
+分类表 (period_data JSON) -> observations 长格式表的在线迁移
+    python -m backend.app.cli migrate [--chunk-size 500] [--pause 0.05]
+
+- 按 id 分块，每块一个短事务；进度记录在 migration_state，中断后从断点继续
+- 迁移期间应用照常读写：保存路径同时写分类表和 observations（双写），
+  依赖 observations 的读取（如 numeric Pivot）在该类别迁移完成前仍走分类表
+- 每块事务先更新进度行以取得写锁，再读取旧表，保证读到的数据与写入之间没有其他写入
+"""
+import json
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.app.models.finance_model import (
+    CATEGORY_MODEL_MAP, MigrationStateModel, bump_data_version, observation_state_name,
+)
+from backend.app.repositories.finance_repo import build_observation_rows, upsert_observations
+
+
+def migrate_category(bind, category: str, chunk_size: int = 500, pause: float = 0.0,
+                     log: Callable[[str], None] = print) -> int:
+    """迁移一个类别，返回本次迁移的分类表行数"""
+    Model = CATEGORY_MODEL_MAP[category]
+    name = observation_state_name(category)
+    with bind.begin() as conn:
+        conn.execute(sqlite_insert(MigrationStateModel).values(name=name, last_id=0, done=0)
+                     .on_conflict_do_nothing(index_elements=[MigrationStateModel.name]))
+
+    migrated = 0
+    while True:
+        with bind.begin() as conn:
+            state = MigrationStateModel.__table__
+            conn.execute(update(state).where(state.c.name == name).values(updated_at=time.time()))
+            last_id, done = conn.execute(select(state.c.last_id, state.c.done).where(state.c.name == name)).one()
+            if done:
+                break
+            rows = conn.execute(
+                select(Model.id, Model.ticker, Model.metric_id, Model.metric_label, Model.period_data, Model.period_dates)
+                .where(Model.id > last_id)
+                .order_by(Model.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                conn.execute(update(state).where(state.c.name == name).values(done=1))
+                # numeric Pivot 改为读取 observations
+                bump_data_version(conn, category)
+                done = True
+            else:
+                observations: List[Dict] = []
+                for _, ticker, metric_id, metric_label, period_data, period_dates in rows:
+                    observations.extend(build_observation_rows(
+                        category, ticker, metric_id or metric_label, metric_label,
+                        json.loads(period_data or "{}"), json.loads(period_dates or "{}"),
+                    ))
+                upsert_observations(conn, observations)
+                conn.execute(update(state).where(state.c.name == name).values(last_id=rows[-1][0]))
+        if done:
+            log(f"[migrate] {category}: 完成")
+            break
+
+        migrated += len(rows)
+        log(f"[migrate] {category}: {migrated} 行 -> id {rows[-1][0]}")
+        if pause:
+            # 让出写锁，前台保存不会被长时间阻塞
+            time.sleep(pause)
+    return migrated
+
+
+def migrate_observations(bind, chunk_size: int = 500, pause: float = 0.0, categories: List[str] = None,
+                         log: Callable[[str], None] = print) -> Dict[str, int]:
+    """迁移所有（或指定）类别，返回 {类别: 迁移行数}"""
+    return {
+        category: migrate_category(bind, category, chunk_size, pause, log)
+        for category in (categories or CATEGORY_MODEL_MAP.keys())
+    }
+
+
+def migration_status(bind) -> Dict[str, Dict]:
+    """各类别迁移进度 {类别: {"done", "last_id", "remaining"}}"""
+    status = {}
+    with bind.connect() as conn:
+        for category, Model in CATEGORY_MODEL_MAP.items():
+            row = conn.execute(
+                select(MigrationStateModel.last_id, MigrationStateModel.done)
+                .where(MigrationStateModel.name == observation_state_name(category))
+            ).first()
+            last_id, done = row if row else (0, 0)
+            remaining = conn.execute(select(func.count()).select_from(Model).where(Model.id > last_id)).scalar()
+            status[category] = {"done": bool(done), "last_id": last_id, "remaining": remaining}
+    return status
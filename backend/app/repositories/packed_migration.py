@@ -0,0 +1,61 @@
+"""
+为旧库回填紧凑格式 (period_axes + 分类表 period_values)
+    python -m backend.app.cli pack [--category 利润表]
+
+新库的保存路径始终同时写 JSON 与紧凑格式；已有数据的旧库回填完成前，numeric 读取不使用紧凑格式。
+按公司分块，每个公司一个短事务（先更新进度行取得写锁，再读取该公司的行），可重复执行
+"""
+import json
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.app.core.packed import build_axis, pack_values
+from backend.app.models.finance_model import (
+    CATEGORY_MODEL_MAP, MigrationStateModel, PeriodAxisModel, bump_data_version, packed_state_name,
+)
+
+
+def pack_category(bind, category: str, log: Callable[[str], None] = print) -> int:
+    """回填一个类别，返回打包的指标行数"""
+    table = CATEGORY_MODEL_MAP[category].__tablename__
+    name = packed_state_name(category)
+    state = MigrationStateModel.__table__
+    with bind.begin() as conn:
+        conn.execute(sqlite_insert(MigrationStateModel).values(name=name, last_id=0, done=0)
+                     .on_conflict_do_nothing(index_elements=[MigrationStateModel.name]))
+        tickers = [row[0] for row in conn.execute(text(f"SELECT DISTINCT ticker FROM {table} ORDER BY ticker"))]
+
+    packed = 0
+    for ticker in tickers:
+        with bind.begin() as conn:
+            conn.execute(update(state).where(state.c.name == name).values(updated_at=time.time()))
+            rows = conn.execute(text(
+                f"SELECT metric_id, period_data FROM {table} WHERE ticker IS :ticker"
+            ), {"ticker": ticker}).all()
+            data = {metric_id: json.loads(period_data or "{}") for metric_id, period_data in rows}
+            axis = build_axis(data.values())
+            stmt = sqlite_insert(PeriodAxisModel).values(
+                category=category, ticker=ticker, periods=json.dumps(axis, ensure_ascii=False))
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[PeriodAxisModel.category, PeriodAxisModel.ticker],
+                set_={"periods": stmt.excluded.periods},
+            ))
+            conn.execute(text(
+                f"UPDATE {table} SET period_values = :v WHERE ticker IS :t AND metric_id IS :m"
+            ), [{"t": ticker, "m": metric_id, "v": pack_values(values, axis)} for metric_id, values in data.items()])
+        packed += len(rows)
+
+    with bind.begin() as conn:
+        conn.execute(update(state).where(state.c.name == name).values(done=1, updated_at=time.time()))
+        # numeric Pivot 改为读取紧凑格式
+        bump_data_version(conn, category)
+    log(f"[pack] {category}: {len(tickers)} 个公司, {packed} 行")
+    return packed
+
+
+def pack_categories(bind, categories: List[str] = None, log: Callable[[str], None] = print) -> Dict[str, int]:
+    """回填所有（或指定）类别，返回 {类别: 打包行数}"""
+    return {category: pack_category(bind, category, log) for category in (categories or CATEGORY_MODEL_MAP.keys())}
@@ -0,0 +1,56 @@
+"""
+进程内带版本号的读缓存
+版本号由调用方从数据库读取（finance_model.data_versions，每个类别一行，写入事务内更新），
+缓存项记录读取前的版本号，版本不一致即视为失效。因此其他进程（CLI 导入、迁移、OCR worker）
+提交的写入同样会使缓存失效。缓存在同一进程的所有会话（Streamlit 浏览器会话、线程）间共享
+
+调用方先读版本号再读数据：读与写交错时缓存的数据只会比版本号新，
+下一次读取版本号已变化，最多多一次未命中，不会返回过期数据
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+import pandas as pd
+
+
+class VersionedReadCache:
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[int, pd.DataFrame]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, db_key: str, table: str, version: int, key: Hashable,
+                    loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        命中且版本一致时返回缓存的副本，否则调用 loader 读取并以 version 缓存
+        返回的 DataFrame 是副本，调用方修改不会影响缓存
+        """
+        cache_key = (db_key, table, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry[1].copy()
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            self._entries[cache_key] = (version, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value.copy()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# 进程级共享实例
+PIVOT_CACHE = VersionedReadCache()
@@ -0,0 +1,259 @@
+"""
+财务数据库快照：Parquet / Arrow IPC 批量导出与导入
+    python -m backend.app.cli export --format parquet --out snapshot/
+    python -m backend.app.cli export --format arrow --out snapshot.arrow
+    python -m backend.app.cli import snapshot/
+
+- Parquet：按 category=<类别>/ticker=<公司> 分区（hive 目录布局），每个分区一个文件，
+  按 row_group_size 流式写入行组，内存占用与总数据量无关
+- Arrow IPC：单个文件，open_arrow_snapshot 通过内存映射打开，列数据直接引用映射页面（零拷贝）
+- 长格式列：metric_id, metric_label, period, value (float64, 已解析), raw_text (原始文本),
+  report_date, row (指标在该公司中的顺序)；Arrow 快照额外包含 category, ticker 列
+
+pyarrow 为可选依赖，只在调用这些函数时导入
+"""
+import json
+import os
+from typing import Dict, Iterator, List, Tuple
+
+from backend.app.core.numbers import parse_numeric
+from backend.app.models.finance_model import CATEGORY_MODEL_MAP
+from backend.app.repositories.finance_repo import FinanceRepository
+
+DEFAULT_ROW_GROUP_SIZE = 64 * 1024
+# 读取分类表时每次从游标取的行数
+FETCH_SIZE = 500
+
+# (列名, pyarrow 类型名)
+SNAPSHOT_COLUMNS = [
+    ("metric_id", "string"),
+    ("metric_label", "string"),
+    ("period", "string"),
+    ("value", "float64"),
+    ("raw_text", "string"),
+    ("report_date", "string"),
+    ("row", "int32"),
+]
+PARTITION_COLUMNS = ["category", "ticker"]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet/Arrow 快照需要 pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def snapshot_schema(with_partitions: bool = False):
+    pa = _require_pyarrow()
+    columns = [(name, pa.string()) for name in PARTITION_COLUMNS] if with_partitions else []
+    columns += [(name, getattr(pa, type_name)()) for name, type_name in SNAPSHOT_COLUMNS]
+    return pa.schema(columns)
+
+
+def _partition_dir(name: str, value: str) -> str:
+    """hive 分区目录名；只转义会破坏路径的字符，中文保持可读（读取时按 URI 解码）"""
+    return f"{name}=" + value.replace("%", "%25").replace("/", "%2F").replace("=", "%3D")
+
+
+def _iter_ticker_rows(db, category: str, tickers: List[str] = None) -> Iterator[Tuple[str, List[tuple]]]:
+    """按公司依次产出 (ticker, [(metric_id, metric_label, period_data, period_dates), ...])，游标分批读取"""
+    table = CATEGORY_MODEL_MAP[category].__tablename__
+    sql = f"SELECT ticker, metric_id, metric_label, period_data, period_dates FROM {table}"
+    params = []
+    if tickers:
+        sql += f" WHERE ticker IN ({', '.join('?' * len(tickers))})"
+        params.extend(tickers)
+    sql += " ORDER BY ticker, id"
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        current, rows = None, []
+        while True:
+            batch = cursor.fetchmany(FETCH_SIZE)
+            if not batch:
+                break
+            for ticker, *rest in batch:
+                if ticker != current and rows:
+                    yield current, rows
+                    rows = []
+                current = ticker
+                rows.append(tuple(rest))
+        if rows:
+            yield current, rows
+    finally:
+        cursor.close()
+
+
+def _iter_column_chunks(rows: List[tuple], chunk_rows: int) -> Iterator[Dict[str, list]]:
+    """分类表行展开为长格式列，每累积 chunk_rows 个单元格产出一次"""
+    columns = {name: [] for name, _ in SNAPSHOT_COLUMNS}
+    for index, (metric_id, metric_label, period_data, period_dates) in enumerate(rows):
+        dates = json.loads(period_dates or "{}")
+        for period, raw_text in json.loads(period_data or "{}").items():
+            columns["metric_id"].append(metric_id or metric_label)
+            columns["metric_label"].append(metric_label)
+            columns["period"].append(period)
+            columns["value"].append(parse_numeric(raw_text))
+            columns["raw_text"].append(raw_text)
+            columns["report_date"].append(dates.get(period))
+            columns["row"].append(index)
+        if len(columns["period"]) >= chunk_rows:
+            yield columns
+            columns = {name: [] for name, _ in SNAPSHOT_COLUMNS}
+    if columns["period"]:
+        yield columns
+
+
+def export_parquet(db, out_dir: str, categories: List[str] = None, tickers: List[str] = None,
+                   row_group_size: int = DEFAULT_ROW_GROUP_SIZE, compression: str = "zstd") -> Dict[str, int]:
+    """
+    导出为按类别/公司分区的 Parquet 数据集
+
+    Returns:
+        {"files": 写入的文件数, "rows": 单元格行数}
+    """
+    pa = _require_pyarrow()
+    schema = snapshot_schema()
+    os.makedirs(out_dir, exist_ok=True)
+    stats = {"files": 0, "rows": 0}
+    for category in categories or list(CATEGORY_MODEL_MAP.keys()):
+        for ticker, rows in _iter_ticker_rows(db, category, tickers):
+            directory = os.path.join(out_dir, _partition_dir("category", category), _partition_dir("ticker", ticker))
+            os.makedirs(directory, exist_ok=True)
+            with pa.parquet.ParquetWriter(os.path.join(directory, "part-0.parquet"), schema,
+                                          compression=compression) as writer:
+                for columns in _iter_column_chunks(rows, row_group_size):
+                    writer.write_table(pa.table(columns, schema=schema), row_group_size=row_group_size)
+                    stats["rows"] += len(columns["period"])
+            stats["files"] += 1
+    return stats
+
+
+def export_arrow(db, path: str, categories: List[str] = None, tickers: List[str] = None,
+                 batch_rows: int = DEFAULT_ROW_GROUP_SIZE) -> int:
+    """导出为单个 Arrow IPC 文件（含 category, ticker 列），返回单元格行数"""
+    pa = _require_pyarrow()
+    schema = snapshot_schema(with_partitions=True)
+    total = 0
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for category in categories or list(CATEGORY_MODEL_MAP.keys()):
+            for ticker, rows in _iter_ticker_rows(db, category, tickers):
+                for columns in _iter_column_chunks(rows, batch_rows):
+                    count = len(columns["period"])
+                    columns = dict(category=[category] * count, ticker=[ticker] * count, **columns)
+                    writer.write_batch(pa.record_batch(columns, schema=schema))
+                    total += count
+    return total
+
+
+def open_arrow_snapshot(path: str):
+    """内存映射打开 Arrow IPC 快照，返回 pyarrow.Table；列缓冲区直接引用映射页面，不复制数据"""
+    pa = _require_pyarrow()
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def open_parquet_snapshot(path: str, categories: List[str] = None, tickers: List[str] = None):
+    """
+    打开 Parquet 快照为 pyarrow.dataset.Dataset（category, ticker 来自分区目录）；
+    指定 categories / tickers 时返回过滤后的 Table，只读取对应分区
+    """
+    pa = _require_pyarrow()
+    dataset = pa.dataset.dataset(path, format="parquet", partitioning="hive")
+    if not categories and not tickers:
+        return dataset
+    expression = None
+    for name, values in (("category", categories), ("ticker", tickers)):
+        if values:
+            condition = pa.dataset.field(name).isin(values)
+            expression = condition if expression is None else expression & condition
+    return dataset.to_table(filter=expression)
+
+
+def _table_to_records(table) -> List[Dict]:
+    """快照表转为 save_records 的长格式记录；原始文本优先，缺失时使用数值"""
+    columns = table.to_pydict()
+    order = range(table.num_rows)
+    if "row" in columns:
+        order = sorted(order, key=lambda i: columns["row"][i])
+    records = []
+    for i in order:
+        raw_text, value = columns["raw_text"][i], columns["value"][i]
+        if raw_text is None:
+            if value is None:
+                continue
+            raw_text = format(value, "g")
+        records.append({
+            "metric_id": columns["metric_id"][i],
+            "metric_label": columns["metric_label"][i],
+            "period": columns["period"][i],
+            "value": raw_text,
+            "report_date": columns["report_date"][i] or "",
+        })
+    return records
+
+
+def _iter_snapshot_groups(path: str) -> Iterator[Tuple[str, str, object]]:
+    """按 (category, ticker) 产出快照分组；Parquet 数据集逐分区文件读取"""
+    pa = _require_pyarrow()
+    if os.path.isfile(path) and path.endswith((".arrow", ".feather", ".ipc")):
+        yield from _split_by_columns(pa, open_arrow_snapshot(path))
+        return
+
+    dataset = pa.dataset.dataset(path, format="parquet", partitioning="hive")
+    for fragment in dataset.get_fragments():
+        keys = pa.dataset.get_partition_keys(fragment.partition_expression)
+        table = fragment.to_table()
+        if "category" in keys and "ticker" in keys:
+            yield keys["category"], keys["ticker"], table
+            continue
+        # 未分区的单个 Parquet 文件：category, ticker 为普通列
+        for category, ticker, group in _split_by_columns(pa, table):
+            yield category, ticker, group
+
+
+def _split_by_columns(pa, table) -> Iterator[Tuple[str, str, object]]:
+    missing = [c for c in PARTITION_COLUMNS if c not in table.column_names]
+    if missing:
+        raise ValueError(f"快照缺少列: {', '.join(missing)}")
+    keys = table.select(PARTITION_COLUMNS).group_by(PARTITION_COLUMNS).aggregate([])
+    for category, ticker in zip(keys["category"].to_pylist(), keys["ticker"].to_pylist()):
+        mask = pa.compute.and_(pa.compute.equal(table["category"], category),
+                               pa.compute.equal(table["ticker"], ticker))
+        yield category, ticker, table.filter(mask)
+
+
+def import_snapshot(db, path: str, batch_groups: int = 50) -> Dict[str, int]:
+    """
+    把 Parquet 数据集目录 / Parquet 文件 / Arrow IPC 文件批量导入数据库
+    每 batch_groups 个 (类别, 公司) 分组一个事务，经 save_pivot_batch 做变更检测和 observations 双写
+
+    Returns:
+        {"groups": 分组数, "rows": 单元格行数}
+    """
+    _require_pyarrow()
+    if not os.path.exists(path):
+        raise ValueError(f"快照不存在: {path}")
+
+    repo = FinanceRepository(db)
+    stats = {"groups": 0, "rows": 0}
+    items = []
+    for category, ticker, table in _iter_snapshot_groups(path):
+        if category not in CATEGORY_MODEL_MAP:
+            raise ValueError(f"未知类别: {category}")
+        items.append({"category": category, "ticker": ticker, "records": _table_to_records(table)})
+        stats["groups"] += 1
+        stats["rows"] += table.num_rows
+        if len(items) >= batch_groups:
+            repo.save_pivot_batch(items)
+            items = []
+    if items:
+        repo.save_pivot_batch(items)
+    return stats
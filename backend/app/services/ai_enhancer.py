@@ -6,50 +6,150 @@
 
 import requests
 import json
+import hashlib
+import threading
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
 from typing import List, Dict
 
+# 批量提示中每个截图文本的分隔标记，模型按序号返回 JSON 对象
+CAPTURE_MARKER = "### Capture"
+
+
 class AIEnhancerService:
-    def __init__(self, ollama_url="http://localhost:11434", model="llama3"):
+    def __init__(self, ollama_url="http://localhost:11434", model="llama3",
+                 timeout=10, pool_size=4, batch_size=4, cache_size=256):
         self.ollama_url = f"{ollama_url}/api/generate"
         self.model = model
+        self.timeout = timeout
+        self.batch_size = batch_size
 
-    def enhance_data(self, raw_ocr_text: str, metric_config: List[Dict]) -> str:
-        """
-        Send raw OCR text to local Ollama to structure it.
-        Now includes metric config for context.
-        """
-        metrics_list = ", ".join([m['label'] for m in metric_config])
-        prompt = f"""
+        # 复用连接：同一主机的请求走连接池，不再每次新建 TCP 连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # 响应缓存：key 为 (model, prompt) 的 sha256，LRU 淘汰
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+
+    def close(self):
+        self.session.close()
+
+    def _metrics_list(self, metric_config: List[Dict]) -> str:
+        return ", ".join([m['label'] for m in metric_config])
+
+    def _build_prompt(self, raw_ocr_text: str, metric_config: List[Dict]) -> str:
+        return f"""
         Task: Extract financial data from OCR text.
-        Allowed Metrics: {metrics_list}
+        Allowed Metrics: {self._metrics_list(metric_config)}
         Output Format: JSON list of objects: [{{"metric_id": "id", "period": "YYYY/QX", "value": "num"}}]
-        
+
         Raw OCR Text:
         {raw_ocr_text}
-        
+
+        Important: Match the metric labels exactly to the metric_id provided in config.
+        """
+
+    def _build_batch_prompt(self, raw_ocr_texts: List[str], metric_config: List[Dict]) -> str:
+        captures = "\n".join(
+            f"{CAPTURE_MARKER} {i}\n{text}" for i, text in enumerate(raw_ocr_texts)
+        )
+        return f"""
+        Task: Extract financial data from each OCR capture below independently.
+        Allowed Metrics: {self._metrics_list(metric_config)}
+        Output Format: one JSON object keyed by capture number, each value a JSON list of objects:
+        {{"0": [{{"metric_id": "id", "period": "YYYY/QX", "value": "num"}}], "1": [...]}}
+
+        {captures}
+
         Important: Match the metric labels exactly to the metric_id provided in config.
         """
-        
+
+    def _prompt_key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _generate(self, prompt: str) -> str:
+        """
+        调用 /api/generate（流式），逐行解析 NDJSON 并拼接 response 字段；
+        相同 prompt 直接命中缓存
+        """
+        key = self._prompt_key(prompt)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._cache[key]
+
+        chunks = []
+        with self.session.post(
+            self.ollama_url,
+            json={"model": self.model, "prompt": prompt, "stream": True},
+            timeout=self.timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                part = json.loads(line)
+                if part.get("error"):
+                    raise RuntimeError(part["error"])
+                chunks.append(part.get("response", ""))
+                if part.get("done"):
+                    break
+        result = "".join(chunks)
+
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _extract_json(result: str) -> str:
+        # Basic JSON extraction if AI wraps it in backticks
+        if "```json" in result:
+            result = result.split("```json")[-1].split("```")[0]
+        return result
+
+    def enhance_data(self, raw_ocr_text: str, metric_config: List[Dict]) -> str:
+        """
+        Send raw OCR text to local Ollama to structure it.
+        Now includes metric config for context.
+        """
         try:
-            response = requests.post(
-                self.ollama_url,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=10
-            )
-            if response.status_code == 200:
-                result = response.json().get('response', "")
-                # Basic JSON extraction if AI wraps it in backticks
-                if "```json" in result:
-                    result = result.split("```json")[-1].split("```")[0]
-                return result
+            return self._extract_json(self._generate(self._build_prompt(raw_ocr_text, metric_config)))
+        except requests.HTTPError:
+            return ""
         except Exception as e:
             return f"AI Enhancement Error: {str(e)}"
-        
-        return ""
+
+    def enhance_batch(self, raw_ocr_texts: List[str], metric_config: List[Dict]) -> List[str]:
+        """
+        Structure several captures with one request per `batch_size` captures.
+        Returns one JSON string per capture, in input order; a chunk whose
+        response cannot be split falls back to one request per capture.
+        """
+        results = []
+        for start in range(0, len(raw_ocr_texts), self.batch_size):
+            chunk = raw_ocr_texts[start:start + self.batch_size]
+            if len(chunk) == 1:
+                results.append(self.enhance_data(chunk[0], metric_config))
+                continue
+            try:
+                raw = self._extract_json(self._generate(self._build_batch_prompt(chunk, metric_config)))
+                by_capture = json.loads(raw)
+                # 先完整取出整批结果再追加：缺少某个序号时不能留下部分结果，否则输出与输入错位
+                chunk_results = [json.dumps(by_capture[str(i)], ensure_ascii=False) for i in range(len(chunk))]
+                results.extend(chunk_results)
+            except (ValueError, KeyError, TypeError, requests.RequestException, RuntimeError):
+                results.extend(self.enhance_data(text, metric_config) for text in chunk)
+        return results
 
     def validate_row(self, category: str, value: str) -> bool:
         """
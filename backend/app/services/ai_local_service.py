@@ -4,52 +4,177 @@
 # 保留原因：遵循非破坏性规则，保留代码以备将来启用
 # ============================================================
 
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import copy
+import gc
+import hashlib
 import json
 import re
+import threading
+from typing import Dict, List
 
-class AIEnhancerLocal:
-    def __init__(self, model_id="Qwen/Qwen2.5-0.5B-Instruct"):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        if self.device == "cuda":
+from backend.app.services.ocr_service import is_non_metric_text, match_metric_label
+
+SYSTEM_PROMPT = "你是一个专业的财务数据助手，擅长从 OCR 文本中提取 JSON 数据。"
+
+# 每个进程只加载一次模型：{model_id: (tokenizer, model, device)}
+_MODEL_CACHE = {}
+_MODEL_LOCK = threading.Lock()
+
+
+def _load_torch():
+    """torch/transformers 体积很大，只在真正需要模型时导入"""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    return torch, AutoModelForCausalLM, AutoTokenizer
+
+
+def load_shared_model(model_id: str):
+    """返回进程内共享的 (tokenizer, model, device)，首次调用时加载"""
+    with _MODEL_LOCK:
+        if model_id in _MODEL_CACHE:
+            return _MODEL_CACHE[model_id]
+
+        torch, AutoModelForCausalLM, AutoTokenizer = _load_torch()
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        if device == "cuda":
             torch.cuda.empty_cache()
-            
-        print(f"Initializing local AI on {self.device}...")
-        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
-        
+
+        print(f"Initializing local AI on {device}...")
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+
         try:
             # Force float16 for CUDA to save 50% VRAM
             load_params = {
                 "pretrained_model_name_or_path": model_id,
-                "torch_dtype": torch.float16 if self.device == "cuda" else torch.float32,
+                "torch_dtype": torch.float16 if device == "cuda" else torch.float32,
             }
-            
+
             # Accelerate device_map="auto" is great but sometimes OOMs if it overestimates capacity
             # We try it first; if fails, we go manual.
             try:
-                self.model = AutoModelForCausalLM.from_pretrained(
+                model = AutoModelForCausalLM.from_pretrained(
                     **load_params,
                     device_map="auto"
                 )
             except:
-                self.model = AutoModelForCausalLM.from_pretrained(**load_params)
-                self.model.to(self.device)
-                
+                model = AutoModelForCausalLM.from_pretrained(**load_params)
+                model.to(device)
+
         except Exception as e:
             print(f"Total failure loading model: {e}")
             raise e
-            
+
+        model.eval()
+        _MODEL_CACHE[model_id] = (tokenizer, model, device)
+        return _MODEL_CACHE[model_id]
+
+
+# =============================================================================
+# 选择性纠错：只把低置信度 / 未匹配的 token 交给模型
+# =============================================================================
+
+def select_uncertain_tokens(captures: List[Dict[str, list]], metric_config: List[Dict],
+                            threshold: float = 0.6) -> List[Dict]:
+    """
+    从多个截图的 readtext 原始结果中挑出需要纠错的 token
+
+    Args:
+        captures: OCRService.read_images() 的返回值列表
+        threshold: 置信度低于该值的 token 需要纠错；科目截图中匹配不到指标的 token 也需要
+
+    Returns:
+        [{"key": "c{capture}.{stage}.{index}", "capture", "stage", "index", "text", "confidence"}, ...]
+    """
+    config_labels = [m['label'] for m in metric_config]
+    selected = []
+    for c, raw in enumerate(captures):
+        for stage, results in raw.items():
+            for i, (bbox, text, prob) in enumerate(results):
+                uncertain = prob < threshold
+                if stage == "metrics" and not uncertain:
+                    clean_text = text.replace(" ", "")
+                    uncertain = not is_non_metric_text(clean_text) and \
+                        match_metric_label(clean_text, metric_config, config_labels) is None
+                if uncertain:
+                    selected.append({
+                        "key": f"c{c}.{stage}.{i}",
+                        "capture": c, "stage": stage, "index": i,
+                        "text": text, "confidence": float(prob),
+                    })
+    return selected
+
+
+def build_prefix_prompt(metric_config: List[Dict]) -> str:
+    """所有批次共享的指令前缀（指标列表不变时前缀完全相同，可复用 KV cache）"""
+    metrics_desc = "\n".join([f"- {m['label']} (ID: {m['id']})" for m in metric_config])
+    return f"""以下是 OCR 识别置信度较低的若干片段，来自财务报表截图。
+请逐条纠正识别错误，只输出 JSON 对象 {{"片段编号": "纠正后的文本"}}，不要包含任何解释。
+
+规则：
+1. periods 片段是季度表头，规范为 2023/Q1、2023/H1、2023/FY 等格式。
+2. metrics 片段是科目名称，尽量纠正为以下指标之一：
+{metrics_desc}
+3. values 片段是数值或日期，只纠正数字、小数点、单位（亿、%）和日期。
+4. 无法确定时原样返回。
+
+待纠正片段：
+"""
+
+
+def build_items_prompt(items: List[Dict]) -> str:
+    """批次中逐条列出待纠正片段"""
+    return "\n".join(f"{item['key']} [{item['stage']}]: {item['text']}" for item in items) + "\n"
+
+
+def parse_corrections(response: str) -> Dict[str, str]:
+    """从模型输出中提取 {片段编号: 纠正文本}"""
+    json_match = re.search(r'\{.*\}', response, re.DOTALL)
+    if not json_match:
+        return {}
+    try:
+        data = json.loads(json_match.group(0))
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {str(k): str(v) for k, v in data.items() if v is not None and str(v).strip()}
+
+
+def apply_corrections(captures: List[Dict[str, list]], items: List[Dict],
+                      corrections: Dict[str, str]) -> List[Dict[str, list]]:
+    """返回应用纠错后的新 readtext 结果（不修改输入）"""
+    patched = [{stage: list(results) for stage, results in raw.items()} for raw in captures]
+    for item in items:
+        text = corrections.get(item["key"])
+        if text is None:
+            continue
+        bbox, _, prob = patched[item["capture"]][item["stage"]][item["index"]]
+        patched[item["capture"]][item["stage"]][item["index"]] = (bbox, text, prob)
+    return patched
+
+
+class AIEnhancerLocal:
+    def __init__(self, model_id="Qwen/Qwen2.5-0.5B-Instruct"):
+        self.tokenizer, self.model, self.device = load_shared_model(model_id)
         self.model_id = model_id
+        # {前缀 hash: (prefix_ids, past_key_values)}
+        self._prefix_cache = {}
+
+    def _cleanup(self):
+        # Aggressive cleanup
+        if self.device == "cuda":
+            torch, _, _ = _load_torch()
+            torch.cuda.empty_cache()
+        gc.collect()
 
-    @torch.no_grad()
     def enhance_ocr_results(self, raw_ocr_text: str, metric_config: list) -> str:
         """
         Use local LLM to clean up OCR text and map to metrics.
         Returns a JSON string of records.
         """
+        torch, _, _ = _load_torch()
         metrics_desc = "\n".join([f"- {m['label']} (ID: {m['id']})" for m in metric_config])
-        
+
         prompt = f"""你是一个专业的财务数据提取助手。
 给定以下 OCR 识别出的杂乱文本，请将其整理并提取为结构化的财务数据。
 只输出 JSON 格式，不要包含任何解释。
@@ -69,10 +194,10 @@ class AIEnhancerLocal:
 {raw_ocr_text}
 """
         messages = [
-            {"role": "system", "content": "你是一个专业的财务数据助手，擅长从 OCR 文本中提取 JSON 数据。"},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ]
-        
+
         text = self.tokenizer.apply_chat_template(
             messages,
             tokenize=False,
@@ -81,26 +206,92 @@ class AIEnhancerLocal:
         model_inputs = self.tokenizer([text], return_tensors="pt").to(self.model.device)
 
         try:
-            generated_ids = self.model.generate(
-                **model_inputs,
-                max_new_tokens=1024,
-                temperature=0.1
-            )
+            with torch.no_grad():
+                generated_ids = self.model.generate(
+                    **model_inputs,
+                    max_new_tokens=1024,
+                    temperature=0.1
+                )
             # Remove input tokens from result
             generated_ids = [
                 output_ids[len(input_ids):] for input_ids, output_ids in zip(model_inputs.input_ids, generated_ids)
             ]
             response = self.tokenizer.batch_decode(generated_ids, skip_special_tokens=True)[0]
         finally:
-            # Aggressive cleanup
             del model_inputs
-            if self.device == "cuda":
-                torch.cuda.empty_cache()
-            import gc
-            gc.collect()
-        
+            self._cleanup()
+
         # Clean up JSON from response
         json_match = re.search(r'\[.*\]', response, re.DOTALL)
         if json_match:
             return json_match.group(0)
         return "[]"
+
+    def _chat_parts(self, prefix_prompt: str):
+        """
+        将聊天模板切成 (共享前缀, 片段占位之后的后缀) 两段文本，
+        前缀包含 system 提示和用户消息的固定开头
+        """
+        placeholder = "\u0000ITEMS\u0000"
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prefix_prompt + placeholder},
+        ]
+        text = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        head, tail = text.split(placeholder)
+        return head, tail
+
+    def _get_prefix_cache(self, head: str):
+        """共享前缀只前向计算一次，之后每个批次复制其 KV cache"""
+        torch, _, _ = _load_torch()
+        key = hashlib.sha256(head.encode("utf-8")).hexdigest()
+        if key not in self._prefix_cache:
+            prefix_ids = self.tokenizer(head, return_tensors="pt", add_special_tokens=False).input_ids.to(self.model.device)
+            with torch.no_grad():
+                past = self.model(prefix_ids, use_cache=True).past_key_values
+            self._prefix_cache[key] = (prefix_ids, past)
+        return self._prefix_cache[key]
+
+    def correct_low_confidence(self, captures: List[Dict[str, list]], metric_config: List[Dict],
+                               threshold: float = 0.6, batch_size: int = 32,
+                               tokens_per_item: int = 24) -> List[Dict[str, list]]:
+        """
+        选择性纠错：只把低置信度或未匹配的 token 送入模型
+
+        多个截图的待纠正片段合并成批次，每批一次 generate；system 提示和指标列表
+        组成的前缀只计算一次 KV cache，生成长度按片段数估算而不是固定 1024
+
+        Args:
+            captures: OCRService.read_images() 的返回值列表
+        Returns:
+            纠错后的 readtext 结果列表，可直接交给 OCRService.parse_ocr_results()
+        """
+        items = select_uncertain_tokens(captures, metric_config, threshold)
+        if not items:
+            return captures
+
+        torch, _, _ = _load_torch()
+        head, tail = self._chat_parts(build_prefix_prompt(metric_config))
+        prefix_ids, prefix_past = self._get_prefix_cache(head)
+
+        corrections = {}
+        try:
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                suffix_ids = self.tokenizer(build_items_prompt(batch) + tail, return_tensors="pt",
+                                            add_special_tokens=False).input_ids.to(self.model.device)
+                input_ids = torch.cat([prefix_ids, suffix_ids], dim=1)
+                with torch.no_grad():
+                    output_ids = self.model.generate(
+                        input_ids=input_ids,
+                        attention_mask=torch.ones_like(input_ids),
+                        past_key_values=copy.deepcopy(prefix_past),
+                        max_new_tokens=tokens_per_item * len(batch) + 8,
+                        do_sample=False,
+                    )
+                response = self.tokenizer.decode(output_ids[0][input_ids.shape[1]:], skip_special_tokens=True)
+                corrections.update(parse_corrections(response))
+        finally:
+            self._cleanup()
+
+        return apply_corrections(captures, items, corrections)
@@ -0,0 +1,219 @@
+"""
+本地持久化 OCR 任务队列 (SQLite)
+- enqueue: 提交一组截图
+- lease / heartbeat: worker 领取任务并续租，租约过期的任务会被其他 worker 重新领取
+- complete / fail: 写入结果行或按 max_attempts 重试
+- depth / worker_throughput: 队列深度和各 worker 吞吐量
+
+领取任务使用单条 `UPDATE ... WHERE id = (SELECT ...) RETURNING`，SQLite 保证其原子性，
+多个进程同时领取也不会拿到同一个任务
+"""
+import json
+import os
+import socket
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, insert, func, and_, or_, case
+
+from backend.app.core.database import create_sqlite_engine
+from backend.app.models.job_model import (
+    JobBase, OCRJobModel, OCRJobResultModel, JOB_DATABASE_PATH,
+    JOB_QUEUED, JOB_LEASED, JOB_DONE, JOB_FAILED,
+)
+
+
+def default_worker_id() -> str:
+    """主机名:进程号，多机共享队列时可区分来源"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class OCRJobQueue:
+    def __init__(self, db_path: str = None, wal: bool = True, busy_timeout: float = 30.0):
+        """
+        Args:
+            db_path: 队列数据库路径，默认 finance.db 旁的 ocr_jobs.db
+            wal: 单机多进程时使用 WAL；多台机器通过网络文件系统共享时应设为 False
+                 (WAL 依赖共享内存，不适用于 NFS/SMB)
+            busy_timeout: 等待写锁的秒数
+        """
+        self.db_path = os.path.abspath(db_path or JOB_DATABASE_PATH)
+        self.engine = create_sqlite_engine(self.db_path, wal=wal, busy_timeout=busy_timeout)
+        JobBase.metadata.create_all(bind=self.engine)
+
+    def dispose(self):
+        self.engine.dispose()
+
+    # ------------------------------------------------------------------
+    # 生产者
+    # ------------------------------------------------------------------
+    def enqueue(self, category: str, periods_path: str, metrics_path: str, values_path: str,
+                metric_config: List[Dict] = None, max_attempts: int = 3) -> int:
+        """提交一组截图，返回任务 id；metric_config 默认取 config.py 中该类别的指标"""
+        if metric_config is None:
+            from backend.config.config import FINANCIAL_METRICS
+            metric_config = [m for m in FINANCIAL_METRICS if m.get('category') == category]
+        with self.engine.begin() as conn:
+            result = conn.execute(insert(OCRJobModel).values(
+                category=category,
+                periods_path=os.path.abspath(periods_path),
+                metrics_path=os.path.abspath(metrics_path),
+                values_path=os.path.abspath(values_path),
+                metric_config=json.dumps(metric_config, ensure_ascii=False),
+                status=JOB_QUEUED,
+                attempts=0,
+                max_attempts=max_attempts,
+                enqueued_at=time.time(),
+            ))
+            return result.inserted_primary_key[0]
+
+    # ------------------------------------------------------------------
+    # 消费者
+    # ------------------------------------------------------------------
+    def lease(self, worker_id: str, lease_seconds: float = 60.0) -> Optional[Dict]:
+        """
+        领取一个任务：排队中的任务，或租约已过期（worker 崩溃）的任务。
+        过期且重试次数用尽的任务先标记为失败。没有可领取任务时返回 None
+        """
+        now = time.time()
+        Job = OCRJobModel
+        expired = and_(Job.status == JOB_LEASED, Job.lease_expires < now)
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(Job)
+                .where(expired, Job.attempts >= Job.max_attempts)
+                .values(status=JOB_FAILED, finished_at=now,
+                        last_error=func.coalesce(Job.last_error, "lease expired"))
+            )
+            candidate = (
+                select(Job.id)
+                .where(or_(Job.status == JOB_QUEUED, expired), Job.attempts < Job.max_attempts)
+                .order_by(Job.id)
+                .limit(1)
+                .scalar_subquery()
+            )
+            row = conn.execute(
+                update(Job)
+                .where(Job.id == candidate)
+                .values(status=JOB_LEASED, lease_owner=worker_id, lease_expires=now + lease_seconds,
+                        attempts=Job.attempts + 1, started_at=now)
+                .returning(Job.id, Job.category, Job.periods_path, Job.metrics_path,
+                           Job.values_path, Job.metric_config, Job.attempts)
+            ).first()
+        if row is None:
+            return None
+        job = dict(row._mapping)
+        job["metric_config"] = json.loads(job["metric_config"] or "[]")
+        return job
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = 60.0) -> bool:
+        """续租；返回 False 表示租约已被其他 worker 接管"""
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(OCRJobModel)
+                .where(OCRJobModel.id == job_id, OCRJobModel.lease_owner == worker_id,
+                       OCRJobModel.status == JOB_LEASED)
+                .values(lease_expires=time.time() + lease_seconds)
+            )
+            return result.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, parsed_data: List[Dict],
+                 disclosure_date: str = "", elapsed: float = None) -> bool:
+        """写入结果行并标记完成；租约已丢失时不写入并返回 False"""
+        now = time.time()
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(OCRJobModel)
+                .where(OCRJobModel.id == job_id, OCRJobModel.lease_owner == worker_id,
+                       OCRJobModel.status == JOB_LEASED)
+                .values(status=JOB_DONE, finished_at=now, lease_expires=None, last_error=None)
+            )
+            if result.rowcount != 1:
+                return False
+            conn.execute(insert(OCRJobResultModel).values(
+                job_id=job_id,
+                worker_id=worker_id,
+                parsed_data=json.dumps(parsed_data, ensure_ascii=False),
+                disclosure_date=disclosure_date or "",
+                elapsed=elapsed,
+                finished_at=now,
+            ))
+        return True
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> str:
+        """任务执行出错：还有重试次数则重新排队，否则标记失败。返回新状态"""
+        now = time.time()
+        Job = OCRJobModel
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.lease_owner == worker_id, Job.status == JOB_LEASED)
+                .values(
+                    status=func.iif(Job.attempts < Job.max_attempts, JOB_QUEUED, JOB_FAILED),
+                    lease_owner=None, lease_expires=None, last_error=error,
+                    finished_at=func.iif(Job.attempts < Job.max_attempts, None, now),
+                )
+                .returning(Job.status)
+            ).first()
+        return row[0] if row else ""
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        with self.engine.connect() as conn:
+            row = conn.execute(select(OCRJobModel.__table__).where(OCRJobModel.id == job_id)).first()
+        return dict(row._mapping) if row else None
+
+    def get_result(self, job_id: int) -> Optional[Dict]:
+        """返回 {"parsed_data": [...], "disclosure_date", "worker_id", "elapsed", "finished_at"}"""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(OCRJobResultModel.__table__).where(OCRJobResultModel.job_id == job_id)
+            ).first()
+        if row is None:
+            return None
+        result = dict(row._mapping)
+        result["parsed_data"] = json.loads(result["parsed_data"] or "[]")
+        return result
+
+    def depth(self) -> Dict[str, int]:
+        """
+        各状态任务数 {"queued", "leased", "done", "failed"}；租约过期的任务按 lease 的处理方式计数：
+        还有重试次数的计入 queued，重试次数已用尽的计入 failed（下次 lease 时才会真正标记）
+        """
+        now = time.time()
+        Job = OCRJobModel
+        counts = {JOB_QUEUED: 0, JOB_LEASED: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        expired = and_(Job.status == JOB_LEASED, Job.lease_expires < now)
+        effective = case(
+            (and_(expired, Job.attempts >= Job.max_attempts), JOB_FAILED),
+            (expired, JOB_QUEUED),
+            else_=Job.status,
+        )
+        with self.engine.connect() as conn:
+            for status, count in conn.execute(select(effective, func.count()).group_by(effective)):
+                counts[status] = count
+        return counts
+
+    def worker_throughput(self, window_seconds: float = 300.0) -> Dict[str, Dict]:
+        """
+        最近 window_seconds 内每个 worker 完成的任务数与吞吐量
+        Returns: {worker_id: {"jobs", "jobs_per_min", "avg_elapsed"}}
+        """
+        since = time.time() - window_seconds
+        R = OCRJobResultModel
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(R.worker_id, func.count(), func.avg(R.elapsed))
+                .where(R.finished_at >= since)
+                .group_by(R.worker_id)
+            ).all()
+        return {
+            worker_id: {
+                "jobs": jobs,
+                "jobs_per_min": jobs * 60.0 / window_seconds,
+                "avg_elapsed": avg_elapsed,
+            }
+            for worker_id, jobs, avg_elapsed in rows
+        }
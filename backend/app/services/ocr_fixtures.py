@@ -0,0 +1,91 @@
+"""
+OCR 原始结果录制与回放
+将 easyocr readtext 的原始输出保存为紧凑的 JSON 夹具文件，
+OCRService.parse_ocr_results / parse_fixture 可直接基于夹具运行解析阶段，
+解析规则的回归测试和基准测试因此无需加载模型
+
+夹具格式 (*.ocr.json，以 .gz 结尾时 gzip 压缩):
+    {"version": 1, "meta": {...},
+     "stages": {"periods": [[[x1, y1, ..., x4, y4], "text", prob], ...],
+                "metrics": [...], "values": [...]}}
+"""
+import gzip
+import json
+import os
+from typing import Dict, List
+
+FIXTURE_VERSION = 1
+STAGES = ("periods", "metrics", "values")
+
+
+def _compact_number(v, ndigits):
+    """numpy 标量转为 JSON 数字，整数坐标保持整数"""
+    v = float(v)
+    return int(v) if v.is_integer() else round(v, ndigits)
+
+
+def encode_results(results) -> List[list]:
+    """readtext 输出 [(bbox, text, prob), ...] -> 紧凑列表，bbox 展平为 8 个数"""
+    encoded = []
+    for bbox, text, prob in results:
+        flat = [_compact_number(c, 1) for point in bbox for c in point]
+        encoded.append([flat, text, _compact_number(prob, 4)])
+    return encoded
+
+
+def decode_results(encoded: List[list]) -> List[tuple]:
+    """紧凑列表 -> readtext 输出格式 [(bbox, text, prob), ...]"""
+    results = []
+    for flat, text, prob in encoded:
+        bbox = [[flat[i], flat[i + 1]] for i in range(0, 8, 2)]
+        results.append((bbox, text, prob))
+    return results
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def save_fixture(raw: Dict[str, list], path: str, meta: Dict = None):
+    """保存 read_images() 返回的原始结果"""
+    data = {
+        "version": FIXTURE_VERSION,
+        "meta": meta or {},
+        "stages": {stage: encode_results(raw.get(stage, [])) for stage in STAGES},
+    }
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    with _open(path, "w") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_fixture(path: str) -> Dict[str, list]:
+    """读取夹具，返回与 OCRService.read_images() 相同结构的原始结果"""
+    with _open(path, "r") as f:
+        data = json.load(f)
+    if data.get("version") != FIXTURE_VERSION:
+        raise ValueError(f"不支持的夹具版本: {data.get('version')} ({path})")
+    return {stage: decode_results(data["stages"].get(stage, [])) for stage in STAGES}
+
+
+def load_fixture_meta(path: str) -> Dict:
+    """读取夹具的元信息（来源截图、类别等）"""
+    with _open(path, "r") as f:
+        return json.load(f).get("meta", {})
+
+
+def record_fixture(ocr_service, periods_path: str, metrics_path: str, values_path: str,
+                   path: str, meta: Dict = None) -> Dict[str, list]:
+    """对三张截图运行一次真实推理并录制为夹具，返回原始结果"""
+    raw = ocr_service.read_images(periods_path, metrics_path, values_path)
+    meta = dict(meta or {})
+    meta.setdefault("images", {
+        "periods": os.path.basename(periods_path),
+        "metrics": os.path.basename(metrics_path),
+        "values": os.path.basename(values_path),
+    })
+    save_fixture(raw, path, meta)
+    return raw
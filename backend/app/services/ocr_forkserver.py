@@ -0,0 +1,187 @@
+"""
+Fork-server OCR worker 启动器
+父进程只加载一次 easyocr 模型，然后 fork 出多个队列 worker；
+子进程通过写时复制 (copy-on-write) 共享父进程的权重张量，
+每增加一个 worker 只增加其自身的工作内存
+    python -m backend.app.services.ocr_forkserver --workers 4 [--queue-db ocr_jobs.db]
+
+仅支持 Linux/CPU：CUDA 上下文不能跨 fork 使用
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, List
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from backend.app.services.job_queue import default_worker_id
+
+# /proc/<pid>/smaps_rollup 中关心的字段 (kB)
+_SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_memory(pid: int) -> Dict[str, int]:
+    """
+    读取进程内存 (字节)：rss、pss、shared、uss (= 私有页，即该进程独占的内存)
+    """
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        path = f"/proc/{pid}/smaps"
+    totals = dict.fromkeys(_SMAPS_FIELDS, 0)
+    with open(path) as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in totals:
+                totals[key] += int(rest.split()[0]) * 1024
+    return {
+        "rss": totals["Rss"],
+        "pss": totals["Pss"],
+        "shared": totals["Shared_Clean"] + totals["Shared_Dirty"],
+        "uss": totals["Private_Clean"] + totals["Private_Dirty"],
+    }
+
+
+def preload_ocr_service(gpu: bool = False, languages=None, profile=None):
+    """在父进程中创建 OCRService 并立即加载模型权重"""
+    if gpu:
+        raise ValueError("fork 共享权重仅支持 CPU 模式 (CUDA 上下文不能跨 fork)")
+    from backend.app.services.ocr_service import OCRService
+    service = OCRService(languages=languages or ['ch_sim', 'en'], gpu=False, profile=profile)
+    service.reader  # 触发加载
+    return service
+
+
+def _worker_main(ocr_service, queue_db, wal, worker_id, options):
+    """子进程入口：ocr_service 由 fork 继承，不经过序列化"""
+    torch = sys.modules.get("torch")
+    if torch is not None and options.get("torch_threads"):
+        # 避免 N 个 worker 各自占满所有核心
+        torch.set_num_threads(options["torch_threads"])
+
+    from backend.app.services.job_queue import OCRJobQueue
+    from backend.app.services.ocr_worker import run_worker
+    queue = OCRJobQueue(queue_db, wal=wal)
+    run_worker(queue, ocr_service, worker_id=worker_id,
+               lease_seconds=options.get("lease_seconds", 60.0),
+               poll_interval=options.get("poll_interval", 1.0),
+               burst=options.get("burst", False))
+
+
+class ForkedWorkerPool:
+    """
+    以已加载模型的 OCRService 为模板 fork 出多个队列 worker
+
+    Args:
+        ocr_service: 父进程中已加载权重的服务（或任何提供 parse_multi_image 的对象）
+        queue_db: 队列数据库路径
+        torch_threads: 每个 worker 的 torch 线程数，默认 CPU 核数 / worker 数
+    """
+
+    def __init__(self, ocr_service, queue_db: str = None, wal: bool = True, torch_threads: int = None,
+                 lease_seconds: float = 60.0, poll_interval: float = 1.0, burst: bool = False):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("当前平台不支持 fork")
+        self.ocr_service = ocr_service
+        self.queue_db = queue_db
+        self.wal = wal
+        self.torch_threads = torch_threads
+        self.options = {"lease_seconds": lease_seconds, "poll_interval": poll_interval, "burst": burst}
+        self._ctx = multiprocessing.get_context("fork")
+        self.processes: List[multiprocessing.Process] = []
+
+    def start(self, num_workers: int):
+        """fork 出 num_workers 个 worker（可多次调用以追加 worker）"""
+        # 把已有对象移入永久代，避免子进程中的 GC 遍历改写对象头导致页面被复制
+        gc.collect()
+        gc.freeze()
+        total = len(self.processes) + num_workers
+        options = dict(self.options,
+                       torch_threads=self.torch_threads or max(1, (os.cpu_count() or 1) // total))
+        for _ in range(num_workers):
+            index = len(self.processes)
+            worker_id = f"{default_worker_id()}/fork{index}"
+            p = self._ctx.Process(
+                target=_worker_main,
+                args=(self.ocr_service, self.queue_db, self.wal, worker_id, options),
+                name=f"ocr-fork-{index}",
+                daemon=True,
+            )
+            p.start()
+            self.processes.append(p)
+        return self
+
+    def memory_report(self) -> Dict:
+        """
+        父进程与各 worker 的内存占用；worker 的 uss 即新增一个 worker 的边际内存
+        Returns: {"parent": {...}, "workers": {pid: {...}}, "total_uss": int}
+        """
+        parent = read_memory(os.getpid())
+        workers = {}
+        for p in self.processes:
+            if p.is_alive():
+                try:
+                    workers[p.pid] = read_memory(p.pid)
+                except (FileNotFoundError, ProcessLookupError):
+                    pass
+        total_uss = parent["uss"] + sum(w["uss"] for w in workers.values())
+        return {"parent": parent, "workers": workers, "total_uss": total_uss}
+
+    def join(self, timeout: float = None):
+        for p in self.processes:
+            p.join(timeout)
+
+    def stop(self, timeout: float = 10.0):
+        for p in self.processes:
+            if p.is_alive():
+                p.terminate()
+        for p in self.processes:
+            p.join(timeout)
+        self.processes = []
+        gc.unfreeze()
+
+
+def format_memory_report(report: Dict) -> str:
+    mb = lambda b: f"{b / 1024 / 1024:.1f}MB"
+    parent = report["parent"]
+    lines = [f"parent pid={os.getpid()}: rss={mb(parent['rss'])} uss={mb(parent['uss'])}"]
+    for pid, m in report["workers"].items():
+        lines.append(f"  worker pid={pid}: rss={mb(m['rss'])} shared={mb(m['shared'])} "
+                     f"uss={mb(m['uss'])} pss={mb(m['pss'])}")
+    lines.append(f"total unique memory: {mb(report['total_uss'])}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="预加载模型后 fork 多个 OCR 队列 worker")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-db", help="队列数据库路径 (默认: finance.db 旁的 ocr_jobs.db)")
+    parser.add_argument("--no-wal", action="store_true")
+    parser.add_argument("--torch-threads", type=int)
+    parser.add_argument("--profile", help="ocr_tuner 生成的参数配置 (JSON)")
+    parser.add_argument("--report-interval", type=float, default=30.0, help="内存报告间隔 (秒)")
+    parser.add_argument("--burst", action="store_true", help="队列为空时 worker 退出")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    service = preload_ocr_service(profile=args.profile)
+    print(f"模型加载完成，用时 {time.perf_counter() - start:.1f}s")
+
+    pool = ForkedWorkerPool(service, args.queue_db, wal=not args.no_wal,
+                            torch_threads=args.torch_threads, burst=args.burst).start(args.workers)
+    try:
+        while any(p.is_alive() for p in pool.processes):
+            print(format_memory_report(pool.memory_report()), flush=True)
+            time.sleep(args.report_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+识别阶段调度：按宽高比分桶批量识别文本框
+easyocr 在一个批次内把所有裁剪图填充到最宽的那一张；数值单元格、季度表头和长中文科目名
+宽度差异很大，混在一批里大部分计算都耗在填充上。
+这里先按宽高比把检测框分桶，每个桶作为一个批次调用 reader.recognize，
+再按输入顺序（先 horizontal_list 后 free_list）还原结果
+"""
+from bisect import bisect_right
+from collections import defaultdict, deque
+from typing import Dict, List, Sequence, Tuple
+
+# 宽高比分桶边界：[0,2) [2,4) [4,8) [8,16) [16,32) [32,∞)
+DEFAULT_BUCKET_EDGES = (2.0, 4.0, 8.0, 16.0, 32.0)
+
+
+def box_aspect(box) -> float:
+    """检测框宽高比；horizontal 框为 [x_min, x_max, y_min, y_max]，free 框为四个顶点"""
+    if len(box) == 4 and not isinstance(box[0], (list, tuple)):
+        x_min, x_max, y_min, y_max = box
+    else:
+        xs = [p[0] for p in box]
+        ys = [p[1] for p in box]
+        x_min, x_max, y_min, y_max = min(xs), max(xs), min(ys), max(ys)
+    return (x_max - x_min) / max(y_max - y_min, 1)
+
+
+def bucket_boxes(horizontal_list: list, free_list: list,
+                 edges: Sequence[float] = DEFAULT_BUCKET_EDGES) -> Dict[int, Tuple[list, list]]:
+    """按宽高比分桶，返回 {桶号: (horizontal 子列表, free 子列表)}，桶内保持输入顺序"""
+    buckets = defaultdict(lambda: ([], []))
+    for box in horizontal_list:
+        buckets[bisect_right(edges, box_aspect(box))][0].append(box)
+    for box in free_list:
+        buckets[bisect_right(edges, box_aspect(box))][1].append(box)
+    return dict(sorted(buckets.items()))
+
+
+def estimate_padding(horizontal_list: list, free_list: list, edges: Sequence[float] = None,
+                     model_height: int = 64) -> Dict[str, int]:
+    """
+    估算识别阶段的像素量：裁剪图缩放到 model_height 高后，批内填充到最宽者
+    edges 为 None 时视为所有框一个批次（easyocr 默认行为）
+    Returns: {"useful": 有效像素, "padded": 含填充的总像素}
+    """
+    if edges is None:
+        batches = [(horizontal_list, free_list)]
+    else:
+        batches = list(bucket_boxes(horizontal_list, free_list, edges).values())
+    useful = padded = 0
+    for bucket_h, bucket_f in batches:
+        widths = [int(model_height * box_aspect(b)) for b in list(bucket_h) + list(bucket_f)]
+        if widths:
+            useful += sum(widths) * model_height
+            padded += max(widths) * len(widths) * model_height
+    return {"useful": useful, "padded": padded}
+
+
+def _box_key(box) -> tuple:
+    """结果中的框与输入框对应的键（识别结果的框坐标即输入框坐标）"""
+    return tuple((int(p[0]), int(p[1])) for p in box)
+
+
+def _horizontal_to_points(box) -> list:
+    x_min, x_max, y_min, y_max = box
+    return [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+
+
+def recognize_bucketed(reader, image, horizontal_list: list, free_list: list,
+                       edges: Sequence[float] = DEFAULT_BUCKET_EDGES, **recognize_kw) -> List:
+    """
+    分桶批量识别，结果与 reader.recognize(image, horizontal_list, free_list) 一一对应，
+    顺序为输入顺序：先 horizontal_list，后 free_list
+
+    Args:
+        reader: easyocr.Reader（或提供 recognize 的对象）
+        image: 原分辨率灰度图 (numpy 数组)
+        edges: 宽高比分桶边界
+        recognize_kw: 透传给 reader.recognize（batch_size 由桶大小决定）
+    """
+    if recognize_kw.get("paragraph"):
+        # 段落模式会合并文本框，无法按框还原顺序
+        return reader.recognize(image, horizontal_list=horizontal_list, free_list=free_list, **recognize_kw)
+
+    detail = recognize_kw.pop("detail", 1)
+    recognize_kw.pop("batch_size", None)
+    results = defaultdict(deque)
+    for bucket_h, bucket_f in bucket_boxes(horizontal_list, free_list, edges).values():
+        for item in reader.recognize(image, horizontal_list=bucket_h, free_list=bucket_f,
+                                     batch_size=len(bucket_h) + len(bucket_f), detail=1, **recognize_kw):
+            results[_box_key(item[0])].append(item)
+
+    ordered = []
+    for points in [_horizontal_to_points(b) for b in horizontal_list] + list(free_list):
+        queue = results.get(_box_key(points))
+        if queue:
+            ordered.append(queue.popleft())
+    if detail == 0:
+        return [item[1] for item in ordered]
+    return ordered
@@ -1,22 +1,164 @@
-import easyocr
 import re
-import numpy as np
+import os
+import json
 import difflib
-from PIL import Image
-from typing import List, Dict, Tuple
+import threading
+from typing import List, Dict, Optional, Tuple
+
+# easyocr (连带 torch) 导入需要数秒，延迟到第一次推理时再加载，
+# 只读写数据库的工具和 CLI 导入本模块时不再付出这部分启动开销
+_easyocr = None
+_easyocr_lock = threading.Lock()
+
+
+def _load_easyocr():
+    """按需导入 easyocr 模块"""
+    global _easyocr
+    if _easyocr is None:
+        with _easyocr_lock:
+            if _easyocr is None:
+                import easyocr
+                _easyocr = easyocr
+    return _easyocr
+
+
+# 扩展别名映射（针对低置信度OCR结果）
+METRIC_ALIASES = {
+    # EPS 别名（包括所有可能的OCR错误变体）
+    "其本每股收益": "每股收益 (EPS)",
+    "基本每股收益": "每股收益 (EPS)",
+    "稀释每股收益": "每股收益 (EPS)",
+    "每股收益": "每股收益 (EPS)",
+    "EPS": "每股收益 (EPS)",
+    "每股盈利": "每股收益 (EPS)",
+    # 营业相关（OCR常将"营"识别为"菅"）
+    "菅业总收入": "营业总收入",
+    "菅业费用": "营业费用",
+    "其他菅业费用": "营业费用",
+    "菅业利润": "营业利润",
+    # 归母净利润
+    "归屑于母公司股东净利润": "归属母公司净利润",
+    "归属于普通股股东净利润": "归属母公司净利润",
+    "归属母公司股东净利润": "归属母公司净利润",
+    # 其他
+    "毛利润": "毛利",
+}
+
+
+def is_non_metric_text(clean_text: str) -> bool:
+    """科目截图中的非科目文本（截止日期、会计准则、审计意见等）"""
+    return '截止' in clean_text or '会计' in clean_text or '审计' in clean_text
+
+
+def match_metric_label(clean_text: str, metric_config: List[Dict], config_labels: List[str] = None) -> Optional[str]:
+    """将一个科目 OCR 文本匹配到配置中的指标 label，匹配失败返回 None"""
+    # 1. 首先尝试别名匹配（优先级最高）
+    for alias, label in METRIC_ALIASES.items():
+        if alias in clean_text or clean_text in alias:
+            return label
+    
+    # 2. 如果别名匹配失败，尝试模糊匹配（降低cutoff到0.4）
+    if config_labels is None:
+        config_labels = [m['label'] for m in metric_config]
+    best_match = difflib.get_close_matches(clean_text, config_labels, n=1, cutoff=0.4)
+    if best_match:
+        return best_match[0]
+    
+    # 3. 最后尝试简单包含匹配
+    for m in metric_config:
+        if m['label'] in clean_text or clean_text in m['label']:
+            return m['label']
+    return None
+
+
+# ocr_tuner 生成的默认参数配置文件
+DEFAULT_PROFILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "config", "ocr_profile.json"))
+
+
+# readtext 参数中属于检测阶段 (CRAFT) 的部分，两级尺度模式下只传给 reader.detect
+DETECT_PARAMS = (
+    "min_size", "text_threshold", "low_text", "link_threshold", "canvas_size", "mag_ratio",
+    "slope_ths", "ycenter_ths", "height_ths", "width_ths", "add_margin", "optimal_num_chars",
+    "threshold", "bbox_min_score", "bbox_min_size", "max_candidates",
+)
+# 属于识别阶段的部分，只传给 reader.recognize
+RECOGNIZE_PARAMS = (
+    "decoder", "beamWidth", "batch_size", "workers", "allowlist", "blocklist", "detail",
+    "rotation_info", "paragraph", "contrast_ths", "adjust_contrast", "filter_ths",
+    "y_ths", "x_ths", "output_format",
+)
+# profile 顶层中由 OCRService 自身处理（而非传给 easyocr）的参数
+SERVICE_PROFILE_KEYS = ("detect_scale", "width_buckets")
+
+
+def load_ocr_profile(profile) -> Dict:
+    """
+    读取 OCR 参数配置：dict 原样返回，字符串视为 JSON 文件路径
+    配置格式: {"readtext": {"canvas_size": 1280, "mag_ratio": 1.0, ...}, "detect_scale": 0.5, ...}
+    """
+    if not profile:
+        return {}
+    if isinstance(profile, dict):
+        return profile
+    with open(profile, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def validate_detect_scale(value) -> float:
+    """detect_scale 必须为正数（>= 1 表示检测不缩小）；0 或负数会让检测图尺寸与框坐标换算失效"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not value > 0:
+        raise ValueError(f"detect_scale 必须为正数: {value!r}")
+    return float(value)
+
+
+def scale_boxes(horizontal_list: list, free_list: list, factor: float, width: int, height: int) -> Tuple[list, list]:
+    """
+    将 reader.detect 在缩小图上得到的框放大回原图坐标
+    horizontal_list: [[x_min, x_max, y_min, y_max], ...]；free_list: [[[x, y] * 4], ...]
+    """
+    def clip(v, upper):
+        return min(max(int(round(v)), 0), upper)
+
+    horizontal = [
+        [clip(x_min * factor, width), clip(x_max * factor, width),
+         clip(y_min * factor, height), clip(y_max * factor, height)]
+        for x_min, x_max, y_min, y_max in horizontal_list
+    ]
+    free = [[[x * factor, y * factor] for x, y in box] for box in free_list]
+    return horizontal, free
+
 
 class OCRService:
-    def __init__(self, languages=['ch_sim', 'en'], gpu=True):
+    def __init__(self, languages=['ch_sim', 'en'], gpu=True, profile=None, detect_scale=None, width_buckets=None):
         self.languages = languages
         self.gpu = gpu
-        self.reader = easyocr.Reader(languages, gpu=gpu)
+        self._reader = None
+        self._reader_lock = threading.Lock()
+        self.profile = load_ocr_profile(profile)
+        # 传给 reader.readtext 的推理参数 (canvas_size, mag_ratio, text_threshold, ...)
+        self.readtext_params = dict(self.profile.get("readtext", {}))
+        # 两级尺度：< 1 时检测在缩小图上运行，识别仍使用原图裁剪
+        self.detect_scale = validate_detect_scale(
+            detect_scale if detect_scale is not None else self.profile.get("detect_scale", 1.0))
+        # 识别阶段按宽高比分桶批量：True 使用默认分桶边界，或给出边界列表
+        self.width_buckets = width_buckets if width_buckets is not None else self.profile.get("width_buckets", False)
+
+    @property
+    def reader(self):
+        """easyocr.Reader，第一次访问时才加载模型权重"""
+        if self._reader is None:
+            with self._reader_lock:
+                if self._reader is None:
+                    self._reader = _load_easyocr().Reader(self.languages, gpu=self.gpu)
+        return self._reader
 
     def extract_text_from_image(self, image_path: str) -> List[Dict]:
         """
         Extract text and coordinates from an image.
         Returns a list of dicts with 'text', 'box', and 'confidence'.
+        与 read_images 相同，使用 profile 中调优过的推理参数
         """
-        results = self.reader.readtext(image_path)
+        results = self._readtext(self.reader, image_path)
         extracted = []
         for (bbox, text, prob) in results:
             extracted.append({
@@ -32,26 +174,92 @@ class OCRService:
         except RuntimeError as e:
             if "out of memory" in str(e).lower() and self.gpu:
                 print("CUDA OOM detected! Falling back to CPU for OCR...")
-                temp_reader = easyocr.Reader(self.languages, gpu=False)
-                original_reader = self.reader
-                self.reader = temp_reader
-                try:
-                    return self._do_parse_multi_image(periods_path, metrics_path, values_path, metric_config)
-                finally:
-                    self.reader = original_reader
+                # 临时 CPU reader 只在本次调用内使用，不替换 self.reader，
+                # 避免并发识别时其他线程拿到被切换的 reader
+                temp_reader = _load_easyocr().Reader(self.languages, gpu=False)
+                return self._do_parse_multi_image(periods_path, metrics_path, values_path, metric_config, reader=temp_reader)
             raise e
 
-    def _do_parse_multi_image(self, periods_path: str, metrics_path: str, values_path: str, metric_config: List[Dict]) -> Tuple[List[Dict], str]:
+    def _do_parse_multi_image(self, periods_path: str, metrics_path: str, values_path: str, metric_config: List[Dict], reader=None) -> Tuple[List[Dict], str]:
         """
         Coordinate OCR across three images.
         Returns (parsed_data, disclosure_date)
         Each item in parsed_data includes: metric_id, period, value, report_date (per-period)
         """
+        raw = self.read_images(periods_path, metrics_path, values_path, reader=reader)
+        return self.parse_ocr_results(raw, metric_config)
+
+    def read_images(self, periods_path: str, metrics_path: str, values_path: str, reader=None) -> Dict[str, list]:
+        """
+        Inference stage: run readtext on the three screenshots.
+        Returns raw readtext output keyed by stage: {"periods": [...], "metrics": [...], "values": [...]}
+        """
+        reader = reader or self.reader
+        return {
+            "periods": self._readtext(reader, periods_path),
+            "metrics": self._readtext(reader, metrics_path),
+            "values": self._readtext(reader, values_path),
+        }
+
+    def _readtext(self, reader, image_path: str) -> list:
+        if (self.detect_scale and self.detect_scale < 1.0) or self.width_buckets:
+            return self._readtext_staged(reader, image_path)
+        return reader.readtext(image_path, **self.readtext_params)
+
+    def _readtext_staged(self, reader, image_path: str) -> list:
+        """
+        分阶段 readtext，输出格式与 reader.readtext 相同
+        - 两级尺度：CRAFT 检测在按 detect_scale 缩小的副本上运行（耗时随像素数下降），
+          检测框放大回原图坐标后，识别器在原分辨率灰度图上裁剪识别
+        - width_buckets：识别阶段按宽高比分桶批量，减少填充
+        """
+        import numpy as np
+        from PIL import Image
+
+        scale = self.detect_scale if self.detect_scale and self.detect_scale < 1.0 else 1.0
+        with Image.open(image_path) as img:
+            img = img.convert("RGB")
+            width, height = img.size
+            if scale < 1.0:
+                small_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                small = np.asarray(img.resize(small_size, Image.BILINEAR))
+            else:
+                small = np.asarray(img)
+            grey = np.asarray(img.convert("L"))
+
+        detect_kw = {k: v for k, v in self.readtext_params.items() if k in DETECT_PARAMS}
+        # min_size 以像素计，按缩放比例换算，保持与原图相同的过滤效果
+        detect_kw["min_size"] = max(1, int(round(detect_kw.get("min_size", 20) * scale)))
+        horizontal_list, free_list = reader.detect(small, **detect_kw)
+        horizontal, free = scale_boxes(horizontal_list[0], free_list[0], 1.0 / scale, width, height)
+        if not horizontal and not free:
+            return []
+
+        recognize_kw = {k: v for k, v in self.readtext_params.items() if k in RECOGNIZE_PARAMS}
+        if self.width_buckets:
+            from backend.app.services.ocr_recognition import DEFAULT_BUCKET_EDGES, recognize_bucketed
+            edges = DEFAULT_BUCKET_EDGES if self.width_buckets is True else self.width_buckets
+            return recognize_bucketed(reader, grey, horizontal, free, edges=edges, **recognize_kw)
+        return reader.recognize(grey, horizontal_list=horizontal, free_list=free, **recognize_kw)
+
+    def parse_fixture(self, fixture_path: str, metric_config: List[Dict]) -> Tuple[List[Dict], str]:
+        """
+        Run the parse stage against a recorded fixture (see ocr_fixtures.py).
+        No model is loaded.
+        """
+        from backend.app.services.ocr_fixtures import load_fixture
+        return self.parse_ocr_results(load_fixture(fixture_path), metric_config)
+
+    def parse_ocr_results(self, raw: Dict[str, list], metric_config: List[Dict]) -> Tuple[List[Dict], str]:
+        """
+        Parse stage: map raw readtext output of the three screenshots to cells.
+        Pure Python, needs no reader; `raw` comes from read_images() or a replayed fixture.
+        """
         # Date pattern
         date_pattern = re.compile(r'(\d{4}[年/.-]\d{1,2}[月/.-]\d{1,2}日?)')
         
         # ========== 1. Periods (X-axis) ==========
-        p_ocr = self.reader.readtext(periods_path)
+        p_ocr = raw["periods"]
         headers = []
         for (bbox, text, prob) in p_ocr:
             clean_text = text.replace(" ", "").upper()
@@ -80,59 +288,19 @@ class OCRService:
         headers.sort(key=lambda x: x['x'])
 
         # ========== 2. Metrics (Y-axis) with Enhanced Matching ==========
-        m_ocr = self.reader.readtext(metrics_path)
+        m_ocr = raw["metrics"]
         indices = []
         config_labels = [m['label'] for m in metric_config]
         
-        # 扩展别名映射（针对低置信度OCR结果）
-        alias_map = {
-            # EPS 别名（包括所有可能的OCR错误变体）
-            "其本每股收益": "每股收益 (EPS)",
-            "基本每股收益": "每股收益 (EPS)",
-            "稀释每股收益": "每股收益 (EPS)",
-            "每股收益": "每股收益 (EPS)",
-            "EPS": "每股收益 (EPS)",
-            "每股盈利": "每股收益 (EPS)",
-            # 营业相关（OCR常将"营"识别为"菅"）
-            "菅业总收入": "营业总收入",
-            "菅业费用": "营业费用",
-            "其他菅业费用": "营业费用",
-            "菅业利润": "营业利润",
-            # 归母净利润
-            "归屑于母公司股东净利润": "归属母公司净利润",
-            "归属于普通股股东净利润": "归属母公司净利润",
-            "归属母公司股东净利润": "归属母公司净利润",
-            # 其他
-            "毛利润": "毛利",
-        }
-        
         for (bbox, text, prob) in m_ocr:
             current_y = sum([p[1] for p in bbox]) / 4
             clean_text = text.replace(" ", "")
             
             # 跳过非科目文本
-            if '截止' in clean_text or '会计' in clean_text or '审计' in clean_text:
+            if is_non_metric_text(clean_text):
                 continue
             
-            # 1. 首先尝试别名匹配（优先级最高）
-            matched_label = None
-            for alias, label in alias_map.items():
-                if alias in clean_text or clean_text in alias:
-                    matched_label = label
-                    break
-            
-            # 2. 如果别名匹配失败，尝试模糊匹配（降低cutoff到0.4）
-            if not matched_label:
-                best_match = difflib.get_close_matches(clean_text, config_labels, n=1, cutoff=0.4)
-                if best_match:
-                    matched_label = best_match[0]
-            
-            # 3. 最后尝试简单包含匹配
-            if not matched_label:
-                for m in metric_config:
-                    if m['label'] in clean_text or clean_text in m['label']:
-                        matched_label = m['label']
-                        break
+            matched_label = match_metric_label(clean_text, metric_config, config_labels)
             
             if matched_label:
                 metric_obj = next((m for m in metric_config if m['label'] == matched_label), None)
@@ -149,7 +317,7 @@ class OCRService:
         indices.sort(key=lambda x: x['y'])
 
         # ========== 3. Values (Main Grid) + Per-Period Dates ==========
-        v_ocr = self.reader.readtext(values_path)
+        v_ocr = raw["values"]
         values = []
         period_dates = []  # 存储(x_center, date)用于后续匹配
         
@@ -0,0 +1,348 @@
+"""
+easyocr 推理参数自动调优
+在带标注的截图集上搜索 readtext 参数 (canvas_size, mag_ratio, text_threshold, low_text,
+batch_size, decoder, ...)，选出单元格准确率不低于下限的最快配置，写成 OCRService 可加载的 profile
+    python -m backend.app.services.ocr_tuner --cases samples/ocr_cases --floor 0.95 \
+        --out backend/config/ocr_profile.json
+
+标注文件 (*.label.json)，截图路径相对于标注文件:
+    {"category": "利润表", "periods": "p.png", "metrics": "m.png", "values": "v.png",
+     "cells": [{"metric_id": "EPS", "period": "2024/Q1", "value": "0.60"}, ...]}
+make_synthetic_case() 可以用 PIL 渲染合成截图并生成对应标注；没有标注集时用 --synthetic N 合成 N 组:
+    python -m backend.app.services.ocr_tuner --synthetic 20 --floor 0.95
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+# easyocr readtext 的默认值，作为第一个候选（基准）；detect_scale 是 OCRService 自身的参数
+EASYOCR_DEFAULTS = {
+    "detect_scale": 1.0,
+    "canvas_size": 2560,
+    "mag_ratio": 1.0,
+    "text_threshold": 0.7,
+    "low_text": 0.4,
+    "link_threshold": 0.4,
+    "batch_size": 1,
+    "decoder": "greedy",
+}
+
+DEFAULT_SEARCH_SPACE = {
+    "detect_scale": [1.0, 0.75, 0.5],
+    "canvas_size": [2560, 1920, 1280, 960],
+    "mag_ratio": [1.0, 0.75, 0.5, 1.5],
+    "text_threshold": [0.7, 0.6, 0.8],
+    "low_text": [0.4, 0.3, 0.5],
+    "link_threshold": [0.4, 0.3, 0.5],
+    "batch_size": [1, 8, 16],
+    "decoder": ["greedy", "beamsearch"],
+}
+
+# 常见 CJK 字体位置，渲染合成截图时使用
+CJK_FONT_CANDIDATES = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+]
+
+
+# =============================================================================
+# 标注集
+# =============================================================================
+
+def load_cases(case_dir: str) -> List[Dict]:
+    """读取目录下所有 *.label.json，截图路径解析为绝对路径"""
+    cases = []
+    for label_path in sorted(glob.glob(os.path.join(case_dir, "**", "*.label.json"), recursive=True)):
+        with open(label_path, "r", encoding="utf-8") as f:
+            case = json.load(f)
+        base = os.path.dirname(label_path)
+        for stage in ("periods", "metrics", "values"):
+            case[stage] = os.path.join(base, case[stage])
+        case["name"] = os.path.basename(label_path)[:-len(".label.json")]
+        cases.append(case)
+    return cases
+
+
+def split_params(params: Dict) -> Tuple[Dict, Dict]:
+    """候选参数拆分为 (readtext 参数, OCRService 参数)"""
+    from backend.app.services.ocr_service import SERVICE_PROFILE_KEYS
+    readtext = {k: v for k, v in params.items() if k not in SERVICE_PROFILE_KEYS}
+    service = {k: v for k, v in params.items() if k in SERVICE_PROFILE_KEYS}
+    return readtext, service
+
+
+def _normalise_value(value) -> str:
+    return str(value).replace(" ", "").replace(",", "")
+
+
+def cell_accuracy(parsed: List[Dict], expected: List[Dict]) -> float:
+    """期望单元格中 (metric_id, period, value) 完全识别正确的比例"""
+    if not expected:
+        return 1.0
+    got = {(d["metric_id"], d["period"]): _normalise_value(d["value"]) for d in parsed}
+    correct = sum(
+        1 for c in expected
+        if got.get((c["metric_id"], c["period"])) == _normalise_value(c["value"])
+    )
+    return correct / len(expected)
+
+
+def find_cjk_font() -> Optional[str]:
+    for path in CJK_FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def make_synthetic_case(out_dir: str, name: str, category: str, metric_config: List[Dict],
+                        periods: List[str], values: Dict[str, List[str]], dates: List[str] = None,
+                        font_path: str = None, font_size: int = 18, col_width: int = 120,
+                        row_height: int = 36) -> str:
+    """
+    渲染一组合成截图 (季度表头 / 科目列 / 数据网格) 并写出标注文件
+
+    Args:
+        values: {metric_id: [每个季度的值]}
+        dates: 每个季度的截止日期，渲染在数据网格首行
+    Returns:
+        标注文件路径
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    font_path = font_path or find_cjk_font()
+    if not font_path:
+        raise RuntimeError("未找到 CJK 字体，请通过 font_path 指定")
+    font = ImageFont.truetype(font_path, font_size)
+    labels = {m["id"]: m["label"] for m in metric_config}
+    metric_ids = list(values.keys())
+    offset = 1 if dates else 0
+    os.makedirs(out_dir, exist_ok=True)
+
+    def canvas(width, height):
+        img = Image.new("RGB", (width, height), "white")
+        return img, ImageDraw.Draw(img)
+
+    img_p, draw = canvas(col_width * len(periods) + 20, row_height + 10)
+    for i, period in enumerate(periods):
+        draw.text((10 + i * col_width, 8), period, fill="black", font=font)
+
+    img_m, draw = canvas(320, row_height * (len(metric_ids) + offset) + 10)
+    for r, metric_id in enumerate(metric_ids):
+        draw.text((10, 8 + (r + offset) * row_height), labels[metric_id], fill="black", font=font)
+
+    img_v, draw = canvas(col_width * len(periods) + 20, row_height * (len(metric_ids) + offset) + 10)
+    for i, date in enumerate(dates or []):
+        draw.text((10 + i * col_width, 8), date, fill="black", font=font)
+    cells = []
+    for r, metric_id in enumerate(metric_ids):
+        for i, value in enumerate(values[metric_id]):
+            draw.text((10 + i * col_width, 8 + (r + offset) * row_height), value, fill="black", font=font)
+            cells.append({"metric_id": metric_id, "period": periods[i], "value": value})
+
+    files = {}
+    for stage, img in (("periods", img_p), ("metrics", img_m), ("values", img_v)):
+        files[stage] = f"{name}_{stage[0]}.png"
+        img.save(os.path.join(out_dir, files[stage]))
+
+    label_path = os.path.join(out_dir, f"{name}.label.json")
+    with open(label_path, "w", encoding="utf-8") as f:
+        json.dump(dict(category=category, cells=cells, **files), f, ensure_ascii=False, indent=2)
+    return label_path
+
+
+def make_synthetic_cases(out_dir: str, count: int, metric_config: List[Dict], seed: int = 0,
+                         font_path: str = None, num_periods: int = 4, max_metrics: int = 6) -> List[str]:
+    """
+    按类别轮流生成 count 组合成截图：每组取该类别的前 max_metrics 个指标、连续 num_periods 个季度，
+    数值随机（含负数与千分位写法）。返回标注文件路径
+    """
+    rng = random.Random(seed)
+    categories = list(dict.fromkeys(m["category"] for m in metric_config if m.get("category")))
+    if not categories:
+        raise ValueError("metric_config 中没有带类别的指标")
+    paths = []
+    for n in range(count):
+        category = categories[n % len(categories)]
+        metrics = [m for m in metric_config if m.get("category") == category][:max_metrics]
+        year = rng.randint(2015, 2024)
+        quarters = [(year + (q - 1) // 4, (q - 1) % 4 + 1) for q in range(1, num_periods + 1)]
+        periods = [f"{y}/Q{q}" for y, q in quarters]
+        dates = [f"{y}/{q * 3:02d}/{30 if q in (2, 3) else 31}" for y, q in quarters]
+        # 比率类指标为两位小数，金额类带千分位
+        high = 80 if category == "关键指标" else 5e4
+        values = {m["id"]: [f"{rng.uniform(-high / 10, high):,.2f}" for _ in periods] for m in metrics}
+        paths.append(make_synthetic_case(out_dir, f"synthetic_{n:03d}", category, metrics, periods, values,
+                                         dates=dates, font_path=font_path))
+    return paths
+
+
+# =============================================================================
+# 评估与搜索
+# =============================================================================
+
+class OCRCaseEvaluator:
+    """在标注集上评估一组 readtext 参数，返回 (准确率, 每组截图平均耗时)"""
+
+    def __init__(self, ocr_service, cases: List[Dict], metric_config: List[Dict]):
+        self.ocr_service = ocr_service
+        self.cases = cases
+        self.metric_config = metric_config
+
+    def __call__(self, params: Dict, time_budget: float = None) -> Tuple[Optional[float], float]:
+        from backend.app.services.ocr_service import validate_detect_scale
+
+        self.ocr_service.reader  # 模型加载不计入耗时
+        readtext, service = split_params(params)
+        self.ocr_service.readtext_params = readtext
+        self.ocr_service.detect_scale = validate_detect_scale(service.get("detect_scale", 1.0))
+        total_accuracy = 0.0
+        elapsed = 0.0
+        for case in self.cases:
+            metrics = [m for m in self.metric_config if m.get("category") == case["category"]]
+            start = time.perf_counter()
+            parsed, _ = self.ocr_service.parse_multi_image(case["periods"], case["metrics"], case["values"], metrics)
+            elapsed += time.perf_counter() - start
+            total_accuracy += cell_accuracy(parsed, case["cells"])
+            if time_budget is not None and elapsed > time_budget:
+                # 已经比当前最优配置慢，提前放弃
+                return None, float("inf")
+        return total_accuracy / len(self.cases), elapsed / len(self.cases)
+
+
+def candidate_params(space: Dict[str, list], trials: int, seed: int = 0) -> List[Dict]:
+    """候选参数：easyocr 默认值 + 搜索空间中不重复的随机组合"""
+    rng = random.Random(seed)
+    base = {k: v for k, v in EASYOCR_DEFAULTS.items() if k in space}
+    candidates = [base]
+    seen = {tuple(sorted(base.items()))}
+    total = 1
+    for options in space.values():
+        total *= len(options)
+    while len(candidates) < min(trials, total):
+        params = {k: rng.choice(options) for k, options in space.items()}
+        key = tuple(sorted(params.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+def tune(evaluate: Callable[..., Tuple[Optional[float], float]], floor: float = 0.95,
+         space: Dict[str, list] = None, trials: int = 30, seed: int = 0, num_cases: int = 1,
+         log: Callable[[str], None] = print) -> Dict:
+    """
+    搜索满足准确率下限的最快参数
+
+    Args:
+        evaluate: evaluate(params, time_budget) -> (accuracy, seconds_per_case)；
+                  time_budget 为总耗时上限，超出时可返回 (None, inf) 提前终止
+        floor: 单元格准确率下限
+        num_cases: 标注集大小，用于把单组耗时换算为总耗时上限
+    Returns:
+        {"readtext", "accuracy", "seconds_per_case", "floor", "trials": [...]}；
+        没有配置达到下限时 readtext 为 None
+    """
+    best = None
+    history = []
+    for params in candidate_params(space or DEFAULT_SEARCH_SPACE, trials, seed):
+        budget = best["seconds_per_case"] * num_cases if best else None
+        accuracy, seconds = evaluate(params, budget)
+        history.append({"params": params, "accuracy": accuracy, "seconds_per_case": seconds})
+        status = "pruned" if accuracy is None else f"acc={accuracy:.3f} {seconds * 1000:.0f}ms"
+        log(f"[tune] {params} -> {status}")
+        if accuracy is None or accuracy < floor:
+            continue
+        if best is None or seconds < best["seconds_per_case"] or \
+                (seconds == best["seconds_per_case"] and accuracy > best["accuracy"]):
+            best = {"readtext": params, "accuracy": accuracy, "seconds_per_case": seconds}
+
+    result = best or {"readtext": None, "accuracy": None, "seconds_per_case": None}
+    result.update(floor=floor, trials=history)
+    return result
+
+
+def write_profile(result: Dict, path: str, meta: Dict = None):
+    """把调优结果写成 OCRService(profile=path) 可加载的配置"""
+    from backend.app.services.ocr_service import validate_detect_scale
+
+    if result.get("readtext") is None:
+        raise ValueError(f"没有配置达到准确率下限 {result.get('floor')}")
+    readtext, service = split_params(result["readtext"])
+    if "detect_scale" in service:
+        validate_detect_scale(service["detect_scale"])
+    profile = {
+        "readtext": readtext,
+        **service,
+        "accuracy": result["accuracy"],
+        "seconds_per_case": result["seconds_per_case"],
+        "floor": result["floor"],
+        "tuned_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    profile.update(meta or {})
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    from backend.app.services.ocr_service import OCRService, DEFAULT_PROFILE_PATH
+    from backend.config.config import FINANCIAL_METRICS
+
+    parser = argparse.ArgumentParser(description="easyocr 推理参数自动调优")
+    parser.add_argument("--cases", help="标注集目录 (*.label.json)；与 --synthetic 同用时合成截图写入该目录")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N",
+                        help="先渲染 N 组合成截图及标注（未指定 --cases 时写入临时目录）")
+    parser.add_argument("--font", default=None, help="合成截图使用的 CJK 字体路径")
+    parser.add_argument("--floor", type=float, default=0.95, help="单元格准确率下限")
+    parser.add_argument("--trials", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=DEFAULT_PROFILE_PATH)
+    parser.add_argument("--gpu", action="store_true")
+    args = parser.parse_args(argv)
+    if not args.cases and args.synthetic <= 0:
+        parser.error("需要指定 --cases 或 --synthetic N")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        case_dir = args.cases or tmp
+        if args.synthetic > 0:
+            try:
+                make_synthetic_cases(case_dir, args.synthetic, FINANCIAL_METRICS, seed=args.seed, font_path=args.font)
+            except RuntimeError as e:
+                raise SystemExit(f"无法生成合成截图: {e}")
+            print(f"已生成 {args.synthetic} 组合成截图 -> {case_dir}")
+        cases = load_cases(case_dir)
+        if not cases:
+            raise SystemExit(f"{case_dir} 下没有 *.label.json 标注文件")
+        evaluator = OCRCaseEvaluator(OCRService(gpu=args.gpu), cases, FINANCIAL_METRICS)
+        result = tune(evaluator, floor=args.floor, trials=args.trials, seed=args.seed, num_cases=len(cases))
+
+    if result["readtext"] is None:
+        best = max((t["accuracy"] for t in result["trials"] if t["accuracy"] is not None), default=None)
+        best_text = "无" if best is None else f"{best:.3f}"
+        raise SystemExit(f"{len(result['trials'])} 个候选配置都没有达到准确率下限 {args.floor}"
+                         f"（最高 {best_text}），未写入 {args.out}；可降低 --floor 或增加 --trials")
+    write_profile(result, args.out, meta={"cases": len(cases), "gpu": args.gpu})
+    print(f"最优配置: {result['readtext']} (acc={result['accuracy']:.3f}, "
+          f"{result['seconds_per_case'] * 1000:.0f}ms/组) -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+OCR 队列 worker
+从 OCRJobQueue 领取任务，调用 OCRService.parse_multi_image，写回结果行
+    python -m backend.app.services.ocr_worker [--queue-db ocr_jobs.db] [--burst] [--gpu]
+
+每个 worker 进程持有一个 OCRService；执行任务期间后台线程定期续租，
+进程崩溃后租约过期，任务由其他 worker 重新领取
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from backend.app.services.job_queue import OCRJobQueue, default_worker_id
+
+
+class _Heartbeat(threading.Thread):
+    """任务执行期间定期续租"""
+
+    def __init__(self, queue, job_id, worker_id, lease_seconds, interval):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            if not self.queue.heartbeat(self.job_id, self.worker_id, self.lease_seconds):
+                self.lost = True
+                return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def process_one(queue: OCRJobQueue, ocr_service, worker_id: str, lease_seconds: float = 60.0,
+                heartbeat_interval: float = None) -> bool:
+    """领取并执行一个任务；队列为空时返回 False"""
+    job = queue.lease(worker_id, lease_seconds)
+    if job is None:
+        return False
+
+    heartbeat = _Heartbeat(queue, job["id"], worker_id, lease_seconds,
+                           heartbeat_interval or lease_seconds / 3)
+    heartbeat.start()
+    start = time.perf_counter()
+    try:
+        parsed_data, disclosure_date = ocr_service.parse_multi_image(
+            job["periods_path"], job["metrics_path"], job["values_path"], job["metric_config"]
+        )
+    except Exception as e:
+        heartbeat.stop()
+        status = queue.fail(job["id"], worker_id, f"{type(e).__name__}: {e}")
+        print(f"[{worker_id}] job {job['id']} ({job['category']}) 失败: {e} -> {status}")
+        return True
+
+    heartbeat.stop()
+    elapsed = time.perf_counter() - start
+    if queue.complete(job["id"], worker_id, parsed_data, disclosure_date, elapsed):
+        print(f"[{worker_id}] job {job['id']} ({job['category']}) 完成: {len(parsed_data)} 条, {elapsed:.2f}s")
+    else:
+        print(f"[{worker_id}] job {job['id']} 租约已被接管，丢弃结果")
+    return True
+
+
+def run_worker(queue: OCRJobQueue, ocr_service, worker_id: str = None, lease_seconds: float = 60.0,
+               heartbeat_interval: float = None, poll_interval: float = 1.0,
+               max_jobs: int = None, burst: bool = False) -> int:
+    """
+    worker 主循环
+
+    Args:
+        burst: 队列为空时退出，而不是继续轮询
+        max_jobs: 处理指定数量的任务后退出
+    Returns:
+        处理的任务数
+    """
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        if process_one(queue, ocr_service, worker_id, lease_seconds, heartbeat_interval):
+            processed += 1
+        elif burst:
+            break
+        else:
+            time.sleep(poll_interval)
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OCR 队列 worker")
+    parser.add_argument("--queue-db", help="队列数据库路径 (默认: finance.db 旁的 ocr_jobs.db)")
+    parser.add_argument("--no-wal", action="store_true", help="多台机器经网络文件系统共享队列时使用")
+    parser.add_argument("--gpu", action="store_true")
+    parser.add_argument("--profile", help="ocr_tuner 生成的参数配置 (JSON)")
+    parser.add_argument("--lease-seconds", type=float, default=60.0)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--max-jobs", type=int)
+    parser.add_argument("--burst", action="store_true", help="队列为空时退出")
+    args = parser.parse_args(argv)
+
+    from backend.app.services.ocr_service import OCRService
+    queue = OCRJobQueue(args.queue_db, wal=not args.no_wal)
+    processed = run_worker(queue, OCRService(gpu=args.gpu, profile=args.profile), lease_seconds=args.lease_seconds,
+                           poll_interval=args.poll_interval, max_jobs=args.max_jobs, burst=args.burst)
+    print(f"worker 退出，共处理 {processed} 个任务")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
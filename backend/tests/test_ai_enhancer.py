@@ -0,0 +1,137 @@
+# backend/tests/test_ai_enhancer.py
+# AIEnhancerService 测试：连接复用、批量、流式解析与缓存
+# 使用本地桩服务模拟 Ollama /api/generate，无需真实模型
+
+import os
+import sys
+import json
+import re
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.app.services.ai_enhancer import AIEnhancerService, CAPTURE_MARKER
+
+METRICS = [{"id": "EPS", "label": "每股收益 (EPS)"}]
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    """
+    模拟 Ollama /api/generate：把每个 capture 的文本原样作为 value 返回
+    批量请求中以 SKIP 开头的 capture 不出现在响应里（模拟模型漏掉部分序号）
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append({"body": body, "client_port": self.client_address[1]})
+
+        prompt = body["prompt"]
+        captures = re.findall(rf"{CAPTURE_MARKER} (\d+)\n(.*)", prompt)
+        if captures:
+            answer = json.dumps({i: [{"metric_id": "EPS", "period": "2024/Q1", "value": t.strip()}]
+                                 for i, t in captures if not t.startswith("SKIP")}, ensure_ascii=False)
+        else:
+            text = prompt.split("Raw OCR Text:")[1].split("Important:")[0].strip()
+            answer = "```json\n" + json.dumps([{"metric_id": "EPS", "period": "2024/Q1", "value": text}],
+                                              ensure_ascii=False) + "\n```"
+
+        if body.get("stream", True):
+            # 按 Ollama 流式格式分块返回 NDJSON
+            step = 7
+            parts = [answer[i:i + step] for i in range(0, len(answer), step)]
+            lines = [json.dumps({"model": body["model"], "response": p, "done": False}) for p in parts]
+            lines.append(json.dumps({"model": body["model"], "response": "", "done": True}))
+            payload = ("\n".join(lines) + "\n").encode("utf-8")
+            content_type = "application/x-ndjson"
+        else:
+            payload = json.dumps({"response": answer, "done": True}).encode("utf-8")
+            content_type = "application/json"
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class TestAIEnhancerService(unittest.TestCase):
+    """测试 AIEnhancerService 与本地桩服务交互"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), OllamaStubHandler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.service = AIEnhancerService(ollama_url=self.url, model="stub", batch_size=4)
+
+    def tearDown(self):
+        self.service.close()
+
+    def test_streaming_response_parsed(self):
+        """测试流式 NDJSON 响应被完整拼接并去掉代码块"""
+        result = json.loads(self.service.enhance_data("EPS 0.60", METRICS))
+        self.assertEqual(result, [{"metric_id": "EPS", "period": "2024/Q1", "value": "EPS 0.60"}])
+        self.assertTrue(self.server.requests[0]["body"]["stream"])
+
+    def test_cache_hit_skips_request(self):
+        """测试相同 prompt 第二次调用命中缓存"""
+        first = self.service.enhance_data("EPS 0.60", METRICS)
+        second = self.service.enhance_data("EPS 0.60", METRICS)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.service.cache_hits, 1)
+
+    def test_connection_reused(self):
+        """测试多次请求复用同一连接"""
+        for i in range(3):
+            self.service.enhance_data(f"EPS 0.{i}", METRICS)
+        ports = {r["client_port"] for r in self.server.requests}
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(ports), 1)
+
+    def test_batch_uses_one_request_per_chunk(self):
+        """测试批量：5 个截图按 batch_size=4 分两次请求，结果按输入顺序返回"""
+        texts = [f"EPS {i}.00" for i in range(5)]
+        results = self.service.enhance_batch(texts, METRICS)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual([json.loads(r)[0]["value"] for r in results], texts)
+
+    def test_batch_partial_response_keeps_positions(self):
+        """测试批量响应缺少某个序号时整批逐个重试，输出数量与位置与输入一致"""
+        texts = ["EPS 0.10", "SKIP EPS 0.20", "EPS 0.30"]
+        results = self.service.enhance_batch(texts, METRICS)
+        self.assertEqual(len(results), len(texts))
+        self.assertEqual([json.loads(r)[0]["value"] for r in results], texts)
+        self.assertEqual(len(self.server.requests), 1 + len(texts))
+
+    def test_connection_error_reported(self):
+        """测试服务不可用时返回错误描述"""
+        service = AIEnhancerService(ollama_url="http://127.0.0.1:9", model="stub", timeout=1)
+        try:
+            self.assertTrue(service.enhance_data("x", METRICS).startswith("AI Enhancement Error"))
+        finally:
+            service.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
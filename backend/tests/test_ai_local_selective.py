@@ -0,0 +1,78 @@
+# backend/tests/test_ai_local_selective.py
+# 本地 LLM 选择性纠错的纯逻辑测试（片段筛选、提示拼装、结果回填），不加载模型
+
+import os
+import sys
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.config.config import FINANCIAL_METRICS
+from backend.app.services.ai_local_service import (
+    apply_corrections, build_items_prompt, build_prefix_prompt,
+    parse_corrections, select_uncertain_tokens,
+)
+from backend.app.services.ocr_fixtures import load_fixture
+from backend.app.services.ocr_service import OCRService
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "income_statement_synthetic.ocr.json")
+BOX = [[0, 0], [10, 0], [10, 10], [0, 10]]
+
+
+class TestSelectiveCorrection(unittest.TestCase):
+    """测试只挑选低置信度 / 未匹配片段"""
+
+    def setUp(self):
+        self.metrics = [m for m in FINANCIAL_METRICS if m.get('category') == '利润表']
+
+    def test_selects_low_confidence_and_unmatched(self):
+        """测试低置信度 token 和未匹配科目被选中，高置信度已匹配 token 不被选中"""
+        captures = [
+            {"periods": [(BOX, "2024/Q1", 0.98), (BOX, "2024/O2", 0.4)],
+             "metrics": [(BOX, "毛利", 0.99), (BOX, "xyz", 0.95), (BOX, "会计准则", 0.95)],
+             "values": [(BOX, "1.23", 0.97)]},
+            {"periods": [], "metrics": [], "values": [(BOX, "12a", 0.3)]},
+        ]
+        items = select_uncertain_tokens(captures, self.metrics, threshold=0.6)
+        self.assertEqual([i["key"] for i in items], ["c0.periods.1", "c0.metrics.1", "c1.values.0"])
+
+    def test_selection_is_small_fraction_of_capture(self):
+        """测试真实布局下只有少数 token 需要送入模型"""
+        raw = load_fixture(FIXTURE)
+        total = sum(len(v) for v in raw.values())
+        items = select_uncertain_tokens([raw], self.metrics, threshold=0.6)
+        self.assertGreater(len(items), 0)
+        self.assertLess(len(items), total / 2)
+
+    def test_prefix_is_shared_across_batches(self):
+        """测试指令前缀只依赖指标配置，不含具体片段"""
+        prefix = build_prefix_prompt(self.metrics)
+        self.assertEqual(prefix, build_prefix_prompt(self.metrics))
+        self.assertIn("EPS", prefix)
+        items_prompt = build_items_prompt([{"key": "c0.values.3", "stage": "values", "text": "1 23"}])
+        self.assertEqual(items_prompt, "c0.values.3 [values]: 1 23\n")
+
+    def test_parse_and_apply_corrections(self):
+        """测试解析模型输出并回填，原始结果不被修改"""
+        raw = load_fixture(FIXTURE)
+        items = select_uncertain_tokens([raw], self.metrics, threshold=0.6)
+        target = next(i for i in items if i["stage"] == "periods")
+        response = f'好的：{{"{target["key"]}": "2024/H1", "unknown.key": ""}}'
+        corrections = parse_corrections(response)
+        self.assertEqual(corrections, {target["key"]: "2024/H1"})
+
+        patched = apply_corrections([raw], items, corrections)
+        self.assertEqual(patched[0]["periods"][target["index"]][1], "2024/H1")
+        self.assertNotEqual(raw["periods"][target["index"]][1], "2024/H1")
+        parsed, _ = OCRService(gpu=False).parse_ocr_results(patched[0], self.metrics)
+        self.assertTrue(parsed)
+
+    def test_parse_corrections_rejects_garbage(self):
+        """测试无法解析的输出返回空字典"""
+        self.assertEqual(parse_corrections("无法识别"), {})
+        self.assertEqual(parse_corrections("{not json}"), {})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
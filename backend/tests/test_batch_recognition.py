@@ -0,0 +1,131 @@
+# backend/tests/test_batch_recognition.py
+# 多类别并发识别与单事务入库测试
+
+import os
+import sys
+import json
+import tempfile
+import threading
+import time
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.config.config import FINANCIAL_METRICS
+from backend.app.api.recognition import build_pivot, recognize_categories
+from backend.app.models.finance_model import Base, IncomeStatementModel, KeyRatiosModel
+from backend.app.repositories.finance_repo import FinanceRepository
+
+
+class FakeOCRService:
+    """按截图路径返回固定结果的 OCR 服务，记录同时运行的调用数"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def parse_multi_image(self, periods_path, metrics_path, values_path, metric_config):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if periods_path == "broken":
+                raise RuntimeError("bad image")
+            metric = metric_config[0]
+            return [
+                {"metric_id": metric["id"], "period": "2024/Q1", "value": "1.5", "report_date": "2024/04/27"},
+                {"metric_id": metric["id"], "period": "2024/Q2", "value": "2.5", "report_date": "2024/07/28"},
+            ], "2024/07/28"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestRecognizeCategories(unittest.TestCase):
+    """测试多类别并发调度"""
+
+    def test_categories_run_concurrently(self):
+        """测试多个类别在共享服务上并发执行"""
+        ocr = FakeOCRService()
+        image_sets = {cat: ("p", "m", "v") for cat in ["利润表", "关键指标", "现金流量表", "资产负债表"]}
+        results = recognize_categories(ocr, image_sets, FINANCIAL_METRICS)
+
+        self.assertEqual(list(results), ["关键指标", "利润表", "资产负债表", "现金流量表"])
+        self.assertGreater(ocr.max_active, 1)
+        for cat, res in results.items():
+            with self.subTest(category=cat):
+                self.assertIsNone(res["error"])
+                self.assertEqual(res["period_dates"], {"2024/Q1": "2024/04/27", "2024/Q2": "2024/07/28"})
+                self.assertEqual(res["pivot_df"].index[0], "截止日期")
+                self.assertTrue(all(item["category"] == cat for item in res["parsed_data"]))
+
+    def test_failed_category_does_not_block_others(self):
+        """测试单个类别失败时其他类别照常返回"""
+        results = recognize_categories(
+            FakeOCRService(delay=0),
+            {"利润表": ("broken", "m", "v"), "关键指标": ("p", "m", "v")},
+            FINANCIAL_METRICS,
+        )
+        self.assertIn("bad image", results["利润表"]["error"])
+        self.assertIsNone(results["关键指标"]["error"])
+
+    def test_rejects_unknown_category(self):
+        """测试未知类别被拒绝"""
+        with self.assertRaises(ValueError):
+            recognize_categories(FakeOCRService(), {"股东名单": ("p", "m", "v")}, FINANCIAL_METRICS)
+
+
+class TestSavePivotBatch(unittest.TestCase):
+    """测试多类别单事务保存"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmpdir.name, 'test.db')}")
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.repo = FinanceRepository(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def _pivot(self, label):
+        parsed = [{"metric_id": "X", "period": "2024/Q1", "value": "1.0", "report_date": "2024/04/27"}]
+        pivot_df, dates = build_pivot(parsed, [{"id": "X", "label": label}])
+        return pivot_df, dates
+
+    def test_batch_saved_together(self):
+        """测试所有类别在一次提交中写入"""
+        income_df, income_dates = self._pivot("总收入")
+        ratios_df, ratios_dates = self._pivot("毛利率 (%)")
+        saved = self.repo.save_pivot_batch([
+            {"category": "利润表", "ticker": "NVDA", "pivot_df": income_df, "period_dates": income_dates},
+            {"category": "关键指标", "ticker": "NVDA", "pivot_df": ratios_df, "period_dates": ratios_dates},
+        ])
+        self.assertEqual(saved, 2)
+        income = self.db.query(IncomeStatementModel).one()
+        self.assertEqual(json.loads(income.period_data), {"2024/Q1": "1.0"})
+        self.assertEqual(self.db.query(KeyRatiosModel).count(), 1)
+
+    def test_batch_rolls_back_on_error(self):
+        """测试任一类别失败时整体回滚"""
+        income_df, income_dates = self._pivot("总收入")
+        with self.assertRaises(ValueError):
+            self.repo.save_pivot_batch([
+                {"category": "利润表", "ticker": "NVDA", "pivot_df": income_df, "period_dates": income_dates},
+                {"category": "未知表", "ticker": "NVDA", "pivot_df": income_df, "period_dates": income_dates},
+            ])
+        self.assertEqual(self.db.query(IncomeStatementModel).count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+# backend/tests/test_change_log.py
+# 变更日志测试：与写入同事务、只记录变化的单元格、按 seq 增量读取
+
+import os
+import sys
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app import cli
+from backend.app.models.finance_model import init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+
+
+def cells(changes):
+    return [(c["ticker"], c["category"], c["metric_id"], c["period"], c["old_value"], c["new_value"]) for c in changes]
+
+
+class TestChangeLog(unittest.TestCase):
+    """测试 change_log 与 iter_changes"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "finance.db")
+        self.engine = create_engine(f"sqlite:///{self.path}")
+        init_db(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.repo = FinanceRepository(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_records_only_changed_cells(self):
+        df = pd.DataFrame({"2024/Q1": ["1.0", "2.0"], "2024/Q2": ["3.0", None]}, index=["营业收入", "EPS"])
+        self.repo.save_pivot_data("利润表", "NVDA", df)
+        self.assertEqual(cells(self.repo.iter_changes()), [
+            ("NVDA", "利润表", "营业收入", "2024/Q1", None, "1.0"),
+            ("NVDA", "利润表", "营业收入", "2024/Q2", None, "3.0"),
+            ("NVDA", "利润表", "EPS", "2024/Q1", None, "2.0"),
+        ])
+        synced = self.repo.latest_change_seq()
+
+        # 无变化的重复保存不记日志；修改一个单元格只记一条
+        self.repo.save_pivot_data("利润表", "NVDA", df)
+        self.repo.save_records("利润表", "NVDA", [
+            {"metric_id": "营业收入", "period": "2024/Q1", "value": "1.0"},
+            {"metric_id": "EPS", "period": "2024/Q1", "value": "2.5"},
+        ])
+        changes = list(self.repo.iter_changes(synced))
+        self.assertEqual(cells(changes), [("NVDA", "利润表", "EPS", "2024/Q1", "2.0", "2.5")])
+        self.assertGreater(changes[0]["seq"], synced)
+
+    def test_delete_logged(self):
+        self.repo.save_records("关键指标", "NVDA", [{"metric_id": "ROE", "period": "2024/Q1", "value": "30%"}])
+        self.repo.save_records("利润表", "NVDA", [{"metric_id": "EPS", "period": "2024/Q1", "value": "1"}])
+        synced = self.repo.latest_change_seq()
+        self.repo.delete_by_category("关键指标")
+        self.assertEqual(cells(self.repo.iter_changes(synced)), [("NVDA", "关键指标", "ROE", "2024/Q1", "30%", None)])
+        self.assertEqual(len(list(self.repo.iter_changes(category="利润表"))), 1)
+
+    def test_rolled_back_batch_not_logged(self):
+        """测试批量保存失败时日志与数据一起回滚"""
+        with self.assertRaises(ValueError):
+            self.repo.save_pivot_batch([
+                {"category": "利润表", "ticker": "NVDA", "records": [{"metric_id": "EPS", "period": "2024/Q1", "value": "1"}]},
+                {"category": "未知", "ticker": "NVDA", "records": []},
+            ])
+        self.assertEqual(self.repo.latest_change_seq(), 0)
+
+    def test_streaming_batches(self):
+        self.repo.save_records("利润表", "NVDA", [
+            {"metric_id": f"M{i}", "period": "2024/Q1", "value": str(i)} for i in range(25)
+        ])
+        changes = list(self.repo.iter_changes(5, batch_size=7))
+        self.assertEqual([c["seq"] for c in changes], list(range(6, 26)))
+
+    def test_cli(self):
+        self.repo.save_records("利润表", "NVDA", [{"metric_id": "EPS", "period": "2024/Q1", "value": "1"}])
+        out = io.StringIO()
+        with redirect_stdout(out), redirect_stderr(io.StringIO()):
+            self.assertEqual(cli.main(["--db", self.path, "changes", "--since", "0"]), 0)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(c["seq"], c["new_value"]) for c in lines], [(1, "1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
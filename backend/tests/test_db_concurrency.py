@@ -0,0 +1,128 @@
+# backend/tests/test_db_concurrency.py
+# SQLite 引擎配置与并发读写测试：WAL + busy_timeout 下多个读者和写者并行不报 "database is locked"
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.database import create_sqlite_engine, session_scope
+from backend.app.models.finance_model import IncomeStatementModel, ObservationModel, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+
+WRITERS = 4
+READERS = 4
+SAVES_PER_WRITER = 15
+
+
+class TestEngineConfig(unittest.TestCase):
+    """测试引擎 PRAGMA"""
+
+    def test_pragmas(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_sqlite_engine(os.path.join(tmp, "finance.db"), busy_timeout=5,
+                                          mmap_size=1 << 20, cache_size_kb=2048)
+            with engine.connect() as conn:
+                pragma = lambda name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                self.assertEqual(pragma("journal_mode"), "wal")
+                self.assertEqual(pragma("busy_timeout"), 5000)
+                self.assertEqual(pragma("synchronous"), 1)  # NORMAL
+                self.assertEqual(pragma("cache_size"), -2048)
+                self.assertEqual(pragma("mmap_size"), 1 << 20)
+            engine.dispose()
+
+    def test_session_scope_rolls_back(self):
+        """测试工作单元异常时回滚"""
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_sqlite_engine(os.path.join(tmp, "finance.db"))
+            init_db(engine)
+            Session = sessionmaker(bind=engine)
+            with self.assertRaises(RuntimeError):
+                with session_scope(Session) as db:
+                    db.add(IncomeStatementModel(ticker="NVDA", metric_id="EPS", metric_label="EPS"))
+                    db.flush()
+                    raise RuntimeError("boom")
+            with session_scope(Session) as db:
+                self.assertEqual(db.query(IncomeStatementModel).count(), 0)
+            engine.dispose()
+
+
+class TestConcurrentReadersWriters(unittest.TestCase):
+    """测试多个读者和写者并行"""
+
+    def test_parallel_readers_and_writers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_sqlite_engine(os.path.join(tmp, "finance.db"), busy_timeout=30)
+            init_db(engine)
+            Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            errors = []
+            writers_done = threading.Event()
+            reads = []
+            start = threading.Barrier(WRITERS + READERS)
+
+            def writer(n):
+                try:
+                    start.wait()
+                    for i in range(SAVES_PER_WRITER):
+                        # 每次保存一个独立的工作单元
+                        with session_scope(Session) as db:
+                            FinanceRepository(db).save_records("利润表", f"T{n}", [
+                                {"metric_id": f"M{m}", "period": f"2024/Q{i % 4 + 1}", "value": str(i * m)}
+                                for m in range(10)
+                            ] + [{"metric_id": "seq", "period": f"S{i:02d}", "value": str(i)}])
+                        # 所有写者修改同一行：读取-合并-写入不能丢失其他写者的季度
+                        with session_scope(Session) as db:
+                            FinanceRepository(db).save_records("利润表", "SHARED", [
+                                {"metric_id": "EPS", "period": f"W{n}/{i:02d}", "value": str(i)}
+                            ])
+                except Exception as e:  # noqa: BLE001
+                    errors.append(e)
+
+            def reader():
+                try:
+                    start.wait()
+                    count = 0
+                    while not writers_done.is_set() or count == 0:
+                        with session_scope(Session) as db:
+                            df = FinanceRepository(db).get_pivot_data("利润表")
+                        count += 1
+                        if not df.empty:
+                            # 读到的每一行都来自已提交的事务：seq 行的季度数连续
+                            seq = df[df.index == "seq"][[c for c in df.columns if c.startswith("S")]]
+                            for _, row in seq.iterrows():
+                                filled = row.notna().sum()
+                                assert row.iloc[:filled].notna().all(), "读到未提交或不一致的数据"
+                    reads.append(count)
+                except Exception as e:  # noqa: BLE001
+                    errors.append(e)
+
+            threads = [threading.Thread(target=writer, args=(n,)) for n in range(WRITERS)]
+            threads += [threading.Thread(target=reader) for _ in range(READERS)]
+            for t in threads:
+                t.start()
+            for t in threads[:WRITERS]:
+                t.join()
+            writers_done.set()
+            for t in threads[WRITERS:]:
+                t.join()
+
+            self.assertEqual(errors, [])
+            self.assertEqual(len(reads), READERS)
+            with session_scope(Session) as db:
+                self.assertEqual(db.query(IncomeStatementModel).count(), WRITERS * 11 + 1)
+                shared = FinanceRepository(db).get_pivot_data("利润表", ticker="SHARED")
+                self.assertEqual(shared.shape[1] - 1, WRITERS * SAVES_PER_WRITER)
+                self.assertEqual(db.query(ObservationModel).filter_by(metric_id="seq").count(),
+                                 WRITERS * SAVES_PER_WRITER)
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+# backend/tests/test_finance_repo.py
+# FinanceRepository 批量 upsert 测试：唯一约束、变更检测、长格式记录、旧库去重
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.finance_model import IncomeStatementModel, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+
+
+def make_pivot():
+    return pd.DataFrame(
+        {"2024/Q1": ["2024/04/27", "100", "0.6"], "2024/Q2": ["2024/07/28", "120", None]},
+        index=["截止日期", "营业收入", "EPS"],
+    )
+
+
+class TestFinanceRepoUpsert(unittest.TestCase):
+    """测试批量 upsert"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'finance.db')}")
+        init_db(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.repo = FinanceRepository(self.db)
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def rows(self):
+        return {
+            r.metric_id: (json.loads(r.period_data), json.loads(r.period_dates))
+            for r in self.db.query(IncomeStatementModel).filter_by(ticker="NVDA")
+        }
+
+    def test_save_and_merge(self):
+        """测试新增、合并和跳过空单元格"""
+        dates = {"2024/Q1": "2024/04/27", "2024/Q2": "2024/07/28"}
+        self.assertEqual(self.repo.save_pivot_data("利润表", "NVDA", make_pivot(), dates), 2)
+        self.assertEqual(self.rows()["EPS"], ({"2024/Q1": "0.6"}, dates))
+
+        update = pd.DataFrame({"2024/Q3": ["1.1"]}, index=["EPS"])
+        self.assertEqual(self.repo.save_pivot_data("利润表", "NVDA", update, {"2024/Q3": "2024/10/27"}), 1)
+        self.assertEqual(self.rows()["EPS"][0], {"2024/Q1": "0.6", "2024/Q3": "1.1"})
+        self.assertEqual(self.rows()["营业收入"][0], {"2024/Q1": "100", "2024/Q2": "120"})
+        self.assertEqual(self.db.query(IncomeStatementModel).count(), 2)
+
+    def test_unchanged_save_issues_no_write(self):
+        """测试重复保存相同数据时只执行一次查询，不写入"""
+        dates = {"2024/Q1": "2024/04/27", "2024/Q2": "2024/07/28"}
+        self.repo.save_pivot_data("利润表", "NVDA", make_pivot(), dates)
+        self.statements.clear()
+        self.assertEqual(self.repo.save_pivot_data("利润表", "NVDA", make_pivot(), dates), 0)
+        writes = [s for s in self.statements if s.lstrip().upper().startswith(("INSERT", "UPDATE"))]
+        selects = [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+        self.assertEqual(writes, [])
+        self.assertEqual(len(selects), 1)
+
+    def test_single_insert_batch(self):
+        """测试多行变化合并为一条 INSERT ... ON CONFLICT"""
+        self.repo.save_pivot_data("利润表", "NVDA", make_pivot())
+        inserts = [s for s in self.statements if s.lstrip().upper().startswith("INSERT INTO INCOME_STATEMENT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn("ON CONFLICT", inserts[0])
+
+    def test_long_format_records(self):
+        """测试直接保存长格式记录，report_date 合并进截止日期"""
+        records = [
+            {"metric_id": "EPS", "period": "2024/Q1", "value": "0.6", "report_date": "2024/04/27"},
+            {"metric_id": "EPS", "period": "2024/Q2", "value": "", "report_date": "2024/07/28"},
+            {"metric_id": "营业收入", "metric_label": "营业收入", "period": "2024/Q1", "value": 100},
+        ]
+        self.assertEqual(self.repo.save_records("利润表", "NVDA", records), 2)
+        self.assertEqual(self.rows()["EPS"], ({"2024/Q1": "0.6"}, {"2024/Q1": "2024/04/27", "2024/Q2": "2024/07/28"}))
+        self.assertEqual(self.rows()["营业收入"][0], {"2024/Q1": "100"})
+
+    def test_unique_constraint(self):
+        """测试 (ticker, metric_id) 唯一约束"""
+        self.db.add(IncomeStatementModel(ticker="NVDA", metric_id="EPS", metric_label="EPS"))
+        self.db.add(IncomeStatementModel(ticker="NVDA", metric_id="EPS", metric_label="EPS"))
+        with self.assertRaises(IntegrityError):
+            self.db.commit()
+        self.db.rollback()
+
+    def test_batch_rolls_back(self):
+        """测试批量保存中任一类别失败时整体回滚"""
+        with self.assertRaises(ValueError):
+            self.repo.save_pivot_batch([
+                {"category": "利润表", "ticker": "NVDA", "pivot_df": make_pivot()},
+                {"category": "未知", "ticker": "NVDA", "records": []},
+            ])
+        self.assertEqual(self.db.query(IncomeStatementModel).count(), 0)
+
+
+class TestLegacyDedupe(unittest.TestCase):
+    """测试旧库补建唯一索引前合并重复行"""
+
+    def test_duplicates_merged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'legacy.db')}")
+            with engine.begin() as conn:
+                conn.execute(text(
+                    "CREATE TABLE income_statement (id INTEGER PRIMARY KEY, ticker VARCHAR, metric_id VARCHAR, "
+                    "metric_label VARCHAR, period_data TEXT, period_dates TEXT)"
+                ))
+                for data in ('{"2024/Q1": "1", "2024/Q2": "2"}', '{"2024/Q2": "2.5"}'):
+                    conn.execute(text(
+                        "INSERT INTO income_statement (ticker, metric_id, metric_label, period_data, period_dates) "
+                        "VALUES ('NVDA', 'EPS', 'EPS', :data, '{}')"
+                    ), {"data": data})
+
+            init_db(engine)
+            with engine.connect() as conn:
+                rows = conn.execute(text("SELECT id, period_data FROM income_statement")).all()
+                indexes = {r[1] for r in conn.execute(text("PRAGMA index_list(income_statement)"))}
+            engine.dispose()
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0][0], 1)
+        self.assertEqual(json.loads(rows[0][1]), {"2024/Q1": "1", "2024/Q2": "2.5"})
+        self.assertIn("uq_income_statement_ticker_metric", indexes)
+
+
+if __name__ == "__main__":
+    unittest.main()
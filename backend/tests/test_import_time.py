@@ -0,0 +1,69 @@
+# backend/tests/test_import_time.py
+# 启动时间基准：CLI 与 OCR 服务模块的导入不应拉起 easyocr/torch 等重型依赖
+
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# CLI 导入时间上限（秒），包含子进程中的测量误差余量
+CLI_IMPORT_BUDGET = 0.3
+HEAVY_MODULES = ["easyocr", "torch", "cv2", "pandas", "sqlalchemy"]
+
+
+def measure_import(module: str, runs: int = 3) -> dict:
+    """在干净的子进程中导入模块，返回最短耗时和已加载的重型依赖"""
+    code = (
+        "import sys, time, json\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - t\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    best = None
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        if best is None or result["elapsed"] < best["elapsed"]:
+            best = result
+    return best
+
+
+class TestImportTime(unittest.TestCase):
+    """导入时间基准测试"""
+
+    def test_cli_import_is_fast(self):
+        """测试 CLI 模块导入不加载 pandas/SQLAlchemy/easyocr，且在预算时间内完成"""
+        result = measure_import("backend.app.cli")
+        print(f"\n[导入基准] backend.app.cli: {result['elapsed'] * 1000:.1f} ms")
+        self.assertEqual(result["loaded"], [])
+        self.assertLess(result["elapsed"], CLI_IMPORT_BUDGET)
+
+    def test_ocr_service_import_is_lazy(self):
+        """测试导入 OCR 服务模块时不导入 easyocr/torch"""
+        result = measure_import("backend.app.services.ocr_service")
+        print(f"\n[导入基准] backend.app.services.ocr_service: {result['elapsed'] * 1000:.1f} ms")
+        self.assertNotIn("easyocr", result["loaded"])
+        self.assertNotIn("torch", result["loaded"])
+
+    def test_ocr_service_construction_does_not_load_model(self):
+        """测试创建 OCRService 实例不会加载模型，第一次推理时才加载"""
+        code = (
+            "import sys\n"
+            "from backend.app.services.ocr_service import OCRService\n"
+            "s = OCRService(gpu=False)\n"
+            "print(s._reader is None and 'easyocr' not in sys.modules)\n"
+        )
+        out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.strip(), "True")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,148 @@
+# backend/tests/test_job_queue.py
+# SQLite OCR 任务队列测试：领取、续租、崩溃重试、结果行、多进程并发领取
+
+import os
+import sys
+import multiprocessing
+import tempfile
+import time
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.app.services.job_queue import OCRJobQueue
+from backend.app.services.ocr_worker import run_worker
+
+METRICS = [{"id": "EPS", "label": "每股收益 (EPS)", "category": "利润表"}]
+
+
+class FakeOCRService:
+    """返回固定结果；periods_path 以 fail 开头时抛出异常"""
+
+    def parse_multi_image(self, periods_path, metrics_path, values_path, metric_config):
+        if os.path.basename(periods_path).startswith("fail"):
+            raise RuntimeError("broken screenshot")
+        return [{"metric_id": metric_config[0]["id"], "period": "2024/Q1", "value": "0.6",
+                 "report_date": "2024/04/28"}], "2024/04/28"
+
+
+def _lease_all(db_path, worker_id, out):
+    """子进程：不断领取任务直到队列为空"""
+    queue = OCRJobQueue(db_path)
+    leased = []
+    while True:
+        job = queue.lease(worker_id, lease_seconds=60)
+        if job is None:
+            break
+        leased.append(job["id"])
+        queue.complete(job["id"], worker_id, [])
+    out.put(leased)
+
+
+class TestOCRJobQueue(unittest.TestCase):
+    """测试任务队列"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "ocr_jobs.db")
+        self.queue = OCRJobQueue(self.db_path)
+
+    def tearDown(self):
+        self.queue.dispose()
+        self.tmpdir.cleanup()
+
+    def _enqueue(self, name="p.png", max_attempts=3):
+        return self.queue.enqueue("利润表", name, "m.png", "v.png", METRICS, max_attempts=max_attempts)
+
+    def test_lease_complete_and_result(self):
+        """测试领取、完成并写入结果行"""
+        job_id = self._enqueue()
+        job = self.queue.lease("w1")
+        self.assertEqual(job["id"], job_id)
+        self.assertEqual(job["metric_config"], METRICS)
+        self.assertIsNone(self.queue.lease("w2"))
+
+        self.assertTrue(self.queue.complete(job_id, "w1", [{"metric_id": "EPS"}], "2024/04/28", 0.5))
+        result = self.queue.get_result(job_id)
+        self.assertEqual(result["parsed_data"], [{"metric_id": "EPS"}])
+        self.assertEqual(result["worker_id"], "w1")
+        self.assertEqual(self.queue.depth()["done"], 1)
+
+    def test_default_metric_config_from_category(self):
+        """测试未指定指标配置时取 config.py 中该类别的指标"""
+        self.queue.enqueue("关键指标", "p.png", "m.png", "v.png")
+        job = self.queue.lease("w1")
+        self.assertTrue(job["metric_config"])
+        self.assertTrue(all(m["category"] == "关键指标" for m in job["metric_config"]))
+
+    def test_expired_lease_is_retried(self):
+        """测试 worker 崩溃（不续租）后任务被其他 worker 重新领取"""
+        job_id = self._enqueue()
+        self.queue.lease("crashed", lease_seconds=0.05)
+        self.assertEqual(self.queue.depth()["leased"], 1)
+        time.sleep(0.1)
+        self.assertEqual(self.queue.depth()["queued"], 1)
+
+        job = self.queue.lease("w2")
+        self.assertEqual(job["id"], job_id)
+        self.assertEqual(job["attempts"], 2)
+        # 原 worker 的迟到结果被拒绝
+        self.assertFalse(self.queue.complete(job_id, "crashed", []))
+        self.assertTrue(self.queue.complete(job_id, "w2", []))
+
+    def test_heartbeat_keeps_lease(self):
+        """测试续租后任务不会被其他 worker 领取"""
+        job_id = self._enqueue()
+        self.queue.lease("w1", lease_seconds=0.1)
+        time.sleep(0.05)
+        self.assertTrue(self.queue.heartbeat(job_id, "w1", lease_seconds=60))
+        time.sleep(0.1)
+        self.assertIsNone(self.queue.lease("w2"))
+        self.assertFalse(self.queue.heartbeat(job_id, "w2"))
+
+    def test_max_attempts_marks_failed(self):
+        """测试重试次数用尽后标记失败"""
+        job_id = self._enqueue(max_attempts=2)
+        self.queue.lease("w1")
+        self.assertEqual(self.queue.fail(job_id, "w1", "boom"), "queued")
+        self.queue.lease("w1", lease_seconds=0.01)
+        time.sleep(0.05)
+        # 租约过期但重试次数已用尽：不再计入 queued
+        self.assertEqual(self.queue.depth(), {"queued": 0, "leased": 0, "done": 0, "failed": 1})
+        self.assertIsNone(self.queue.lease("w2"))
+        job = self.queue.get_job(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["last_error"], "boom")
+
+    def test_run_worker_and_throughput(self):
+        """测试 worker 主循环处理队列并统计吞吐量"""
+        ok_ids = [self._enqueue() for _ in range(3)]
+        bad_id = self._enqueue("fail.png", max_attempts=1)
+        processed = run_worker(self.queue, FakeOCRService(), worker_id="w1", burst=True)
+        self.assertEqual(processed, 4)
+
+        self.assertEqual(self.queue.depth(), {"queued": 0, "leased": 0, "done": 3, "failed": 1})
+        self.assertIn("broken screenshot", self.queue.get_job(bad_id)["last_error"])
+        self.assertEqual(self.queue.get_result(ok_ids[0])["disclosure_date"], "2024/04/28")
+        stats = self.queue.worker_throughput(window_seconds=60)
+        self.assertEqual(stats["w1"]["jobs"], 3)
+        self.assertAlmostEqual(stats["w1"]["jobs_per_min"], 3.0)
+
+    def test_concurrent_processes_never_share_a_job(self):
+        """测试多个进程并发领取时每个任务只被领取一次"""
+        job_ids = [self._enqueue() for _ in range(40)]
+        ctx = multiprocessing.get_context("spawn")
+        out = ctx.Queue()
+        procs = [ctx.Process(target=_lease_all, args=(self.db_path, f"w{i}", out)) for i in range(4)]
+        for p in procs:
+            p.start()
+        leased = [job for _ in procs for job in out.get(timeout=60)]
+        for p in procs:
+            p.join(timeout=60)
+        self.assertEqual(sorted(leased), job_ids)
+        self.assertEqual(self.queue.depth()["done"], 40)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,99 @@
+# backend/tests/test_legacy_import.py
+# 旧版 financial_records 宽表导入测试：列映射、分块事务、重复导入无变更、样例库
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.finance_model import init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.legacy_import import import_legacy_db
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SAMPLE_DB = os.path.join(PROJECT_ROOT, "samples", "financial_data.db")
+
+
+def make_legacy_db(path, tickers=5, years=range(2015, 2025)):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE financial_records (ticker TEXT, year INTEGER, period TEXT, report_date TEXT, "
+        "Revenue REAL, EPS REAL, TotalRevenue REAL, TotalAssets REAL, ROE REAL, "
+        "PRIMARY KEY (ticker, year, period))"
+    )
+    conn.executemany(
+        "INSERT INTO financial_records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(f"T{t}", year, q, f"{year}-12-31", 1.0, t + q_i / 10, 100.0 * t + year, None, 12.5)
+         for t in range(tickers) for year in years for q_i, q in enumerate(["Q1", "Q2", "Q3", "Q4"])],
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestLegacyImport(unittest.TestCase):
+    """测试 import_legacy_db"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'finance.db')}")
+        init_db(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.legacy = os.path.join(self.tmp.name, "financial_data.db")
+        make_legacy_db(self.legacy)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_import(self):
+        messages = []
+        stats = import_legacy_db(self.db, self.legacy, chunk_size=64, log=messages.append)
+        self.assertEqual(stats["rows"], 200)
+        self.assertEqual(stats["chunks"], 4)
+        self.assertEqual(len(messages), 4)
+        self.assertEqual(stats["cells"], 200 * 3)
+        self.assertEqual(stats["skipped_columns"], ["Revenue"])
+        self.assertGreater(stats["rows_per_sec"], 0)
+
+        repo = FinanceRepository(self.db)
+        income = repo.get_pivot_data("利润表", ticker="T2")
+        self.assertEqual(list(income.index), ["每股收益 (EPS)", "总收入"])
+        self.assertEqual(income.loc["每股收益 (EPS)", "2020/Q3"], "2.2")
+        self.assertEqual(income.loc["总收入", "2020/Q3"], "2220")
+        self.assertEqual(repo.get_pivot_data("关键指标", ticker="T0").loc["ROE 净资产收益率 (%)", "2015/Q1"], "12.5")
+        self.assertTrue(repo.get_pivot_data("资产负债表").empty)
+        row = repo.query_observations(category="利润表", tickers=["T1"], period_from="2016/Q2", period_to="2016/Q2")
+        self.assertEqual(row["rows"][0]["report_date"], "2016-12-31")
+
+    def test_reimport_is_noop(self):
+        import_legacy_db(self.db, self.legacy, chunk_size=50, log=lambda msg: None)
+        seq = FinanceRepository(self.db).latest_change_seq()
+        import_legacy_db(self.db, self.legacy, chunk_size=50, log=lambda msg: None)
+        self.assertEqual(FinanceRepository(self.db).latest_change_seq(), seq)
+
+    def test_invalid_source(self):
+        with self.assertRaises(ValueError):
+            import_legacy_db(self.db, os.path.join(self.tmp.name, "missing.db"), log=lambda msg: None)
+        empty = os.path.join(self.tmp.name, "empty.db")
+        sqlite3.connect(empty).close()
+        with self.assertRaises(ValueError):
+            import_legacy_db(self.db, empty, log=lambda msg: None)
+
+    @unittest.skipUnless(os.path.exists(SAMPLE_DB), "缺少样例库")
+    def test_sample_db(self):
+        stats = import_legacy_db(self.db, SAMPLE_DB, chunk_size=4, log=lambda msg: None)
+        self.assertEqual(stats["rows"], 6)
+        self.assertEqual(stats["chunks"], 2)
+        self.assertIn("NVDA", set(FinanceRepository(self.db).get_pivot_data("利润表")["ticker"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
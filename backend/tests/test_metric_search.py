@@ -0,0 +1,196 @@
+# backend/tests/test_metric_search.py
+# 指标搜索测试：FTS5 索引随保存/删除同步、别名命中、短词 LIKE、旧库回填、无 FTS5 时的退路
+
+import os
+import sys
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.metric_search import METRIC_SEARCH_TABLE, fts_match_expression, metric_aliases, search_terms
+from backend.app.models import finance_model
+from backend.app.models.finance_model import init_db, metric_search_available
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.read_cache import PIVOT_CACHE
+
+
+def records(*labels, period="2024/Q1", value="1.0"):
+    return [{"metric_id": label, "metric_label": label, "period": period, "value": value} for label in labels]
+
+
+def keys(results):
+    return [(r["ticker"], r["category"], r["metric_id"]) for r in results]
+
+
+class TestMetricSearchHelpers(unittest.TestCase):
+    """测试查询拆分与别名"""
+
+    def test_search_terms(self):
+        """不少于 3 个字符的词走 MATCH，其余走 LIKE"""
+        self.assertEqual(search_terms("  NVDA 毛利  每股收益 "), (["NVDA", "每股收益"], ["毛利"]))
+        self.assertEqual(search_terms(""), ([], []))
+
+    def test_fts_match_expression_quotes_terms(self):
+        """用户输入作为短语，引号与运算符不生效"""
+        self.assertEqual(fts_match_expression(['a"b', "OR"]), '"a""b" AND "OR"')
+
+    def test_metric_aliases(self):
+        """OCR 别名与配置中的英文 id 都归入标签"""
+        aliases = metric_aliases("每股收益 (EPS)").split()
+        self.assertIn("基本每股收益", aliases)
+        self.assertIn("EPS", aliases)
+        self.assertIn("GrossMargin", metric_aliases("毛利率 (%)").split())
+        self.assertEqual(metric_aliases("自定义指标"), "")
+
+
+class TestMetricSearch(unittest.TestCase):
+    """测试 FinanceRepository.search_metrics"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "finance.db")
+        self.engine = create_engine(f"sqlite:///{self.path}")
+        init_db(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.repo = FinanceRepository(self.db)
+        if not metric_search_available(self.db):
+            self.skipTest("SQLite 不支持 FTS5 trigram")
+        self.repo.save_records("利润表", "NVDA", records("每股收益 (EPS)", "营业总收入", "毛利"))
+        self.repo.save_records("利润表", "AAPL", records("每股收益 (EPS)", "营业总收入"))
+        self.repo.save_records("关键指标", "NVDA", records("毛利率 (%)"))
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def index_count(self):
+        return self.db.execute(text(f"SELECT COUNT(*) FROM {METRIC_SEARCH_TABLE}")).scalar()
+
+    def test_index_follows_saves(self):
+        """每个 (类别, 公司, 指标) 一行；重复保存、追加季度不产生新行"""
+        self.assertEqual(self.index_count(), 6)
+        self.repo.save_records("利润表", "NVDA", records("每股收益 (EPS)", period="2024/Q2"))
+        self.repo.save_records("利润表", "NVDA", records("每股收益 (EPS)", period="2024/Q2"))
+        self.assertEqual(self.index_count(), 6)
+        self.repo.save_records("利润表", "NVDA", records("营业利润"))
+        self.assertEqual(self.index_count(), 7)
+
+    def test_search_by_ticker_label_and_alias(self):
+        """公司代码、指标名子串、OCR 别名、英文 id 都能命中，多个词须同时命中"""
+        self.assertEqual(keys(self.repo.search_metrics("nvda 每股收益")), [("NVDA", "利润表", "每股收益 (EPS)")])
+        self.assertCountEqual(keys(self.repo.search_metrics("基本每股收益")), [
+            ("NVDA", "利润表", "每股收益 (EPS)"), ("AAPL", "利润表", "每股收益 (EPS)"),
+        ])
+        self.assertEqual(keys(self.repo.search_metrics("grossmargin")), [("NVDA", "关键指标", "毛利率 (%)")])
+        self.assertEqual(len(self.repo.search_metrics("AAPL")), 2)
+        self.assertEqual(self.repo.search_metrics("MSFT"), [])
+
+    def test_short_terms(self):
+        """少于 3 个字符的词用 LIKE 过滤"""
+        self.assertEqual(keys(self.repo.search_metrics("毛利")), [
+            ("NVDA", "关键指标", "毛利率 (%)"), ("NVDA", "利润表", "毛利"),
+        ])
+        self.assertEqual(keys(self.repo.search_metrics("AA 收入")), [("AAPL", "利润表", "营业总收入")])
+        # % 与 _ 按字面匹配
+        self.assertEqual(keys(self.repo.search_metrics("%")), [("NVDA", "关键指标", "毛利率 (%)")])
+        self.assertEqual(self.repo.search_metrics("_"), [])
+
+    def test_limit_and_categories(self):
+        self.assertEqual(len(self.repo.search_metrics("NVDA", limit=2)), 2)
+        self.assertEqual(keys(self.repo.search_metrics("NVDA", categories=["关键指标"])), [("NVDA", "关键指标", "毛利率 (%)")])
+        self.assertEqual(self.repo.search_metrics("   "), [])
+        with self.assertRaises(ValueError):
+            self.repo.search_metrics("NVDA", limit=0)
+        with self.assertRaises(ValueError):
+            self.repo.search_metrics("NVDA", categories=["未知"])
+
+    def test_operator_characters(self):
+        """引号、星号等 FTS5 语法字符不报错"""
+        self.assertEqual(self.repo.search_metrics('"NVDA* OR'), [])
+        self.assertEqual(len(self.repo.search_metrics("(EPS)")), 2)
+
+    def test_delete_category(self):
+        """删除类别时同步删除索引行"""
+        self.repo.delete_by_category("利润表")
+        self.assertEqual(self.index_count(), 1)
+        self.assertEqual(self.repo.search_metrics("每股收益"), [])
+
+    def test_backfill_existing_db(self):
+        """旧库没有索引表时 init_db 从分类表回填"""
+        self.db.close()
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE {METRIC_SEARCH_TABLE}"))
+        init_db(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.repo = FinanceRepository(self.db)
+        self.assertEqual(self.index_count(), 6)
+        self.assertEqual(keys(self.repo.search_metrics("稀释每股收益 AAPL")), [("AAPL", "利润表", "每股收益 (EPS)")])
+
+    def test_get_metric_rows(self):
+        """搜索结果的单元格按键读取：只返回命中的行、同名指标分属不同类别时各占一行、不写入 Pivot 缓存"""
+        self.repo.save_records("利润表", "NVDA", records("毛利", period="2024/FY", value="3.0"))
+        self.repo.save_records("关键指标", "AAPL", records("毛利", value="9.9"))
+        PIVOT_CACHE.clear()
+        matches = self.repo.search_metrics("毛利 NVDA") + self.repo.search_metrics("AAPL 毛利")
+        df = self.repo.get_metric_rows(matches)
+        self.assertEqual(list(df.columns), ["ticker", "category", "metric_label", "2024/Q1", "2024/FY"])
+        self.assertEqual(list(zip(df["ticker"], df["category"])), [(m["ticker"], m["category"]) for m in matches])
+        self.assertCountEqual([tuple(r) for r in df.fillna("").values], [
+            ("NVDA", "关键指标", "毛利率 (%)", "1.0", ""),
+            ("NVDA", "利润表", "毛利", "1.0", "3.0"),
+            ("AAPL", "关键指标", "毛利", "9.9", ""),
+        ])
+        self.assertEqual((PIVOT_CACHE.hits, PIVOT_CACHE.misses), (0, 0))
+        self.assertTrue(self.repo.get_metric_rows([]).empty)
+
+    def test_fallback_without_index(self):
+        """没有 FTS5 时在分类表上 LIKE 查询，结果集合相同"""
+        fallback = FinanceRepository(self.db)
+        fallback._search_index = False
+        for query in ("nvda 每股收益", "基本每股收益", "毛利", "AA 收入", "grossmargin", "%", "_"):
+            self.assertCountEqual(keys(fallback.search_metrics(query)), keys(self.repo.search_metrics(query)), query)
+        self.assertEqual(keys(fallback.search_metrics("NVDA", categories=["关键指标"])), [("NVDA", "关键指标", "毛利率 (%)")])
+
+
+class TestMetricSearchUnsupported(unittest.TestCase):
+    """测试 SQLite 不支持 FTS5 trigram 时的建表与提示"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'finance.db')}")
+
+    def tearDown(self):
+        finance_model._metric_search_unsupported = False
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_warns_once_and_falls_back(self):
+        """建表失败只提示一次，之后的 init_db 不再重试；搜索退回到分类表 LIKE 查询"""
+        ddl = "CREATE VIRTUAL TABLE IF NOT EXISTS metric_search USING fts5(ticker, tokenize = 'no_such_tokenizer')"
+        out = io.StringIO()
+        with mock.patch.object(finance_model, "METRIC_SEARCH_DDL", ddl), redirect_stdout(out):
+            for _ in range(3):
+                init_db(self.engine)
+        self.assertEqual(out.getvalue().count("FTS5"), 1)
+
+        db = sessionmaker(bind=self.engine)()
+        try:
+            self.assertFalse(metric_search_available(db))
+            repo = FinanceRepository(db)
+            repo.save_records("利润表", "NVDA", records("每股收益 (EPS)"))
+            self.assertEqual(keys(repo.search_metrics("nvda eps")), [("NVDA", "利润表", "每股收益 (EPS)")])
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
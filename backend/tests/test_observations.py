@@ -0,0 +1,161 @@
+# backend/tests/test_observations.py
+# observations 长格式表测试：数值解析、双写、Pivot 视图、分块在线迁移
+
+import os
+import sys
+import json
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.numbers import parse_numeric
+from backend.app.models import finance_model
+from backend.app.models.finance_model import Base, IncomeStatementModel, ObservationModel, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.observation_migration import migrate_observations, migration_status
+
+
+class TestParseNumeric(unittest.TestCase):
+    """测试单元格文本解析"""
+
+    def test_values(self):
+        cases = {
+            "1,234.5": 1234.5, "12.3亿": 1.23e9, "5万": 5e4, "-5.6%": -5.6,
+            "(1.2)": -1.2, "--": None, "abc": None, "": None, None: None, 3: 3.0,
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(parse_numeric(text), expected)
+
+
+class ObservationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'finance.db')}")
+        self.Session = sessionmaker(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def observations(self):
+        with self.engine.connect() as conn:
+            return {
+                (r.ticker, r.metric_id, r.period): (r.value, r.raw_text, r.report_date)
+                for r in conn.execute(select(ObservationModel.__table__))
+            }
+
+
+class TestDualWrite(ObservationTestCase):
+    """测试新库的双写与 Pivot 视图"""
+
+    def test_save_writes_observations(self):
+        init_db(self.engine)
+        db = self.Session()
+        repo = FinanceRepository(db)
+        self.assertTrue(repo.observations_ready("利润表"))
+
+        pivot = pd.DataFrame({"2024/Q1": ["1,200", "0.6"], "2024/Q2": ["12亿", None]}, index=["营业收入", "EPS"])
+        repo.save_pivot_data("利润表", "NVDA", pivot, {"2024/Q1": "2024/04/27"})
+        obs = self.observations()
+        self.assertEqual(obs[("NVDA", "营业收入", "2024/Q1")], (1200.0, "1,200", "2024/04/27"))
+        self.assertEqual(obs[("NVDA", "营业收入", "2024/Q2")], (1.2e9, "12亿", None))
+        self.assertEqual(len(obs), 3)
+
+        df = repo.get_pivot_data("利润表", ticker="NVDA")
+        self.assertEqual(list(df.index), ["营业收入", "EPS"])
+        self.assertEqual(df.loc["营业收入", "2024/Q2"], "12亿")
+        self.assertTrue(pd.isna(df.loc["EPS", "2024/Q2"]))
+
+        repo.delete_by_category("利润表")
+        self.assertEqual(self.observations(), {})
+        db.close()
+
+
+class TestOnlineMigration(ObservationTestCase):
+    """测试旧库分块迁移"""
+
+    def setUp(self):
+        super().setUp()
+        # 旧库：分类表已有 JSON 数据，observations 为空
+        Base.metadata.create_all(bind=self.engine)
+        db = self.Session()
+        for i in range(5):
+            db.add(IncomeStatementModel(
+                ticker="NVDA", metric_id=f"M{i}", metric_label=f"M{i}",
+                period_data=json.dumps({"2024/Q1": str(i), "2024/Q2": f"{i}.5"}),
+                period_dates=json.dumps({"2024/Q1": "2024/04/27"}),
+            ))
+        db.commit()
+        db.close()
+        init_db(self.engine)
+
+    def test_migration_hint_once_per_process(self):
+        """未迁移提示每个进程只打印一次，重复 init_db（Streamlit 每次交互）不再输出"""
+        finance_model._migration_hint_shown = False
+        out = io.StringIO()
+        with redirect_stdout(out):
+            init_db(self.engine)
+            init_db(self.engine)
+        self.assertEqual(out.getvalue().count("尚未迁移"), 1)
+
+    def test_reads_legacy_until_migrated(self):
+        """测试迁移完成前读旧表，完成后读 observations，结果一致"""
+        db = self.Session()
+        repo = FinanceRepository(db)
+        self.assertFalse(repo.observations_ready("利润表"))
+        before = repo.get_pivot_data("利润表")
+
+        result = migrate_observations(self.engine, chunk_size=2, log=lambda msg: None)
+        self.assertEqual(result["利润表"], 5)
+        self.assertTrue(repo.observations_ready("利润表"))
+        pd.testing.assert_frame_equal(repo.get_pivot_data("利润表"), before)
+        self.assertEqual(self.observations()[("NVDA", "M3", "2024/Q2")], (3.5, "3.5", None))
+        db.close()
+
+    def test_writes_during_migration(self):
+        """测试迁移过程中前台保存（双写）不丢失"""
+        db = self.Session()
+        repo = FinanceRepository(db)
+
+        def log(msg):
+            # 第一块完成后，前台修改一个已迁移行和一个未迁移行
+            if "id 2" in msg:
+                repo.save_records("利润表", "NVDA", [
+                    {"metric_id": "M0", "period": "2024/Q3", "value": "9"},
+                    {"metric_id": "M4", "period": "2024/Q1", "value": "40"},
+                ])
+
+        migrate_observations(self.engine, chunk_size=2, log=log)
+        obs = self.observations()
+        self.assertEqual(obs[("NVDA", "M0", "2024/Q3")][0], 9.0)
+        self.assertEqual(obs[("NVDA", "M4", "2024/Q1")][0], 40.0)
+        self.assertEqual(obs[("NVDA", "M4", "2024/Q2")][0], 4.5)
+        self.assertEqual(len(obs), 11)
+        db.close()
+
+    def test_resume_after_interruption(self):
+        """测试中断后从断点继续"""
+        def interrupt(msg):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            migrate_observations(self.engine, chunk_size=2, log=interrupt)
+        state = migration_status(self.engine)["利润表"]
+        self.assertEqual((state["done"], state["last_id"], state["remaining"]), (False, 2, 3))
+
+        self.assertEqual(migrate_observations(self.engine, chunk_size=2, log=lambda msg: None)["利润表"], 3)
+        self.assertTrue(migration_status(self.engine)["利润表"]["done"])
+        self.assertEqual(len(self.observations()), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
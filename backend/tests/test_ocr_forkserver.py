@@ -0,0 +1,76 @@
+# backend/tests/test_ocr_forkserver.py
+# Fork-server worker 测试：父进程预加载的大对象在子进程中以写时复制方式共享
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.app.services.job_queue import OCRJobQueue
+from backend.app.services.ocr_forkserver import ForkedWorkerPool, read_memory
+
+WEIGHTS_MB = 64
+
+
+class PreloadedService:
+    """模拟已加载权重的 OCR 服务：持有一块已写入的大内存"""
+
+    def __init__(self):
+        self.weights = bytearray(os.urandom(1024 * 1024)) * WEIGHTS_MB
+
+    def parse_multi_image(self, periods_path, metrics_path, values_path, metric_config):
+        # 只读访问权重，不触发页面复制
+        checksum = self.weights[::4096].count(0)
+        return [{"metric_id": "EPS", "period": "2024/Q1", "value": str(checksum)}], ""
+
+
+@unittest.skipUnless(sys.platform.startswith("linux") and os.path.exists(f"/proc/{os.getpid()}/smaps"),
+                     "需要 Linux /proc 内存统计")
+class TestForkedWorkerPool(unittest.TestCase):
+    """测试 fork worker 共享预加载内存并处理队列任务"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "ocr_jobs.db")
+        self.queue = OCRJobQueue(self.db_path)
+
+    def tearDown(self):
+        self.queue.dispose()
+        self.tmpdir.cleanup()
+
+    def test_read_memory(self):
+        """测试读取当前进程内存统计"""
+        mem = read_memory(os.getpid())
+        self.assertGreater(mem["rss"], 0)
+        self.assertLessEqual(mem["uss"], mem["rss"])
+
+    def test_workers_share_preloaded_weights(self):
+        """测试 worker 的独占内存远小于共享的预加载权重，且能处理任务"""
+        for _ in range(6):
+            self.queue.enqueue("利润表", "p.png", "m.png", "v.png", [{"id": "EPS", "label": "EPS"}])
+
+        pool = ForkedWorkerPool(PreloadedService(), self.db_path, poll_interval=0.05)
+        pool.start(2)
+        try:
+            deadline = time.time() + 30
+            while self.queue.depth()["done"] < 6 and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(self.queue.depth()["done"], 6)
+
+            report = pool.memory_report()
+            self.assertEqual(len(report["workers"]), 2)
+            weights = WEIGHTS_MB * 1024 * 1024
+            for pid, mem in report["workers"].items():
+                with self.subTest(pid=pid):
+                    self.assertGreater(mem["shared"], weights * 0.9)
+                    self.assertLess(mem["uss"], weights / 2)
+        finally:
+            pool.stop()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
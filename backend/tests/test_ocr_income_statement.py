@@ -12,13 +12,12 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".
 
 from backend.config.config import FINANCIAL_METRICS
 
-# OCR服务延迟导入（需要easyocr依赖）
+# OCR服务可用性检测（easyocr 在第一次推理时才导入，这里只检查依赖是否安装）
+import importlib.util
 OCRService = None
-try:
+if importlib.util.find_spec("easyocr") is not None:
     from backend.app.services.ocr_service import OCRService as _OCRService
     OCRService = _OCRService
-except ImportError:
-    pass
 
 
 class TestQuarterRecognition(unittest.TestCase):
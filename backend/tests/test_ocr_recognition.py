@@ -0,0 +1,97 @@
+# backend/tests/test_ocr_recognition.py
+# 识别阶段分桶调度测试（使用模拟 reader，无需 easyocr 模型）
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from PIL import Image
+
+from backend.app.services.ocr_recognition import (
+    box_aspect, bucket_boxes, estimate_padding, recognize_bucketed,
+)
+from backend.app.services.ocr_service import OCRService
+
+# 季度表头、数值单元格、长科目名混排
+HORIZONTAL = [
+    [0, 400, 0, 20],     # 长科目名 20:1
+    [0, 60, 30, 50],     # 数值 3:1
+    [0, 40, 60, 80],     # 数值 2:1
+    [0, 380, 90, 110],   # 长科目名 19:1
+    [0, 20, 120, 140],   # 短文本 1:1
+]
+FREE = [[[100, 200], [180, 200], [180, 220], [100, 220]]]  # 4:1
+
+
+class BatchReader:
+    """模拟 easyocr 批量识别：输出按框的纵坐标排序，文本为框的左上角坐标"""
+
+    def __init__(self):
+        self.batches = []
+
+    def recognize(self, img, horizontal_list=None, free_list=None, batch_size=1, detail=1, **kwargs):
+        self.batches.append((list(horizontal_list), list(free_list), batch_size))
+        items = []
+        for x_min, x_max, y_min, y_max in horizontal_list:
+            items.append(([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]], f"{x_min},{y_min}", 0.9))
+        for box in free_list:
+            items.append((box, f"{box[0][0]},{box[0][1]}", 0.8))
+        items.sort(key=lambda item: item[0][0][1])
+        return items if detail else [item[1] for item in items]
+
+
+class TestRecognitionBuckets(unittest.TestCase):
+    """测试分桶批量识别"""
+
+    def test_box_aspect(self):
+        """测试两种框格式的宽高比"""
+        self.assertEqual(box_aspect([0, 400, 0, 20]), 20.0)
+        self.assertEqual(box_aspect(FREE[0]), 4.0)
+
+    def test_buckets_group_similar_widths(self):
+        """测试相近宽高比进入同一桶"""
+        buckets = bucket_boxes(HORIZONTAL, FREE)
+        sizes = {k: (len(h), len(f)) for k, (h, f) in buckets.items()}
+        self.assertEqual(sizes, {0: (1, 0), 1: (2, 0), 2: (0, 1), 4: (2, 0)})
+
+    def test_order_restored(self):
+        """测试每个桶一个批次，结果按输入顺序还原"""
+        reader = BatchReader()
+        result = recognize_bucketed(reader, None, HORIZONTAL, FREE, batch_size=1)
+        self.assertEqual([r[1] for r in result], ["0,0", "0,30", "0,60", "0,90", "0,120", "100,200"])
+        self.assertEqual(len(reader.batches), 4)
+        for h, f, batch_size in reader.batches:
+            self.assertEqual(batch_size, len(h) + len(f))
+
+        texts = recognize_bucketed(BatchReader(), None, HORIZONTAL, FREE, detail=0)
+        self.assertEqual(texts[0], "0,0")
+
+    def test_padding_reduced(self):
+        """测试分桶后填充像素减少"""
+        single = estimate_padding(HORIZONTAL, FREE)
+        bucketed = estimate_padding(HORIZONTAL, FREE, edges=(2.0, 4.0, 8.0, 16.0, 32.0))
+        self.assertEqual(single["useful"], bucketed["useful"])
+        self.assertLess(bucketed["padded"], single["padded"] / 2)
+
+    def test_service_uses_buckets(self):
+        """测试 OCRService(width_buckets=True) 检测后分桶识别"""
+        class DetectReader(BatchReader):
+            def detect(self, img, **kwargs):
+                return [HORIZONTAL], [FREE]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "m.png")
+            Image.new("RGB", (500, 300), "white").save(path)
+            reader = DetectReader()
+            result = OCRService(profile={}, width_buckets=True)._readtext(reader, path)
+        self.assertEqual(len(reader.batches), 4)
+        self.assertEqual(len(result), 6)
+        self.assertEqual(result[0][1], "0,0")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# backend/tests/test_ocr_replay.py
+# OCR 解析阶段回放测试：基于录制的 readtext 夹具，无需 easyocr 模型
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.config.config import FINANCIAL_METRICS
+from backend.app.services.ocr_service import OCRService
+from backend.app.services.ocr_fixtures import (
+    decode_results, encode_results, load_fixture, load_fixture_meta, save_fixture,
+)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+INCOME_FIXTURE = os.path.join(FIXTURE_DIR, "income_statement_synthetic.ocr.json")
+
+
+class TestFixtureFormat(unittest.TestCase):
+    """测试夹具编码与读写"""
+
+    def test_encode_decode_roundtrip(self):
+        """测试 readtext 输出编码后可无损还原"""
+        results = [([[1, 2], [30, 2], [30, 12], [1, 12]], "2024/Q1", 0.987654321),
+                   ([[1.25, 2.5], [3, 4], [5, 6], [7, 8]], "毛利", 0.5)]
+        decoded = decode_results(encode_results(results))
+        self.assertEqual(decoded[0][0], [[1, 2], [30, 2], [30, 12], [1, 12]])
+        self.assertEqual(decoded[0][1], "2024/Q1")
+        self.assertAlmostEqual(decoded[0][2], 0.9877)
+        self.assertEqual(decoded[1][0][0], [1.2, 2.5])
+
+    def test_gzip_fixture_roundtrip(self):
+        """测试 .gz 夹具读写"""
+        raw = load_fixture(INCOME_FIXTURE)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "copy.ocr.json.gz")
+            save_fixture(raw, path, meta={"category": "利润表"})
+            self.assertEqual(load_fixture(path), raw)
+            self.assertEqual(load_fixture_meta(path)["category"], "利润表")
+
+
+class TestParseReplay(unittest.TestCase):
+    """测试基于夹具回放的多图解析"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ocr = OCRService(gpu=False)
+        cls.income_metrics = [m for m in FINANCIAL_METRICS if m.get('category') == '利润表']
+        cls.parsed, cls.disclosure_date = cls.ocr.parse_fixture(INCOME_FIXTURE, cls.income_metrics)
+        cls.cells = {(d['metric_id'], d['period']): d for d in cls.parsed}
+
+    def test_replay_does_not_load_model(self):
+        """测试回放解析不会创建 easyocr reader"""
+        self.assertIsNone(self.ocr._reader)
+
+    def test_period_normalisation(self):
+        """测试季度修正：O2->Q2, IFY->/FY, 41->H1, 保留 09"""
+        periods = {d['period'] for d in self.parsed}
+        self.assertEqual(periods, {"2024/Q1", "2024/Q2", "2023/FY", "2024/H1", "2023/09"})
+
+    def test_alias_matching(self):
+        """测试别名匹配：菅业利润、其本每股收益、归屑于母公司股东净利润、毛利润"""
+        metric_ids = {d['metric_id'] for d in self.parsed}
+        self.assertEqual(metric_ids, {"OperatingRevenue", "OperatingProfit", "EPS", "NetIncomeToParent", "GrossProfit"})
+
+    def test_missing_decimal_point_fixed(self):
+        """测试缺失小数点修复（空格分隔和低置信度三位数）"""
+        self.assertEqual(self.cells[("EPS", "2024/Q1")]["value"], "1.23")
+        self.assertEqual(self.cells[("EPS", "2024/Q2")]["value"], "1.23")
+        self.assertEqual(self.cells[("EPS", "2023/FY")]["value"], "11.93")
+
+    def test_per_period_dates(self):
+        """测试每季度截止日期与全局披露日期"""
+        self.assertEqual(self.cells[("GrossProfit", "2024/Q1")]["report_date"], "2024/04/28")
+        self.assertEqual(self.cells[("GrossProfit", "2023/09")]["report_date"], "2023/10/29")
+        self.assertEqual(self.disclosure_date, "2023/10/29")
+
+    def test_parse_is_fast(self):
+        """测试回放解析为毫秒级"""
+        raw = load_fixture(INCOME_FIXTURE)
+        start = time.perf_counter()
+        runs = 50
+        for _ in range(runs):
+            self.ocr.parse_ocr_results(raw, self.income_metrics)
+        per_parse = (time.perf_counter() - start) / runs
+        self.assertLess(per_parse, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,184 @@
+# backend/tests/test_ocr_tuner.py
+# easyocr 参数调优测试：准确率计算、搜索选择、profile 读写（使用模拟评估函数，无需模型）
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.app.services import ocr_tuner
+from backend.app.services.ocr_service import OCRService
+from backend.app.services.ocr_tuner import (
+    EASYOCR_DEFAULTS, candidate_params, cell_accuracy, find_cjk_font,
+    load_cases, make_synthetic_case, make_synthetic_cases, tune, write_profile,
+)
+
+SPACE = {"canvas_size": [2560, 1280, 640], "mag_ratio": [1.0, 0.5], "decoder": ["greedy", "beamsearch"]}
+
+
+def fake_evaluate(params, time_budget=None):
+    """画布越小越快；640 画布准确率跌破下限；beamsearch 更慢但略准"""
+    seconds = params["canvas_size"] / 1000 * params["mag_ratio"] + (0.5 if params["decoder"] == "beamsearch" else 0)
+    accuracy = {2560: 0.99, 1280: 0.97, 640: 0.80}[params["canvas_size"]]
+    if params["decoder"] == "beamsearch":
+        accuracy += 0.005
+    if time_budget is not None and seconds > time_budget:
+        return None, float("inf")
+    return accuracy, seconds
+
+
+class RecordingReader:
+    """记录 readtext 参数的 reader"""
+
+    def __init__(self):
+        self.calls = []
+
+    def readtext(self, path, **kwargs):
+        self.calls.append(kwargs)
+        return []
+
+
+class TestTuner(unittest.TestCase):
+    """测试参数搜索"""
+
+    def test_cell_accuracy(self):
+        """测试单元格准确率（忽略空格和千分位）"""
+        expected = [{"metric_id": "EPS", "period": "2024/Q1", "value": "1,234.5"},
+                    {"metric_id": "EPS", "period": "2024/Q2", "value": "2.0"}]
+        parsed = [{"metric_id": "EPS", "period": "2024/Q1", "value": "1234.5"},
+                  {"metric_id": "EPS", "period": "2024/Q2", "value": "2.6"}]
+        self.assertEqual(cell_accuracy(parsed, expected), 0.5)
+
+    def test_candidates_start_with_defaults(self):
+        """测试候选以 easyocr 默认值开头且不重复"""
+        candidates = candidate_params(SPACE, trials=100)
+        self.assertEqual(candidates[0], {k: EASYOCR_DEFAULTS[k] for k in SPACE})
+        self.assertEqual(len(candidates), 12)
+        self.assertEqual(len({tuple(sorted(c.items())) for c in candidates}), 12)
+
+    def test_picks_fastest_above_floor(self):
+        """测试选出满足下限的最快配置"""
+        result = tune(fake_evaluate, floor=0.95, space=SPACE, trials=100, log=lambda _: None)
+        self.assertEqual(result["readtext"], {"canvas_size": 1280, "mag_ratio": 0.5, "decoder": "greedy"})
+        self.assertAlmostEqual(result["seconds_per_case"], 0.64)
+        self.assertTrue(any(t["accuracy"] is None for t in result["trials"]))
+
+    def test_no_config_meets_floor(self):
+        """测试所有配置都达不到下限时不写 profile"""
+        result = tune(fake_evaluate, floor=0.999, space=SPACE, trials=100, log=lambda _: None)
+        self.assertIsNone(result["readtext"])
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                write_profile(result, os.path.join(tmp, "profile.json"))
+
+
+class TestProfile(unittest.TestCase):
+    """测试 profile 写出后由 OCRService 加载并传给 readtext"""
+
+    def test_profile_roundtrip(self):
+        result = tune(fake_evaluate, floor=0.95, space=SPACE, trials=100, log=lambda _: None)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ocr_profile.json")
+            write_profile(result, path, meta={"cases": 3})
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["cases"], 3)
+
+            service = OCRService(gpu=False, profile=path)
+            self.assertEqual(service.readtext_params, result["readtext"])
+            reader = RecordingReader()
+            service.read_images("p.png", "m.png", "v.png", reader=reader)
+            self.assertEqual(reader.calls, [result["readtext"]] * 3)
+
+    def test_no_profile_uses_defaults(self):
+        """测试未指定 profile 时不传额外参数"""
+        reader = RecordingReader()
+        OCRService(gpu=False).read_images("p.png", "m.png", "v.png", reader=reader)
+        self.assertEqual(reader.calls, [{}] * 3)
+
+
+class LowAccuracyEvaluator:
+    """替代 OCRCaseEvaluator：所有候选准确率都是 0.5"""
+
+    def __init__(self, ocr_service, cases, metric_config):
+        self.cases = cases
+
+    def __call__(self, params, time_budget=None):
+        return 0.5, 1.0
+
+
+class TestMain(unittest.TestCase):
+    """测试命令行入口"""
+
+    def test_requires_cases_or_synthetic(self):
+        with redirect_stderr(StringIO()), self.assertRaises(SystemExit) as ctx:
+            ocr_tuner.main([])
+        self.assertEqual(ctx.exception.code, 2)
+
+    def test_no_config_meets_floor_exits(self):
+        """测试没有配置达到下限时以 SystemExit 退出并说明原因，不写 profile"""
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "a.label.json"), "w", encoding="utf-8") as f:
+                json.dump({"category": "利润表", "periods": "p.png", "metrics": "m.png", "values": "v.png",
+                           "cells": []}, f)
+            out = os.path.join(tmp, "profile.json")
+            with mock.patch.object(ocr_tuner, "OCRCaseEvaluator", LowAccuracyEvaluator), \
+                    redirect_stdout(StringIO()), self.assertRaises(SystemExit) as ctx:
+                ocr_tuner.main(["--cases", tmp, "--trials", "3", "--out", out])
+            self.assertIn("准确率下限 0.95", str(ctx.exception.code))
+            self.assertIn("0.500", str(ctx.exception.code))
+            self.assertFalse(os.path.exists(out))
+
+
+@unittest.skipUnless(find_cjk_font(), "未安装 CJK 字体，跳过合成截图测试")
+class TestSyntheticCases(unittest.TestCase):
+    """测试合成截图与标注文件"""
+
+    def test_make_and_load_case(self):
+        metrics = [{"id": "EPS", "label": "每股收益 (EPS)", "category": "利润表"}]
+        with tempfile.TemporaryDirectory() as tmp:
+            make_synthetic_case(tmp, "eps", "利润表", metrics, ["2024/Q1", "2024/Q2"],
+                                {"EPS": ["0.60", "0.68"]}, dates=["2024/04/28", "2024/07/28"])
+            cases = load_cases(tmp)
+            self.assertEqual(len(cases), 1)
+            self.assertEqual(len(cases[0]["cells"]), 2)
+            self.assertTrue(os.path.exists(cases[0]["values"]))
+
+    def test_make_synthetic_cases(self):
+        """测试按类别轮流生成多组标注，每组 4 个季度"""
+        metrics = [{"id": "EPS", "label": "每股收益 (EPS)", "category": "利润表"},
+                   {"id": "GrossMargin", "label": "毛利率 (%)", "category": "关键指标"}]
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(len(make_synthetic_cases(tmp, 3, metrics, seed=1)), 3)
+            cases = load_cases(tmp)
+            self.assertEqual([c["category"] for c in cases], ["利润表", "关键指标", "利润表"])
+            self.assertTrue(all(len(c["cells"]) == 4 for c in cases))
+
+    def test_main_synthetic(self):
+        """测试 --synthetic N 在临时目录生成标注集后进入调优"""
+        seen = {}
+
+        class Evaluator(LowAccuracyEvaluator):
+            def __init__(self, ocr_service, cases, metric_config):
+                seen["cases"] = len(cases)
+
+            def __call__(self, params, time_budget=None):
+                return 1.0, 1.0
+
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "profile.json")
+            with mock.patch.object(ocr_tuner, "OCRCaseEvaluator", Evaluator), redirect_stdout(StringIO()):
+                self.assertEqual(ocr_tuner.main(["--synthetic", "2", "--trials", "1", "--out", out]), 0)
+            self.assertEqual(seen["cases"], 2)
+            with open(out, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["cases"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,133 @@
+# backend/tests/test_ocr_two_scale.py
+# 两级尺度 OCR 测试：检测在缩小图上运行，识别使用原图（使用模拟 reader，无需 easyocr 模型）
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from PIL import Image
+
+from backend.app.services.ocr_service import OCRService, scale_boxes
+from backend.app.services.ocr_tuner import split_params, write_profile
+
+
+class TwoScaleReader:
+    """模拟 easyocr.Reader：detect 返回固定比例位置的框，recognize 记录输入"""
+
+    def __init__(self):
+        self.detect_calls = []
+        self.recognize_calls = []
+        self.readtext_calls = 0
+
+    def readtext(self, path, **kwargs):
+        self.readtext_calls += 1
+        return []
+
+    def detect(self, img, **kwargs):
+        self.detect_calls.append((img.shape, kwargs))
+        h, w = img.shape[:2]
+        # 一个位于图像 (10%~50%, 20%~40%) 的水平框
+        return [[[int(w * 0.1), int(w * 0.5), int(h * 0.2), int(h * 0.4)]]], [[]]
+
+    def recognize(self, img, horizontal_list=None, free_list=None, **kwargs):
+        self.recognize_calls.append((img.shape, horizontal_list, free_list, kwargs))
+        x_min, x_max, y_min, y_max = horizontal_list[0]
+        box = [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+        return [(box, "营业总收入", 0.9)]
+
+
+class TestTwoScale(unittest.TestCase):
+    """测试两级尺度检测"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.image = os.path.join(self.tmp.name, "m.png")
+        Image.new("RGB", (1000, 400), "white").save(self.image)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scale_boxes(self):
+        """测试检测框放大并裁剪到图像范围"""
+        horizontal, free = scale_boxes([[10, 60, 5, 20]], [[[1, 2], [3, 2], [3, 4], [1, 4]]], 4.0, 200, 100)
+        self.assertEqual(horizontal, [[40, 200, 20, 80]])
+        self.assertEqual(free, [[[4.0, 8.0], [12.0, 8.0], [12.0, 16.0], [4.0, 16.0]]])
+
+    def test_detect_small_recognize_full(self):
+        """测试检测输入为缩小图，识别输入为原图，框坐标为原图坐标"""
+        service = OCRService(profile={"readtext": {"min_size": 20, "canvas_size": 1280, "decoder": "greedy"}},
+                             detect_scale=0.5)
+        reader = TwoScaleReader()
+        results = service.read_images(self.image, self.image, self.image, reader=reader)
+
+        self.assertEqual(reader.readtext_calls, 0)
+        det_shape, det_kwargs = reader.detect_calls[0]
+        self.assertEqual(det_shape[:2], (200, 500))
+        self.assertEqual(det_kwargs, {"min_size": 10, "canvas_size": 1280})
+
+        rec_shape, horizontal, free, rec_kwargs = reader.recognize_calls[0]
+        self.assertEqual(rec_shape, (400, 1000))
+        self.assertEqual(horizontal, [[100, 500, 80, 160]])
+        self.assertEqual(free, [])
+        self.assertEqual(rec_kwargs, {"decoder": "greedy"})
+        self.assertEqual(results["metrics"][0][1], "营业总收入")
+
+    def test_full_scale_uses_readtext(self):
+        """测试 detect_scale=1 时仍走 readtext 单次调用"""
+        reader = TwoScaleReader()
+        OCRService(profile={}).read_images(self.image, self.image, self.image, reader=reader)
+        self.assertEqual(reader.readtext_calls, 3)
+        self.assertEqual(reader.detect_calls, [])
+
+    def test_extract_text_uses_profile(self):
+        """测试 extract_text_from_image 同样使用 profile 中的推理参数与两级尺度"""
+        class Reader(TwoScaleReader):
+            def readtext(self, path, **kwargs):
+                self.readtext_kwargs = kwargs
+                return [([[0, 0], [1, 0], [1, 1], [0, 1]], "毛利", 0.8)]
+
+        service = OCRService(profile={"readtext": {"canvas_size": 1280, "decoder": "greedy"}})
+        service._reader = Reader()
+        self.assertEqual(service.extract_text_from_image(self.image)[0]["text"], "毛利")
+        self.assertEqual(service._reader.readtext_kwargs, {"canvas_size": 1280, "decoder": "greedy"})
+
+        service.detect_scale = 0.5
+        service._reader = Reader()
+        self.assertEqual(service.extract_text_from_image(self.image)[0]["text"], "营业总收入")
+        self.assertEqual(service._reader.detect_calls[0][0][:2], (200, 500))
+
+    def test_profile_detect_scale(self):
+        """测试 detect_scale 作为 profile 顶层键写出并加载"""
+        self.assertEqual(split_params({"detect_scale": 0.5, "mag_ratio": 1.0}),
+                         ({"mag_ratio": 1.0}, {"detect_scale": 0.5}))
+        path = os.path.join(self.tmp.name, "profile.json")
+        write_profile({"readtext": {"detect_scale": 0.5, "mag_ratio": 1.0}, "accuracy": 1.0,
+                       "seconds_per_case": 0.1, "floor": 0.95}, path)
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+        self.assertEqual(profile["readtext"], {"mag_ratio": 1.0})
+        service = OCRService(profile=path)
+        self.assertEqual(service.detect_scale, 0.5)
+        self.assertEqual(service.readtext_params, {"mag_ratio": 1.0})
+
+    def test_non_positive_detect_scale_rejected(self):
+        """测试 detect_scale 为 0、负数或非数字时在加载时报错，而不是在识别时出错"""
+        for bad in (0, -0.5, "0.5", True):
+            with self.assertRaises(ValueError):
+                OCRService(detect_scale=bad)
+            with self.assertRaises(ValueError):
+                OCRService(profile={"detect_scale": bad})
+        with self.assertRaises(ValueError):
+            write_profile({"readtext": {"detect_scale": 0}, "accuracy": 1.0, "seconds_per_case": 0.1, "floor": 0.95},
+                          os.path.join(self.tmp.name, "bad.json"))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "bad.json")))
+        self.assertEqual(OCRService(detect_scale=2).detect_scale, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
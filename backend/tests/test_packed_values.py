@@ -0,0 +1,121 @@
+# backend/tests/test_packed_values.py
+# 紧凑格式测试：打包/解包、保存时维护季度轴、旧库补列与回填、numeric 读取一致
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.numbers import parse_numeric
+from backend.app.core.packed import build_axis, pack_values, unpack_values
+from backend.app.models.finance_model import init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.packed_migration import pack_categories
+
+
+def parsed(df):
+    """文本 Pivot 逐单元格解析，作为 numeric 读取的参照"""
+    out = df.copy()
+    for column in out.columns[1:]:
+        out[column] = np.array([parse_numeric(v) for v in df[column]], dtype=float)
+    return out
+
+
+class TestPackHelpers(unittest.TestCase):
+    def test_round_trip(self):
+        axis = build_axis([{"2024/Q1", "2023/FY"}, {"2024/H1"}])
+        self.assertEqual(axis, ["2023/FY", "2024/Q1", "2024/H1"])
+        blob = pack_values({"2024/Q1": "12.3亿", "2024/H1": "--"}, axis)
+        self.assertEqual(len(blob), 24)
+        values = unpack_values(blob)
+        self.assertTrue(np.isnan(values[0]) and np.isnan(values[2]))
+        self.assertEqual(values[1], 1.23e9)
+        self.assertFalse(values.flags.writeable)
+
+
+class TestPackedStorage(unittest.TestCase):
+    """测试 period_values / period_axes"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'finance.db')}")
+        self.Session = sessionmaker(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def axis(self, ticker):
+        with self.engine.connect() as conn:
+            return json.loads(conn.execute(text(
+                "SELECT periods FROM period_axes WHERE category = '利润表' AND ticker = :t"), {"t": ticker}).scalar())
+
+    def test_save_maintains_axis(self):
+        init_db(self.engine)
+        db = self.Session()
+        repo = FinanceRepository(db, use_cache=False)
+        self.assertTrue(repo.packed_ready("利润表"))
+        repo.save_records("利润表", "NVDA", [
+            {"metric_id": "营业收入", "period": "2024/Q1", "value": "1,000"},
+            {"metric_id": "营业收入", "period": "2024/Q2", "value": "12亿"},
+            {"metric_id": "EPS", "period": "2024/Q1", "value": "(0.5)"},
+        ])
+        self.assertEqual(self.axis("NVDA"), ["2024/Q1", "2024/Q2"])
+        # 新季度只出现在一个指标上：轴扩展，另一行按新轴重写
+        repo.save_records("利润表", "NVDA", [{"metric_id": "EPS", "period": "2023/FY", "value": "2"}])
+        repo.save_records("利润表", "AMD", [{"metric_id": "EPS", "period": "2024/Q3", "value": "--"}])
+        self.assertEqual(self.axis("NVDA"), ["2023/FY", "2024/Q1", "2024/Q2"])
+        widths = {r[0]: len(r[1]) for r in db.execute(text("SELECT metric_id, period_values FROM income_statement "
+                                                             "WHERE ticker = 'NVDA'"))}
+        self.assertEqual(widths, {"营业收入": 24, "EPS": 24})
+
+        numeric = repo.get_pivot_data("利润表", numeric=True)
+        pd.testing.assert_frame_equal(numeric, parsed(repo.get_pivot_data("利润表")))
+        self.assertEqual(list(numeric.columns), ["ticker", "2023/FY", "2024/Q1", "2024/Q2", "2024/Q3"])
+        self.assertEqual(numeric.loc["营业收入", "2024/Q2"], 1.2e9)
+        pd.testing.assert_frame_equal(repo.get_pivot_data("利润表", ticker="AMD", numeric=True),
+                                      parsed(repo.get_pivot_data("利润表", ticker="AMD")))
+
+        repo.delete_by_category("利润表")
+        self.assertEqual(db.execute(text("SELECT COUNT(*) FROM period_axes")).scalar(), 0)
+        db.close()
+
+    def test_backfill_legacy(self):
+        """测试旧库（无 period_values 列）补列、回填前后 numeric 读取一致"""
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE income_statement (id INTEGER PRIMARY KEY, ticker VARCHAR, metric_id VARCHAR, "
+                "metric_label VARCHAR, period_data TEXT, period_dates TEXT)"
+            ))
+            conn.execute(text(
+                "INSERT INTO income_statement (ticker, metric_id, metric_label, period_data, period_dates) "
+                "VALUES (:t, :m, :m, :d, '{}')"
+            ), [
+                {"t": "NVDA", "m": "营业收入", "d": json.dumps({"2024/Q2": "12亿", "2024/Q1": "1,000"})},
+                {"t": "NVDA", "m": "空", "d": ""},
+                {"t": "AMD", "m": "EPS", "d": json.dumps({"2023/FY": "(0.2)"})},
+            ])
+        init_db(self.engine)
+        db = self.Session()
+        repo = FinanceRepository(db, use_cache=False)
+        self.assertFalse(repo.packed_ready("利润表"))
+        before = repo.get_pivot_data("利润表", numeric=True)
+
+        self.assertEqual(pack_categories(self.engine, ["利润表"], log=lambda msg: None), {"利润表": 3})
+        db.expire_all()
+        self.assertTrue(repo.packed_ready("利润表"))
+        pd.testing.assert_frame_equal(repo.get_pivot_data("利润表", numeric=True), before)
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
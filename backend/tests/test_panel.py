@@ -0,0 +1,102 @@
+# backend/tests/test_panel.py
+# 多公司、多类别面板读取测试：一条 SQL、MultiIndex、float64，迁移前后结果一致
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.finance_model import Base, IncomeStatementModel, KeyRatiosModel, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.observation_migration import migrate_observations
+
+
+class TestPanel(unittest.TestCase):
+    """测试 get_panel"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'finance.db')}")
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        # 迁移前的旧数据：observations 为空
+        self.db.add_all([
+            IncomeStatementModel(ticker="NVDA", metric_id="营业收入", metric_label="营业收入",
+                                 period_data=json.dumps({"2024/Q2": "12亿", "2024/Q1": "1,000"}), period_dates="{}"),
+            IncomeStatementModel(ticker="NVDA", metric_id="EPS", metric_label="EPS",
+                                 period_data=json.dumps({"2023/Q4": "0.5", "2024/Q2": "--"}), period_dates="{}"),
+            IncomeStatementModel(ticker="NVDA", metric_id="空", metric_label="空", period_data="", period_dates="{}"),
+            IncomeStatementModel(ticker="AMD", metric_id="EPS", metric_label="EPS",
+                                 period_data=json.dumps({"2024/Q1": "(0.2)"}), period_dates="{}"),
+            KeyRatiosModel(ticker="NVDA", metric_id="ROE", metric_label="ROE",
+                           period_data=json.dumps({"2024/Q1": "30%"}), period_dates="{}"),
+            KeyRatiosModel(ticker="TSLA", metric_id="ROE", metric_label="ROE",
+                           period_data=json.dumps({"2024/Q1": "5%"}), period_dates="{}"),
+        ])
+        self.db.commit()
+        init_db(self.engine)
+        self.repo = FinanceRepository(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_panel_shape(self):
+        panel = self.repo.get_panel(["NVDA", "AMD"])
+        self.assertEqual(panel.index.names, ["ticker", "category", "metric"])
+        self.assertEqual(list(panel.index), [
+            ("AMD", "利润表", "EPS"),
+            ("NVDA", "利润表", "营业收入"), ("NVDA", "利润表", "EPS"),
+            ("NVDA", "关键指标", "ROE"),
+        ])
+        self.assertEqual(list(panel.columns), ["2023/Q4", "2024/Q1", "2024/Q2"])
+        self.assertTrue(all(dtype == np.float64 for dtype in panel.dtypes))
+        self.assertEqual(panel.loc[("NVDA", "利润表", "营业收入"), "2024/Q2"], 1.2e9)
+        self.assertEqual(panel.loc[("AMD", "利润表", "EPS"), "2024/Q1"], -0.2)
+        self.assertTrue(np.isnan(panel.loc[("NVDA", "利润表", "EPS"), "2024/Q2"]))
+        self.assertEqual(panel.loc[("NVDA", "关键指标", "ROE"), "2024/Q1"], 30.0)
+
+    def test_single_statement(self):
+        """测试所有类别在一条 SQL 中读取"""
+        statements = []
+        # 读取走 DB-API 游标，不经过 SQLAlchemy 事件，直接跟踪 sqlite3 连接
+        connection = self.db.connection().connection.driver_connection
+        self.repo.observations_ready("利润表")
+        connection.set_trace_callback(statements.append)
+        try:
+            self.repo.get_panel(categories=["利润表", "关键指标"])
+        finally:
+            connection.set_trace_callback(None)
+        data_statements = [s for s in statements if "json_each" in s or "FROM observations" in s]
+        self.assertEqual(len(data_statements), 1)
+        self.assertIn("UNION ALL", data_statements[0])
+        self.assertEqual(sum("UNION ALL" in s for s in statements), 1)
+
+    def test_migrated_matches_legacy(self):
+        """测试迁移后读取 observations 的结果与读取分类表一致"""
+        before = self.repo.get_panel()
+        migrate_observations(self.engine, log=lambda msg: None)
+        self.db.expire_all()
+        after = FinanceRepository(self.db).get_panel()
+        pd.testing.assert_frame_equal(before, after)
+
+    def test_filters_and_errors(self):
+        panel = self.repo.get_panel(["TSLA"], ["关键指标"])
+        self.assertEqual(list(panel.index), [("TSLA", "关键指标", "ROE")])
+        self.assertTrue(self.repo.get_panel(["NONE"]).empty)
+        with self.assertRaises(ValueError):
+            self.repo.get_panel(categories=["未知"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+# backend/tests/test_period_calendar.py
+# 季度日历测试：每个 (类别, 公司, 季度) 一行日期、合并规则、旧库回填、按日期范围查询走索引
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.periods import normalize_date
+from backend.app.models.finance_model import PERIOD_CALENDAR_STATE, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+
+
+def records(labels, periods, value="1.0"):
+    return [{"metric_id": label, "metric_label": label, "period": period, "value": value}
+            for label in labels for period in periods]
+
+
+class TestNormalizeDate(unittest.TestCase):
+    def test_formats(self):
+        for raw in ("2024/04/27", "2024-4-27", "2024.04.27", "2024年4月27日"):
+            self.assertEqual(normalize_date(raw), "2024-04-27", raw)
+        for raw in ("", None, "2024/13/01", "2024/02/30", "2024/Q1"):
+            self.assertIsNone(normalize_date(raw), raw)
+
+
+class TestPeriodCalendar(unittest.TestCase):
+    """测试 period_calendar 与日期范围查询"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "finance.db")
+        self.engine = create_engine(f"sqlite:///{self.path}")
+        init_db(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.repo = FinanceRepository(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def calendar(self):
+        return [tuple(r) for r in self.db.execute(text(
+            "SELECT category, ticker, period, period_end, disclosure_date FROM period_calendar "
+            "ORDER BY category, ticker, period_ordinal"
+        ))]
+
+    def test_one_row_per_period(self):
+        """多个指标行共享同一组日期，日历中每个季度只存一次"""
+        self.repo.save_records("利润表", "NVDA", records(["营业总收入", "毛利", "营业利润"], ["2024/Q1", "2024/Q2"]),
+                               {"2024/Q1": "2024/04/28", "2024/Q2": "2024年7月28日"})
+        self.assertEqual(self.calendar(), [
+            ("利润表", "NVDA", "2024/Q1", "2024-04-28", None),
+            ("利润表", "NVDA", "2024/Q2", "2024-07-28", None),
+        ])
+
+    def test_merge_rules(self):
+        """截止日期后写入的覆盖；披露日期保留最早的；无法识别的截止日期不写入"""
+        self.repo.save_records("利润表", "NVDA", records(["毛利"], ["2024/Q1"]), {"2024/Q1": "2024/04/27"},
+                               disclosure_date="2024/05/22")
+        self.repo.save_records("利润表", "NVDA", records(["毛利"], ["2024/Q1", "2024/Q2"], value="2.0"),
+                               {"2024/Q1": "2024/04/28", "2024/Q2": "截止日期"}, disclosure_date="2024-08-28")
+        self.assertEqual(self.calendar(), [
+            ("利润表", "NVDA", "2024/Q1", "2024-04-28", "2024-05-22"),
+            ("利润表", "NVDA", "2024/Q2", None, "2024-08-28"),
+        ])
+        # 更早的披露日期替换已有值
+        self.repo.save_records("利润表", "NVDA", records(["毛利"], ["2024/Q1"], value="2.0"), disclosure_date="2024/05/01")
+        self.assertEqual(self.calendar()[0][4], "2024-05-01")
+        with self.assertRaises(ValueError):
+            self.repo.save_records("利润表", "NVDA", records(["毛利"], ["2024/Q1"]), disclosure_date="下周")
+
+    def test_batch_and_pivot_paths(self):
+        """save_pivot_batch 条目中的 period_dates / disclosure_date 同样写入"""
+        self.repo.save_pivot_batch([
+            {"category": "关键指标", "ticker": "AAPL", "records": records(["毛利率 (%)"], ["2024/Q1"]),
+             "period_dates": {"2024/Q1": "2024/03/30"}, "disclosure_date": "2024/05/02"},
+        ])
+        self.assertEqual(self.calendar(), [("关键指标", "AAPL", "2024/Q1", "2024-03-30", "2024-05-02")])
+
+    def test_delete_category(self):
+        self.repo.save_records("利润表", "NVDA", records(["毛利"], ["2024/Q1"]), {"2024/Q1": "2024/04/28"})
+        self.repo.save_records("关键指标", "NVDA", records(["毛利率 (%)"], ["2024/Q1"]), {"2024/Q1": "2024/04/28"})
+        self.repo.delete_by_category("利润表")
+        self.assertEqual([r[0] for r in self.calendar()], ["关键指标"])
+
+    def test_range_queries(self):
+        """按截止日期 / 披露日期查询区间内报告的公司"""
+        for ticker, end, disclosed in (("NVDA", "2024/04/28", "2024/05/22"), ("AAPL", "2024/03/30", "2024/05/02"),
+                                       ("MSFT", "2024/03/31", "2024/04/25")):
+            self.repo.save_records("利润表", ticker, records(["毛利"], ["2024/Q1"]), {"2024/Q1": end},
+                                   disclosure_date=disclosed)
+        self.repo.save_records("关键指标", "TSLA", records(["毛利率 (%)"], ["2024/Q1"]), {"2024/Q1": "2024/03/31"})
+
+        self.assertEqual(self.repo.tickers_reported_between("2024/03/31", "2024/04/30"), ["MSFT", "NVDA", "TSLA"])
+        self.assertEqual(self.repo.tickers_reported_between("2024-03-31", "2024-04-30", category="利润表"),
+                         ["MSFT", "NVDA"])
+        self.assertEqual(self.repo.tickers_reported_between("2024/05/01", "2024/05/31", date_field="disclosure_date"),
+                         ["AAPL", "NVDA"])
+
+        rows = self.repo.query_calendar(end="2024/03/31")
+        self.assertEqual([(r["ticker"], r["period_end"]) for r in rows],
+                         [("AAPL", "2024-03-30"), ("TSLA", "2024-03-31"), ("MSFT", "2024-03-31")])
+        self.assertEqual(len(self.repo.query_calendar(tickers=["NVDA", "TSLA"])), 2)
+        self.assertEqual(len(self.repo.query_calendar(date_field="disclosure_date")), 3)
+
+        with self.assertRaises(ValueError):
+            self.repo.tickers_reported_between("2024/Q1", "2024/04/30")
+        with self.assertRaises(ValueError):
+            self.repo.query_calendar(date_field="report_date")
+
+    def test_range_query_uses_index(self):
+        """区间查询在日期索引上扫描（覆盖索引，不回表）"""
+        for field, index in (("period_end", "ix_period_calendar_end"), ("disclosure_date", "ix_period_calendar_disclosure")):
+            for category_filter in ("", " AND category = '利润表'"):
+                plan = " ".join(str(row[-1]) for row in self.db.execute(text(
+                    f"EXPLAIN QUERY PLAN SELECT DISTINCT ticker FROM period_calendar "
+                    f"WHERE {field} BETWEEN '2024-01-01' AND '2024-12-31'{category_filter}"
+                )))
+                self.assertIn(f"COVERING INDEX {index}", plan)
+
+    def test_backfill_existing_db(self):
+        """旧库的日期只存在于 period_dates：init_db 回填一次，后写入的行覆盖先写入的"""
+        self.repo.save_records("利润表", "NVDA", records(["毛利"], ["2024/Q1"]), {"2024/Q1": "2024/04/27"})
+        self.repo.save_records("利润表", "NVDA", records(["营业利润"], ["2024/Q1"]), {"2024/Q1": "2024/04/28"})
+        self.db.close()
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM period_calendar"))
+            conn.execute(text("DELETE FROM migration_state WHERE name = :name"), {"name": PERIOD_CALENDAR_STATE})
+        init_db(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.assertEqual(self.calendar(), [("利润表", "NVDA", "2024/Q1", "2024-04-28", None)])
+        # 已完成的回填不重复执行
+        self.db.execute(text("DELETE FROM period_calendar"))
+        self.db.commit()
+        init_db(self.engine)
+        self.assertEqual(self.calendar(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
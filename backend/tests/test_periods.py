@@ -0,0 +1,121 @@
+# backend/tests/test_periods.py
+# 季度序号测试：解析、时间排序、旧库补列回填、区间查询
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.periods import (
+    KIND_FISCAL_YEAR, KIND_HALF, KIND_MONTH, KIND_QUARTER, UNKNOWN_ORDINAL,
+    Period, parse_period, period_ordinal, sort_periods,
+)
+from backend.app.models.finance_model import ensure_period_ordinal, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+
+PERIODS = ["2023/FY", "2023/H1", "2023/Q1", "2023/09", "2023/Q4", "2023/Q3", "2023/Q2", "2022/FY", "2024/Q1"]
+
+
+class TestPeriodParsing(unittest.TestCase):
+    """测试季度标记解析"""
+
+    def test_parse(self):
+        cases = {
+            "2024/Q1": Period(2024, KIND_QUARTER, 1), "2024-q3": Period(2024, KIND_QUARTER, 3),
+            "2024H2": Period(2024, KIND_HALF, 2), "2024/FY": Period(2024, KIND_FISCAL_YEAR, 1),
+            "2024/09": Period(2024, KIND_MONTH, 9), "2024/13": None, "截止日期": None, "": None,
+        }
+        for token, expected in cases.items():
+            with self.subTest(token=token):
+                self.assertEqual(parse_period(token), expected)
+
+    def test_chronological_order(self):
+        self.assertEqual(sort_periods(PERIODS), [
+            "2022/FY", "2023/Q1", "2023/Q2", "2023/H1", "2023/09", "2023/Q3", "2023/Q4", "2023/FY", "2024/Q1",
+        ])
+
+    def test_unknown_tokens(self):
+        self.assertGreater(period_ordinal("2023/XX"), period_ordinal("2023/FY"))
+        self.assertLess(period_ordinal("2023/XX"), period_ordinal("2024/Q1"))
+        self.assertEqual(period_ordinal("未知"), UNKNOWN_ORDINAL)
+
+
+class TestPeriodOrdinalStorage(unittest.TestCase):
+    """测试 observations.period_ordinal 的写入、回填与查询"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'finance.db')}")
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def save(self):
+        FinanceRepository(self.db).save_records("利润表", "NVDA", [
+            {"metric_id": "营业收入", "period": p, "value": str(i)} for i, p in enumerate(PERIODS)
+        ])
+
+    def test_pivot_and_range(self):
+        init_db(self.engine)
+        self.save()
+        repo = FinanceRepository(self.db)
+        df = repo.get_pivot_data("利润表")
+        self.assertEqual(list(df.columns[1:]), sort_periods(PERIODS))
+
+        rows = repo.query_observations(category="利润表", period_from="2023/H1", period_to="2023/FY")["rows"]
+        self.assertEqual([r["period"] for r in rows], ["2023/H1", "2023/09", "2023/Q3", "2023/Q4", "2023/FY"])
+        rows = repo.query_observations(category="利润表", period_from="2023/Q4")["rows"]
+        self.assertEqual([r["period"] for r in rows], ["2023/Q4", "2023/FY", "2024/Q1"])
+        with self.assertRaises(ValueError):
+            repo.query_observations(period_from="去年")
+
+    def test_range_uses_ordinal_index(self):
+        init_db(self.engine)
+        self.save()
+        plan = " ".join(str(r) for r in self.db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT period FROM observations "
+            "WHERE category = '利润表' AND metric_id = '营业收入' AND period_ordinal BETWEEN 20230000 AND 20231299"
+        )))
+        self.assertIn("ix_observations_metric_ordinal", plan)
+
+    def test_backfill_legacy_table(self):
+        """测试旧库 observations 没有 period_ordinal 列时 init_db 补列并回填"""
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE observations (id INTEGER PRIMARY KEY, ticker VARCHAR NOT NULL, category VARCHAR NOT NULL, "
+                "metric_id VARCHAR NOT NULL, metric_label VARCHAR, period VARCHAR NOT NULL, value FLOAT, "
+                "raw_text TEXT, report_date VARCHAR)"
+            ))
+            conn.execute(text(
+                "INSERT INTO observations (ticker, category, metric_id, period, value) VALUES (:t, '利润表', 'EPS', :p, 1)"
+            ), [{"t": "NVDA", "p": p} for p in PERIODS])
+        init_db(self.engine)
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT period, period_ordinal FROM observations")).all()
+            indexes = {r[1] for r in conn.execute(text("PRAGMA index_list(observations)"))}
+        self.assertEqual({p: o for p, o in rows}, {p: period_ordinal(p) for p in PERIODS})
+        self.assertIn("ix_observations_cell_ordinal", indexes)
+
+    def test_backfill_runs_once(self):
+        """测试回填完成后再次调用只读 migration_state，不执行 UPDATE / ALTER / 建索引"""
+        init_db(self.engine)
+        self.save()
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        self.assertEqual(ensure_period_ordinal(self.engine), 0)
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith("SELECT 1 FROM migration_state"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# backend/tests/test_pivot_read.py
+# get_pivot_data 单游标读取测试：与逐行 ORM + json.loads 读取的结果一致
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.finance_model import Base, IncomeStatementModel, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.observation_migration import migrate_observations
+
+
+def orm_pivot(db, ticker=None):
+    """原实现：逐个 ORM 对象 json.loads 后由 pandas 组装"""
+    query = db.query(IncomeStatementModel).order_by(IncomeStatementModel.id)
+    if ticker:
+        query = query.filter(IncomeStatementModel.ticker == ticker)
+    rows = []
+    for r in query.all():
+        row = {"metric_label": r.metric_label, "ticker": r.ticker}
+        row.update(json.loads(r.period_data or "{}"))
+        rows.append(row)
+    df = pd.DataFrame(rows).set_index("metric_label")
+    period_cols = sorted(c for c in df.columns if c != "ticker")
+    return df[["ticker"] + period_cols]
+
+
+class TestPivotRead(unittest.TestCase):
+    """测试 SQL 侧 Pivot 读取"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'finance.db')}")
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        # 各行季度不完全相同，含空行，两个公司
+        self.db.add_all([
+            IncomeStatementModel(ticker="NVDA", metric_id="营业收入", metric_label="营业收入",
+                                 period_data=json.dumps({"2024/Q2": "12亿", "2024/Q1": "1,000"}), period_dates="{}"),
+            IncomeStatementModel(ticker="NVDA", metric_id="EPS", metric_label="EPS",
+                                 period_data=json.dumps({"2023/Q4": "0.5", "2024/Q2": "--"}), period_dates="{}"),
+            IncomeStatementModel(ticker="NVDA", metric_id="空", metric_label="空", period_data="", period_dates="{}"),
+            IncomeStatementModel(ticker="AMD", metric_id="EPS", metric_label="EPS",
+                                 period_data=json.dumps({"2024/Q1": "(0.2)"}), period_dates="{}"),
+        ])
+        self.db.commit()
+        init_db(self.engine)
+        self.repo = FinanceRepository(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_matches_orm(self):
+        """测试与原实现一致"""
+        self.assertFalse(self.repo.observations_ready("利润表"))
+        for ticker in (None, "NVDA"):
+            with self.subTest(ticker=ticker):
+                pd.testing.assert_frame_equal(self.repo.get_pivot_data("利润表", ticker=ticker),
+                                              orm_pivot(self.db, ticker))
+
+    def test_text_read_after_migration(self):
+        """测试迁移后文本读取结果不变"""
+        expected = orm_pivot(self.db)
+        migrate_observations(self.engine, log=lambda msg: None)
+        self.assertTrue(self.repo.observations_ready("利润表"))
+        pd.testing.assert_frame_equal(self.repo.get_pivot_data("利润表"), expected)
+
+    def test_numeric(self):
+        """测试 numeric=True 返回 float64 列，读取时解析与 observations 预解析一致（空行不进入 observations）"""
+        legacy = self.repo.get_pivot_data("利润表", numeric=True).drop(index="空")
+        migrate_observations(self.engine, log=lambda msg: None)
+        migrated = self.repo.get_pivot_data("利润表", numeric=True)
+        pd.testing.assert_frame_equal(legacy, migrated)
+        self.assertEqual(migrated["2024/Q2"].dtype, np.float64)
+        self.assertEqual(migrated.loc["营业收入", "2024/Q2"], 1.2e9)
+        self.assertEqual(migrated[migrated["ticker"] == "AMD"]["2024/Q1"].iloc[0], -0.2)
+        self.assertTrue(np.isnan(migrated[migrated["ticker"] == "NVDA"].loc["EPS", "2024/Q2"]))
+
+    def test_empty(self):
+        """测试无数据时返回空 DataFrame"""
+        self.assertTrue(self.repo.get_pivot_data("现金流量表").empty)
+        self.assertTrue(self.repo.get_pivot_data("利润表", ticker="TSLA").empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+# backend/tests/test_query_observations.py
+# 过滤 + 游标分页查询测试：条件下推到 SQL、翻页完整无重复
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.database import create_sqlite_engine
+from backend.app.models.finance_model import Base, IncomeStatementModel, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.observation_migration import migrate_observations
+
+TICKERS = ["AMD", "NVDA", "TSLA"]
+METRICS = [f"M{i}" for i in range(6)]
+PERIODS = [f"{year}/Q{q}" for year in (2022, 2023, 2024) for q in range(1, 5)]
+
+
+class TestQueryObservations(unittest.TestCase):
+    """测试 query_observations"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.engine = create_sqlite_engine(os.path.join(cls.tmp.name, "finance.db"))
+        init_db(cls.engine)
+        cls.db = sessionmaker(bind=cls.engine)()
+        repo = FinanceRepository(cls.db)
+        for ticker in TICKERS:
+            repo.save_records("利润表", ticker, [
+                {"metric_id": m, "period": p, "value": f"{i}.{j}"}
+                for i, m in enumerate(METRICS) for j, p in enumerate(PERIODS)
+            ])
+        repo.save_records("关键指标", "NVDA", [{"metric_id": "ROE", "period": "2024/Q1", "value": "30%"}])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        cls.engine.dispose()
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.repo = FinanceRepository(self.db)
+
+    def query_all(self, **kwargs):
+        rows, cursor, pages = [], None, 0
+        while True:
+            page = self.repo.query_observations(cursor=cursor, **kwargs)
+            rows.extend(page["rows"])
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return rows, pages
+
+    def test_filters(self):
+        """测试公司、指标、季度范围过滤"""
+        rows, pages = self.query_all(category="利润表", tickers=["NVDA", "TSLA"], metric_ids=["M1", "M4"],
+                                     period_from="2023/Q1", period_to="2024/Q4", page_size=7)
+        self.assertEqual(len(rows), 2 * 2 * 8)
+        self.assertEqual(pages, 5)
+        keys = [(r["ticker"], r["metric_id"], r["period"]) for r in rows]
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertEqual(keys, sorted(keys))
+        self.assertTrue(all(r["ticker"] in ("NVDA", "TSLA") and r["metric_id"] in ("M1", "M4") for r in rows))
+        self.assertTrue(all("2023/Q1" <= r["period"] <= "2024/Q4" for r in rows))
+        self.assertEqual(rows[0]["value"], 1.4)
+
+    def test_all_categories(self):
+        """测试不指定类别时跨类别查询"""
+        rows, _ = self.query_all(tickers=["NVDA"], period_from="2024/Q1", period_to="2024/Q1", page_size=100)
+        self.assertEqual({r["category"] for r in rows}, {"利润表", "关键指标"})
+        self.assertEqual(len(rows), len(METRICS) + 1)
+
+    def test_reads_only_matching_cells(self):
+        """测试过滤在 SQL 中执行：查询计划使用索引，而不是扫描全表"""
+        statements = []
+        listener = lambda conn, cursor, statement, params, context, executemany: statements.append((statement, params))
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            self.repo.query_observations(category="利润表", tickers=["NVDA"], metric_ids=["M1"], page_size=3)
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+        sql, params = statements[-1]
+        cursor = self.db.connection().connection.cursor()
+        plan = " ".join(str(r) for r in cursor.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+        self.assertIn("USING INDEX", plan)
+        self.assertNotIn("SCAN observations", plan)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.repo.query_observations(cursor="not-a-cursor")
+        with self.assertRaises(ValueError):
+            self.repo.query_observations(page_size=0)
+        with self.assertRaises(ValueError):
+            self.repo.query_observations(category="未知")
+
+
+class TestQueryUnmigrated(unittest.TestCase):
+    """测试旧库（分类表尚未迁移到 observations）的查询"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_sqlite_engine(os.path.join(self.tmp.name, "finance.db"))
+        Base.metadata.create_all(bind=self.engine)
+        db = sessionmaker(bind=self.engine)()
+        for ticker in ("NVDA", "AMD"):
+            for i in range(3):
+                db.add(IncomeStatementModel(
+                    ticker=ticker, metric_id=f"M{i}", metric_label=f"M{i}",
+                    period_data=json.dumps({"2024/FY": f"{i}", "2024/Q1": f"{i}.5", "2023/Q4": "1,200"}),
+                    period_dates=json.dumps({"2024/Q1": "2024/04/27"}),
+                ))
+        db.commit()
+        db.close()
+        init_db(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.repo = FinanceRepository(self.db)
+        # 空的类别在 init_db 时直接标记为已迁移
+        self.repo.save_records("关键指标", "NVDA", [{"metric_id": "ROE", "period": "2024/Q1", "value": "30%"}])
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def query_all(self, **kwargs):
+        rows, cursor = [], None
+        while True:
+            page = self.repo.query_observations(cursor=cursor, page_size=4, **kwargs)
+            rows.extend(page["rows"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return rows
+
+    def test_same_rows_before_and_after_migration(self):
+        """未迁移类别展开分类表 JSON，跨类别翻页与迁移后结果一致"""
+        self.assertFalse(self.repo.observations_ready("利润表"))
+        filters = [{}, {"tickers": ["NVDA"], "period_from": "2024/Q1", "period_to": "2024/FY"}, {"metric_ids": ["M1"]}]
+        before = [self.query_all(**f) for f in filters]
+        self.assertEqual(len(before[0]), 2 * 3 * 3 + 1)
+        # 类别按文本顺序："关键指标" 在 "利润表" 之前
+        self.assertEqual(before[0][0]["category"], "关键指标")
+        self.assertEqual([(r["ticker"], r["period"]) for r in before[0][1:4]],
+                         [("AMD", "2023/Q4"), ("AMD", "2024/Q1"), ("AMD", "2024/FY")])
+        self.assertEqual(before[0][2]["report_date"], "2024/04/27")
+        self.assertEqual(before[0][1]["value"], 1200.0)
+
+        migrate_observations(self.engine, log=lambda msg: None)
+        self.assertTrue(self.repo.observations_ready("利润表"))
+        self.assertEqual([self.query_all(**f) for f in filters], before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+# backend/tests/test_read_cache.py
+# 带版本号的 Pivot 读缓存测试：命中、副本隔离、写入后失效（含其他进程的写入）、跨会话共享
+
+import os
+import sys
+import subprocess
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.database import create_sqlite_engine
+from backend.app.models.finance_model import init_db
+from backend.app.repositories.observation_migration import migrate_category
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.read_cache import PIVOT_CACHE, VersionedReadCache
+
+
+class TestVersionedReadCache(unittest.TestCase):
+    """测试缓存本身"""
+
+    def test_version_mismatch_reloads(self):
+        """测试版本一致时命中，版本变化（其他会话或进程提交）后重新读取"""
+        cache = VersionedReadCache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return pd.DataFrame({"v": [len(calls)]})
+
+        cache.get_or_load("db", "利润表", 7, "k", loader)
+        cache.get_or_load("db", "利润表", 7, "k", loader)
+        self.assertEqual(cache.get_or_load("db", "利润表", -3, "k", loader).iloc[0]["v"], 2)
+        self.assertEqual(len(calls), 2)
+
+    def test_lru_bound(self):
+        cache = VersionedReadCache(max_entries=2)
+        for key in "abc":
+            cache.get_or_load("db", "t", 1, key, pd.DataFrame)
+        cache.get_or_load("db", "t", 1, "a", pd.DataFrame)
+        self.assertEqual(cache.misses, 4)
+
+
+class TestRepositoryCache(unittest.TestCase):
+    """测试 FinanceRepository 读缓存"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "finance.db")
+        self.engine = create_sqlite_engine(self.path)
+        init_db(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        PIVOT_CACHE.clear()
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def save(self, value, category="利润表", ticker="NVDA"):
+        db = self.Session()
+        FinanceRepository(db).save_records(category, ticker, [{"metric_id": "EPS", "period": "2024/Q1", "value": value}])
+        db.close()
+
+    def test_hit_and_copy(self):
+        """测试重复读取命中，调用方修改不影响缓存"""
+        self.save("0.6")
+        db = self.Session()
+        repo = FinanceRepository(db)
+        first = repo.get_pivot_data("利润表")
+        first.loc["EPS", "2024/Q1"] = "changed"
+        second = repo.get_pivot_data("利润表")
+        self.assertEqual(second.loc["EPS", "2024/Q1"], "0.6")
+        self.assertEqual((PIVOT_CACHE.misses, PIVOT_CACHE.hits), (1, 1))
+        db.close()
+
+    def test_invalidated_across_sessions(self):
+        """测试另一会话保存后失效，且只影响被写入的类别"""
+        self.save("0.6")
+        self.save("1.0", category="关键指标")
+        reader = FinanceRepository(self.Session())
+        reader.get_pivot_data("利润表")
+        reader.get_pivot_data("关键指标")
+
+        self.save("0.7")
+        self.assertEqual(reader.get_pivot_data("利润表").loc["EPS", "2024/Q1"], "0.7")
+        reader.get_pivot_data("关键指标")
+        self.assertEqual(PIVOT_CACHE.hits, 1)
+
+        writer = FinanceRepository(self.Session())
+        writer.delete_by_category("利润表")
+        self.assertTrue(reader.get_pivot_data("利润表").empty)
+        writer.db.close()
+        reader.db.close()
+
+    def test_invalidated_by_other_process(self):
+        """测试另一进程（如 CLI 导入）提交的写入使本进程的缓存失效"""
+        self.save("0.6")
+        reader = FinanceRepository(self.Session())
+        self.assertEqual(reader.get_pivot_data("利润表").loc["EPS", "2024/Q1"], "0.6")
+        self.assertEqual(reader.get_pivot_data("利润表").loc["EPS", "2024/Q1"], "0.6")
+        self.assertEqual(PIVOT_CACHE.hits, 1)
+
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+        script = (
+            "import sys\n"
+            "from sqlalchemy.orm import sessionmaker\n"
+            "from backend.app.core.database import create_sqlite_engine\n"
+            "from backend.app.repositories.finance_repo import FinanceRepository\n"
+            "db = sessionmaker(bind=create_sqlite_engine(sys.argv[1]))()\n"
+            "FinanceRepository(db).save_records('利润表', 'NVDA', "
+            "[{'metric_id': 'EPS', 'period': '2024/Q1', 'value': '0.9'}])\n"
+        )
+        subprocess.run([sys.executable, "-c", script, self.path], cwd=root, check=True)
+
+        self.assertEqual(reader.get_pivot_data("利润表").loc["EPS", "2024/Q1"], "0.9")
+        self.assertEqual(PIVOT_CACHE.hits, 1)
+        reader.db.close()
+
+    def test_invalidated_by_migration(self):
+        """测试迁移在完成的事务内更新版本：numeric 读取改走 observations 后不返回迁移前缓存的结果"""
+        self.save("0.6")
+        reader = FinanceRepository(self.Session())
+        reader.get_pivot_data("利润表", numeric=True)
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM migration_state WHERE name = 'observations:利润表'"))
+        migrate_category(self.engine, "利润表", log=lambda _: None)
+        reader.get_pivot_data("利润表", numeric=True)
+        self.assertEqual((PIVOT_CACHE.misses, PIVOT_CACHE.hits), (2, 0))
+        reader.db.close()
+
+    def test_uncommitted_write_not_cached(self):
+        """测试事务内读取未提交的写入时不进入缓存，回滚后其他会话读不到"""
+        self.save("0.6")
+        writer = FinanceRepository(self.Session())
+        writer._stage_records("利润表", "NVDA", [{"metric_id": "EPS", "period": "2024/Q1", "value": "9.9"}])
+        self.assertEqual(writer.get_pivot_data("利润表").loc["EPS", "2024/Q1"], "9.9")
+        writer.db.rollback()
+        writer.db.close()
+
+        reader = FinanceRepository(self.Session())
+        self.assertEqual(reader.get_pivot_data("利润表").loc["EPS", "2024/Q1"], "0.6")
+        reader.db.close()
+
+    def test_unchanged_key_params(self):
+        """测试 ticker / numeric 参数分别缓存"""
+        self.save("0.6")
+        self.save("1.5", ticker="AMD")
+        repo = FinanceRepository(self.Session())
+        self.assertEqual(len(repo.get_pivot_data("利润表")), 2)
+        self.assertEqual(len(repo.get_pivot_data("利润表", ticker="AMD")), 1)
+        self.assertEqual(repo.get_pivot_data("利润表", ticker="AMD", numeric=True).iloc[0]["2024/Q1"], 1.5)
+        self.assertEqual(PIVOT_CACHE.hits, 0)
+        repo.db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
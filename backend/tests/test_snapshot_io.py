@@ -0,0 +1,119 @@
+# backend/tests/test_snapshot_io.py
+# Parquet / Arrow IPC 快照测试：分区导出、流式行组、内存映射读取、导入往返
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.database import create_sqlite_engine
+from backend.app.models.finance_model import init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    from backend.app.repositories.snapshot_io import (
+        export_arrow, export_parquet, import_snapshot, open_arrow_snapshot, open_parquet_snapshot,
+    )
+except ImportError:
+    pyarrow = None
+
+PERIODS = ["2024/Q1", "2024/Q2", "2024/Q3"]
+
+
+def make_db(path):
+    engine = create_sqlite_engine(path)
+    init_db(engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+@unittest.skipIf(pyarrow is None, "未安装 pyarrow")
+class TestSnapshotIO(unittest.TestCase):
+    """测试快照导出与导入"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine, self.db = make_db(os.path.join(self.tmp.name, "finance.db"))
+        repo = FinanceRepository(self.db)
+        for ticker in ("NVDA", "A/B"):
+            repo.save_records("利润表", ticker, [
+                {"metric_id": m, "period": p, "value": v, "report_date": "2024-03-31" if p == "2024/Q1" else ""}
+                for m, values in (("营业收入", ["12.3亿", "13亿", "--"]), ("毛利率", ["60%", "61.5%", "62%"]),
+                                  ("净利润", ["(1.2)", "1,234.5", "0"]))
+                for p, v in zip(PERIODS, values)
+            ])
+        repo.save_records("关键指标", "NVDA", [{"metric_id": "ROE", "period": "2024/Q1", "value": "30%"}])
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_parquet_partitions_and_types(self):
+        """测试按类别/公司分区、数值列为 float64、行组按 row_group_size 切分"""
+        out = os.path.join(self.tmp.name, "snapshot")
+        stats = export_parquet(self.db, out, row_group_size=4)
+        self.assertEqual(stats, {"files": 3, "rows": 19})
+
+        path = os.path.join(out, "category=利润表", "ticker=A%2FB", "part-0.parquet")
+        meta = pyarrow.parquet.ParquetFile(path).metadata
+        self.assertEqual(meta.num_rows, 9)
+        self.assertEqual(meta.num_row_groups, 3)
+        self.assertEqual(pyarrow.parquet.read_schema(path).field("value").type, pyarrow.float64())
+
+        table = open_parquet_snapshot(out, categories=["利润表"], tickers=["A/B"])
+        self.assertEqual(table.num_rows, 9)
+        values = dict(zip(zip(table["metric_id"].to_pylist(), table["period"].to_pylist()), table["value"].to_pylist()))
+        self.assertEqual(values[("营业收入", "2024/Q1")], 1.23e9)
+        self.assertIsNone(values[("营业收入", "2024/Q3")])
+        self.assertEqual(values[("净利润", "2024/Q1")], -1.2)
+        self.assertEqual(open_parquet_snapshot(out).count_rows(), 19)
+
+    def test_arrow_memory_map(self):
+        """测试 Arrow IPC 快照内存映射读取不分配新的列缓冲区"""
+        path = os.path.join(self.tmp.name, "snapshot.arrow")
+        self.assertEqual(export_arrow(self.db, path), 19)
+        before = pyarrow.total_allocated_bytes()
+        table = open_arrow_snapshot(path)
+        self.assertEqual(pyarrow.total_allocated_bytes(), before)
+        self.assertEqual(table.num_rows, 19)
+        self.assertEqual(set(table["category"].to_pylist()), {"利润表", "关键指标"})
+
+    def test_round_trip(self):
+        """测试 Parquet 与 Arrow 快照导入后 Pivot 与原库一致"""
+        expected = {c: FinanceRepository(self.db).get_pivot_data(c) for c in ("利润表", "关键指标")}
+        parquet_dir = os.path.join(self.tmp.name, "snapshot")
+        arrow_path = os.path.join(self.tmp.name, "snapshot.arrow")
+        export_parquet(self.db, parquet_dir)
+        export_arrow(self.db, arrow_path)
+
+        for index, source in enumerate((parquet_dir, arrow_path)):
+            with self.subTest(source=source):
+                engine, db = make_db(os.path.join(self.tmp.name, f"copy{index}.db"))
+                try:
+                    self.assertEqual(import_snapshot(db, source), {"groups": 3, "rows": 19})
+                    repo = FinanceRepository(db, use_cache=False)
+                    for category, df in expected.items():
+                        # 导入按公司分组写入，只比较每个公司内部的指标顺序
+                        actual = repo.get_pivot_data(category).sort_values("ticker", kind="stable")
+                        self.assertTrue(actual.equals(df.sort_values("ticker", kind="stable")), category)
+                    self.assertEqual(FinanceRepository(db).query_observations(
+                        category="利润表", tickers=["NVDA"], metric_ids=["营业收入"])["rows"][0]["report_date"],
+                        "2024-03-31")
+                finally:
+                    db.close()
+                    engine.dispose()
+
+    def test_missing_snapshot(self):
+        with self.assertRaises(ValueError):
+            import_snapshot(self.db, os.path.join(self.tmp.name, "missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,9 +15,10 @@ from streamlit_paste_button import paste_image_button
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import importlib.util
-from backend.app.services.ocr_service import OCRService
-from backend.app.models.finance_model import init_db, SessionLocal
+from backend.app.services.ocr_service import OCRService, DEFAULT_PROFILE_PATH
+from backend.app.models.finance_model import init_db, session_scope
 from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.api.recognition import build_pivot, recognize_categories
 
 # Helper: Load Config
 def load_financial_metrics(config_path):
@@ -47,15 +48,13 @@ else:
 
 # Initialize OCR Service (CPU mode for stability)
 if 'ocr_service' not in st.session_state:
-    st.session_state.ocr_service = OCRService(gpu=False)
+    # 若存在 ocr_tuner 生成的参数配置则加载
+    profile = DEFAULT_PROFILE_PATH if os.path.exists(DEFAULT_PROFILE_PATH) else None
+    st.session_state.ocr_service = OCRService(gpu=False, profile=profile)
 
 # Clean memory periodically
 gc.collect()
 
-if 'db' not in st.session_state:
-    st.session_state.db = SessionLocal()
-    st.session_state.repo = FinanceRepository(st.session_state.db)
-
 if 'auto_disclosure_date' not in st.session_state:
     st.session_state.auto_disclosure_date = ""
 
@@ -71,6 +70,15 @@ selected_sample = st.sidebar.selectbox("选择参考文件", ["无"] + samples)
 if selected_sample != "无":
     st.sidebar.info(f"正在查看: {selected_sample}")
 
+# Helper: Save uploaded / pasted image to a temp path
+def save_temp_image(img, path):
+    if hasattr(img, 'save'): # PIL Image from paste
+        img.save(path)
+    else: # Bytes/UploadedFile
+        with Image.open(img) as o_img:
+            o_img.save(path)
+    return path
+
 # Helper: Filter metrics by category
 def get_metrics_by_category(category):
     return [m for m in FINANCIAL_METRICS if m.get('category') == category]
@@ -121,13 +129,7 @@ with col_up:
                 # Save temp
                 paths = []
                 for img, n in [(img_p, "p"), (img_m, "m"), (img_v, "v")]:
-                    path = f"temp_{n}.png"
-                    if hasattr(img, 'save'): # PIL Image from paste
-                        img.save(path)
-                    else: # Bytes/UploadedFile
-                        with Image.open(img) as o_img:
-                            o_img.save(path)
-                    paths.append(path)
+                    paths.append(save_temp_image(img, f"temp_{n}.png"))
                 
                 gc.collect()
                 
@@ -146,24 +148,9 @@ with col_up:
                 
                 if parsed_data:
                     for item in parsed_data: item['category'] = selected_category
-                    df = pd.DataFrame(parsed_data)
-                    df = df.drop_duplicates(subset=['metric_id', 'period'], keep='first')
-                    
-                    # 创建主数据透视表
-                    pivot_df = df.pivot(index='metric_id', columns='period', values='value')
-                    labels_map = {m['id']: m['label'] for m in FINANCIAL_METRICS}
-                    pivot_df.index = pivot_df.index.map(lambda x: labels_map.get(x, x))
-                    
-                    # 提取每季度的截止日期
-                    if 'report_date' in df.columns:
-                        date_df = df.drop_duplicates(subset=['period'])[['period', 'report_date']]
-                        date_dict = dict(zip(date_df['period'], date_df['report_date']))
+                    pivot_df, date_dict = build_pivot(parsed_data, FINANCIAL_METRICS)
+                    if date_dict:
                         st.session_state.period_dates = date_dict
-                        
-                        # 创建日期行并添加到透视表
-                        date_row = pd.DataFrame([date_dict], index=['截止日期'])
-                        date_row = date_row.reindex(columns=pivot_df.columns)
-                        pivot_df = pd.concat([date_row, pivot_df])
                     
                     st.session_state.parsed_df = pivot_df
                     st.session_state.raw_parsed = parsed_data
@@ -191,7 +178,8 @@ with col_res:
         with db_col2:
             if st.button("🗑️ 清空该类别数据"):
                 # 获取将被删除的记录数
-                deleted = st.session_state.repo.delete_by_category(selected_category)
+                with session_scope() as db:
+                    deleted = FinanceRepository(db).delete_by_category(selected_category)
                 st.warning(f"已清空 {deleted} 条{selected_category}数据")
                 st.rerun()
 
@@ -201,12 +189,13 @@ with col_res:
                 period_dates = st.session_state.get('period_dates', {})
                 
                 # 调用新的 Pivot 格式保存方法
-                st.session_state.repo.save_pivot_data(
-                    category=selected_category,
-                    ticker=target_ticker,
-                    pivot_df=edited_df,
-                    period_dates=period_dates
-                )
+                with session_scope() as db:
+                    FinanceRepository(db).save_pivot_data(
+                        category=selected_category,
+                        ticker=target_ticker,
+                        pivot_df=edited_df,
+                        period_dates=period_dates
+                    )
                 
                 st.success(f"已成功保存 {selected_category} 数据到数据库！")
                 st.rerun()
@@ -215,16 +204,103 @@ with col_res:
     else:
         st.info('尚未进行识别。请先上传或粘贴截图并点击开始识别。')
 
+# Batch Recognition (multiple categories in one run)
+st.divider()
+st.header("🗂️ 批量识别（多类别并发）")
+with st.expander("一次上传多个报表类别的截图，并发识别后一次性入库", expanded=False):
+    batch_cats = globals().get('CATEGORY_ORDER', ["关键指标", "利润表", "资产负债表", "现金流量表"])
+    batch_images = {}
+    batch_tabs = st.tabs(batch_cats)
+    for cat_idx, (tab, cat) in enumerate(zip(batch_tabs, batch_cats)):
+        with tab:
+            cat_imgs = []
+            for col, (n, title) in zip(st.columns(3), [("p", "📅 季度"), ("m", "📊 科目"), ("v", "💰 数据")]):
+                with col:
+                    st.caption(title)
+                    upload = st.file_uploader("文件", type=["png", "jpg", "jpeg"], key=f"batch_up_{n}_{cat_idx}")
+                    paste = paste_image_button(f"📋 粘贴{title[2:]}", key=f"batch_p_{n}_{cat_idx}")
+                    img = upload if upload else (paste.image_data if paste.image_data else None)
+                    if img: st.image(img)
+                    cat_imgs.append(img)
+            if all(cat_imgs):
+                batch_images[cat] = cat_imgs
+            elif any(cat_imgs):
+                st.warning(f"{cat} 需要完整的三个部分截图，否则将被跳过。")
+
+    if st.button("🚀 并发识别所有已上传类别", use_container_width=True):
+        if not batch_images:
+            st.warning("请至少为一个类别上传完整的三个部分截图。")
+        else:
+            with st.spinner(f"正在并发解析 {', '.join(batch_images)}..."):
+                image_sets = {}
+                for cat_idx, cat in enumerate(batch_cats):
+                    if cat in batch_images:
+                        image_sets[cat] = tuple(
+                            save_temp_image(img, f"temp_batch_{cat_idx}_{n}.png")
+                            for img, n in zip(batch_images[cat], ["p", "m", "v"])
+                        )
+                gc.collect()
+                st.session_state.batch_results = recognize_categories(
+                    st.session_state.ocr_service, image_sets, FINANCIAL_METRICS
+                )
+
+    if st.session_state.get('batch_results'):
+        batch_edited = {}
+        for cat, res in st.session_state.batch_results.items():
+            st.subheader(cat)
+            if res["error"]:
+                st.error(f"OCR 识别失败: {res['error']}")
+            elif res["pivot_df"].empty:
+                st.error("识别失败，请检查截图。")
+            else:
+                if res["disclosure_date"]:
+                    st.info(f"📅 识别到的披露日期：**{res['disclosure_date']}**")
+                batch_edited[cat] = st.data_editor(res["pivot_df"], use_container_width=True, key=f"batch_editor_{cat}")
+
+        batch_ticker = st.text_input("公司代码 (Ticker)", value="NVDA", key="batch_ticker")
+        if batch_edited and st.button("💾 全部保存到数据库（单事务）"):
+            try:
+                with session_scope() as db:
+                    FinanceRepository(db).save_pivot_batch([
+                        {
+                            "category": cat,
+                            "ticker": batch_ticker,
+                            "pivot_df": edited,
+                            "period_dates": st.session_state.batch_results[cat]["period_dates"],
+                        }
+                        for cat, edited in batch_edited.items()
+                    ])
+                st.success(f"已成功保存 {', '.join(batch_edited)} 数据到数据库！")
+                del st.session_state.batch_results
+                st.rerun()
+            except Exception as e:
+                st.error(f"保存失败: {e}")
+
 # History View (Pivot Format - Per Category)
 st.divider()
 st.header("📊 数据库已录入数据")
 
+# 搜索公司/指标（公司代码、指标名称及 OCR 别名，多个关键词用空格分隔）
+search_query = st.text_input("🔍 搜索公司或指标", key="db_search_query", placeholder="例如: NVDA 每股收益")
+if search_query.strip():
+    with session_scope() as db:
+        search_repo = FinanceRepository(db)
+        # 只读取命中的单元格（一次查询），不经 Pivot 缓存，避免挤掉下方历史视图的缓存
+        match_df = search_repo.get_metric_rows(search_repo.search_metrics(search_query, limit=50))
+    if not match_df.empty:
+        st.caption(f"找到 {len(match_df)} 条结果" + ("（仅显示前 50 条）" if len(match_df) == 50 else ""))
+        match_df = match_df.rename(columns={"ticker": "公司", "category": "类别", "metric_label": "指标"})
+        st.dataframe(match_df.fillna(""), use_container_width=True)
+    else:
+        st.info("没有匹配的公司或指标。")
+
 # 按类别显示数据
 from backend.app.models.finance_model import CATEGORY_MODEL_MAP
 db_categories = list(CATEGORY_MODEL_MAP.keys())
 selected_db_category = st.selectbox("选择要查看的类别", db_categories, key="db_view_category")
 
-db_df = st.session_state.repo.get_pivot_data(selected_db_category)
+with session_scope() as db:
+    db_df = FinanceRepository(db).get_pivot_data(selected_db_category)
 if not db_df.empty:
     st.dataframe(db_df, use_container_width=True)
 else:
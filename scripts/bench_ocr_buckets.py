@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+识别阶段分桶基准：在科目截图（科目名长度差异最大）上比较
+单批识别 (easyocr 默认，所有裁剪图填充到最宽者) 与按宽高比分桶批量识别
+用法:
+    python scripts/bench_ocr_buckets.py [temp_m.png] [--runs 5] [--gpu]
+检测只运行一次，计时只包含识别阶段。
+注意：easyocr 在 CPU 上会逐个框识别（不组批），分桶的收益主要体现在 GPU 批量路径上
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.ocr_recognition import DEFAULT_BUCKET_EDGES, estimate_padding, recognize_bucketed
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="识别阶段分桶基准")
+    parser.add_argument("image", nargs="?", default=os.path.join(PROJECT_ROOT, "temp_m.png"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--gpu", action="store_true")
+    args = parser.parse_args()
+
+    import numpy as np
+    from PIL import Image
+    from backend.app.services.ocr_service import OCRService
+
+    reader = OCRService(gpu=args.gpu).reader
+    with Image.open(args.image) as img:
+        rgb = np.asarray(img.convert("RGB"))
+        grey = np.asarray(img.convert("L"))
+    horizontal_list, free_list = reader.detect(rgb)
+    horizontal, free = horizontal_list[0], free_list[0]
+    n = len(horizontal) + len(free)
+    print(f"{os.path.basename(args.image)}: {n} 个文本框")
+
+    for label, edges in (("单批", None), ("分桶", DEFAULT_BUCKET_EDGES)):
+        cost = estimate_padding(horizontal, free, edges)
+        print(f"  {label}: 有效像素占比 {cost['useful'] / max(cost['padded'], 1):.1%}")
+
+    def single():
+        return reader.recognize(grey, horizontal_list=horizontal, free_list=free, batch_size=n)
+
+    def bucketed():
+        return recognize_bucketed(reader, grey, horizontal, free)
+
+    texts = {}
+    for label, fn in (("单批", single), ("分桶", bucketed)):
+        fn()  # 预热
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            result = fn()
+        elapsed = (time.perf_counter() - start) / args.runs
+        texts[label] = sorted(r[1] for r in result)
+        print(f"  {label}: {elapsed * 1000:.1f} ms/次")
+    print(f"  识别文本一致: {texts['单批'] == texts['分桶']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+解析阶段基准：回放 OCR 夹具，测量 parse_ocr_results 的耗时（不加载模型）
+用法:
+    python scripts/bench_ocr_parse.py [fixture ...] [--runs 200]
+默认使用 backend/tests/fixtures/ 下的全部夹具
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.ocr_service import OCRService
+from backend.app.services.ocr_fixtures import load_fixture, load_fixture_meta
+from backend.config.config import FINANCIAL_METRICS
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", "tests", "fixtures")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR 解析阶段基准")
+    parser.add_argument("fixtures", nargs="*")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.ocr.json*")))
+    ocr = OCRService(gpu=False)
+    for path in fixtures:
+        category = load_fixture_meta(path).get("category")
+        metrics = [m for m in FINANCIAL_METRICS if not category or m.get("category") == category]
+        raw = load_fixture(path)
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            parsed, _ = ocr.parse_ocr_results(raw, metrics)
+        elapsed = (time.perf_counter() - start) / args.runs
+        tokens = sum(len(v) for v in raw.values())
+        print(f"{os.path.basename(path)}: {elapsed * 1000:.3f} ms/parse, {tokens} tokens -> {len(parsed)} cells")
+
+
+if __name__ == "__main__":
+    main()
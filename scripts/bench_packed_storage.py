@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+紧凑格式 (period_axes + float64 字节串) 与 JSON 文本格式的体积、读取速度对比
+用法:
+    python scripts/bench_packed_storage.py [--tickers 500] [--metrics 30] [--periods 40] [--runs 3]
+在临时数据库中生成数据，不会修改 finance.db
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.packed import unpack_values
+from backend.app.models.finance_model import Base, IncomeStatementModel, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.packed_migration import pack_categories
+
+
+def timed(fn, runs):
+    fn()  # 预热
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) / runs, result
+
+
+def file_size(engine, path, sql=None):
+    """VACUUM INTO 得到紧凑的副本后取文件大小；sql 在副本上执行后再次 VACUUM"""
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"VACUUM INTO '{path}'"))
+    if sql:
+        other = create_engine(f"sqlite:///{path}")
+        with other.begin() as conn:
+            for statement in sql:
+                conn.execute(text(statement))
+        with other.connect() as conn:
+            conn.execute(text("VACUUM"))
+        other.dispose()
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="紧凑格式与 JSON 格式对比")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--metrics", type=int, default=30)
+    parser.add_argument("--periods", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    periods = [f"{2000 + i // 4}/Q{i % 4 + 1}" for i in range(args.periods)]
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(IncomeStatementModel.__table__.insert(), [
+                {
+                    "ticker": f"T{t:04d}", "metric_id": f"M{m}", "metric_label": f"M{m}",
+                    "period_data": json.dumps({p: f"{v:.3f}" for p, v in zip(periods, rng.normal(100, 50, len(periods)))}),
+                    "period_dates": "{}",
+                }
+                for t in range(args.tickers) for m in range(args.metrics)
+            ])
+        init_db(engine)
+        db = sessionmaker(bind=engine)()
+        repo = FinanceRepository(db, use_cache=False)
+        rows = args.tickers * args.metrics
+        print(f"{rows} 行 x {args.periods} 季度 = {rows * args.periods} 个单元格")
+
+        json_read, expected = timed(lambda: repo.get_pivot_data("利润表", numeric=True), args.runs)
+        pack_categories(engine, ["利润表"], log=lambda msg: None)
+        db.expire_all()
+        packed_read, result = timed(lambda: repo.get_pivot_data("利润表", numeric=True), args.runs)
+        assert np.allclose(result.drop(columns="ticker").to_numpy(), expected.drop(columns="ticker").to_numpy(),
+                           equal_nan=True)
+
+        with engine.connect() as conn:
+            json_bytes = conn.execute(text("SELECT SUM(LENGTH(period_data)) FROM income_statement")).scalar()
+            packed_bytes = conn.execute(text("SELECT SUM(LENGTH(period_values)) FROM income_statement")).scalar()
+            axis_bytes = conn.execute(text("SELECT SUM(LENGTH(periods)) FROM period_axes")).scalar()
+            blobs = [r[0] for r in conn.execute(text("SELECT period_values FROM income_statement"))]
+            texts = [r[0] for r in conn.execute(text("SELECT period_data FROM income_statement"))]
+        json_file = file_size(engine, os.path.join(tmp, "json.db"), [
+            "DELETE FROM period_axes", "UPDATE income_statement SET period_values = NULL",
+            "DELETE FROM observations",
+        ])
+        packed_file = file_size(engine, os.path.join(tmp, "packed.db"), [
+            "UPDATE income_statement SET period_data = '{}'", "DELETE FROM observations",
+        ])
+
+        decode_json, _ = timed(lambda: [json.loads(t) for t in texts], args.runs)
+        decode_packed, _ = timed(lambda: [unpack_values(b) for b in blobs], args.runs)
+
+        mb = lambda b: f"{b / 1024 / 1024:8.2f} MB"
+        print("体积")
+        print(f"  JSON period_data:              {mb(json_bytes)}")
+        print(f"  period_values + 季度轴:        {mb(packed_bytes + axis_bytes)}  ({json_bytes / (packed_bytes + axis_bytes):.1f}x)")
+        print(f"  数据库文件 (只含 JSON):        {mb(json_file)}")
+        print(f"  数据库文件 (只含紧凑格式):     {mb(packed_file)}  ({json_file / packed_file:.1f}x)")
+        print("读取")
+        print(f"  逐行 json.loads:               {decode_json * 1000:8.1f} ms")
+        print(f"  逐行 np.frombuffer:            {decode_packed * 1000:8.1f} ms  ({decode_json / decode_packed:.1f}x)")
+        print(f"  numeric Pivot (JSON 解析):     {json_read * 1000:8.1f} ms")
+        print(f"  numeric Pivot (紧凑格式):      {packed_read * 1000:8.1f} ms  ({json_read / packed_read:.1f}x)")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
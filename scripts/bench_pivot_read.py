@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+get_pivot_data 读取基准：原实现（ORM 对象 + json.loads + pandas 逐行组装）
+与单游标按列组装对比；numeric=True 时比较读取时解析与 observations 预解析数值
+用法:
+    python scripts/bench_pivot_read.py [--tickers 200] [--metrics 20] [--periods 40] [--runs 5]
+在临时数据库中生成数据，不会修改 finance.db
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.finance_model import Base, IncomeStatementModel, init_db
+from backend.app.repositories.finance_repo import FinanceRepository
+from backend.app.repositories.observation_migration import migrate_observations
+
+
+def orm_pivot(db, category_model):
+    """原实现"""
+    records = db.query(category_model).all()
+    data_rows = []
+    for r in records:
+        row = {"metric_label": r.metric_label, "ticker": r.ticker}
+        row.update(json.loads(r.period_data or "{}"))
+        data_rows.append(row)
+    df = pd.DataFrame(data_rows).set_index("metric_label")
+    period_cols = sorted(c for c in df.columns if c != "ticker")
+    return df[["ticker"] + period_cols]
+
+
+def timed(fn, runs):
+    fn()  # 预热
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) / runs, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_pivot_data 读取基准")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--metrics", type=int, default=20)
+    parser.add_argument("--periods", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    periods = [f"{2000 + i // 4}/Q{i % 4 + 1}" for i in range(args.periods)]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(IncomeStatementModel.__table__.insert(), [
+                {
+                    "ticker": f"T{t:04d}", "metric_id": f"M{m}", "metric_label": f"M{m}",
+                    "period_data": json.dumps({p: f"{t * m + i}.5" for i, p in enumerate(periods)}),
+                    "period_dates": "{}",
+                }
+                for t in range(args.tickers) for m in range(args.metrics)
+            ])
+        init_db(engine)
+        db = sessionmaker(bind=engine)()
+        repo = FinanceRepository(db)
+        cells = args.tickers * args.metrics * args.periods
+        print(f"{args.tickers * args.metrics} 行 x {args.periods} 季度 = {cells} 个单元格")
+
+        before, expected = timed(lambda: orm_pivot(db, IncomeStatementModel), args.runs)
+        print(f"  原实现 (ORM + json.loads):     {before * 1000:8.1f} ms")
+        fast, result = timed(lambda: repo.get_pivot_data("利润表"), args.runs)
+        print(f"  单游标按列组装:                {fast * 1000:8.1f} ms  ({before / fast:.1f}x)")
+        assert result.equals(expected)
+        parsed, _ = timed(lambda: repo.get_pivot_data("利润表", numeric=True), args.runs)
+        print(f"  numeric=True (parse_numeric):  {parsed * 1000:8.1f} ms")
+
+        migrate_observations(engine, chunk_size=5000, log=lambda msg: None)
+        numeric, _ = timed(lambda: repo.get_pivot_data("利润表", numeric=True), args.runs)
+        print(f"  numeric=True (observations):   {numeric * 1000:8.1f} ms")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
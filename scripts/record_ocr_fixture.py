@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+录制 OCR 原始输出为夹具文件（需要 easyocr 和模型权重，仅录制时运行一次）
+用法:
+    python scripts/record_ocr_fixture.py temp_p.png temp_m.png temp_v.png \
+        backend/tests/fixtures/nvda_income.ocr.json --category 利润表
+之后解析规则可通过 OCRService.parse_fixture() 回放测试，无需模型
+"""
+import argparse
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.services.ocr_service import OCRService
+from backend.app.services.ocr_fixtures import record_fixture
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制 readtext 原始输出")
+    parser.add_argument("periods")
+    parser.add_argument("metrics")
+    parser.add_argument("values")
+    parser.add_argument("out", help="输出夹具路径 (*.ocr.json 或 *.ocr.json.gz)")
+    parser.add_argument("--category", default="", help="截图所属类别，写入夹具元信息")
+    parser.add_argument("--gpu", action="store_true")
+    args = parser.parse_args()
+
+    ocr = OCRService(gpu=args.gpu)
+    raw = record_fixture(ocr, args.periods, args.metrics, args.values, args.out,
+                         meta={"category": args.category})
+    counts = ", ".join(f"{stage}={len(items)}" for stage, items in raw.items())
+    print(f"已录制 {args.out} ({counts}, {os.path.getsize(args.out)} bytes)")
+
+
+if __name__ == "__main__":
+    main()